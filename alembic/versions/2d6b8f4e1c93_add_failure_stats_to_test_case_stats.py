@@ -0,0 +1,34 @@
+"""add failure statistics to test_case_stats
+
+Revision ID: 2d6b8f4e1c93
+Revises: 8e3f0a6c2b17
+Create Date: 2026-10-18 21:48:05.527731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d6b8f4e1c93'
+down_revision: Union[str, Sequence[str], None] = '8e3f0a6c2b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('test_case_stats', sa.Column('failure_rate', sa.Float(), server_default='0', nullable=False))
+    op.add_column('test_case_stats', sa.Column('pass_fail_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('test_case_stats', sa.Column('last_failure_at', sa.DateTime(timezone=True), nullable=True))
+    # Existing history is folded in by `python -m scripts.rebuild_case_stats`, which can
+    # take a while on a large test_results table
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('test_case_stats', 'last_failure_at')
+    op.drop_column('test_case_stats', 'pass_fail_count')
+    op.drop_column('test_case_stats', 'failure_rate')
@@ -0,0 +1,43 @@
+"""add foreign key and query pattern indexes
+
+Revision ID: 3f9c2b7d41e8
+Revises: 96e51c5de50d
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2b7d41e8'
+down_revision: Union[str, Sequence[str], None] = '96e51c5de50d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns) - kept in sync with the Index definitions on the models
+INDEXES = [
+    ("ix_test_results_test_case_id_created_at", "test_results", ["test_case_id", sa.text("created_at DESC")]),
+    ("ix_test_results_created_at", "test_results", ["created_at"]),
+    ("ix_test_cases_project_id_id", "test_cases", ["project_id", "id"]),
+    ("ix_test_runs_project_id_id", "test_runs", ["project_id", "id"]),
+    ("ix_test_runs_executed_by_user_id", "test_runs", ["executed_by_user_id"]),
+    ("ix_users_project_id", "users", ["project_id"]),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY so large tables keep accepting result writes while the indexes build;
+    # it can't run inside a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,66 @@
+"""create test_case_latest_results table
+
+Revision ID: 4a7c9e2f5d31
+Revises: 2d6b8f4e1c93
+Create Date: 2026-10-18 22:31:16.904822
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7c9e2f5d31'
+down_revision: Union[str, Sequence[str], None] = '2d6b8f4e1c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    test_status = postgresql.ENUM('pass', 'fail', 'blocked', 'skipped', name='test_status', create_type=False)
+    op.create_table('test_case_latest_results',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('environment', sa.String(length=100), server_default='', nullable=False),
+    sa.Column('test_case_id', sa.Integer(), nullable=False),
+    sa.Column('test_run_id', sa.Integer(), nullable=False),
+    sa.Column('result_id', sa.Integer(), nullable=False),
+    sa.Column('status', test_status, nullable=False),
+    sa.Column('run_started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['test_case_id'], ['test_cases.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['test_run_id'], ['test_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id', 'environment', 'test_case_id')
+    )
+    op.create_index(
+        'ix_test_case_latest_results_project_id_status_environment',
+        'test_case_latest_results',
+        ['project_id', 'status', 'environment', 'test_case_id'],
+    )
+    op.create_index('ix_test_case_latest_results_test_case_id', 'test_case_latest_results', ['test_case_id'])
+    op.create_index('ix_test_case_latest_results_test_run_id', 'test_case_latest_results', ['test_run_id'])
+
+    # Backfill (same query as scripts/rebuild_latest_results.py)
+    op.execute(
+        """
+        INSERT INTO test_case_latest_results
+            (project_id, environment, test_case_id, test_run_id, result_id, status, run_started_at)
+        SELECT DISTINCT ON (r.project_id, coalesce(r.environment, ''), tr.test_case_id)
+               r.project_id, coalesce(r.environment, ''), tr.test_case_id, r.id, tr.id, tr.status, r.started_at
+        FROM test_results tr
+        JOIN test_runs r ON r.id = tr.test_run_id
+        ORDER BY r.project_id, coalesce(r.environment, ''), tr.test_case_id, r.started_at DESC, r.id DESC
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_test_case_latest_results_test_run_id', table_name='test_case_latest_results')
+    op.drop_index('ix_test_case_latest_results_test_case_id', table_name='test_case_latest_results')
+    op.drop_index('ix_test_case_latest_results_project_id_status_environment', table_name='test_case_latest_results')
+    op.drop_table('test_case_latest_results')
@@ -0,0 +1,38 @@
+"""add test_cases (project_id, title) index
+
+Revision ID: 5c1e9b7d3a42
+Revises: b7d2e94f0a16
+Create Date: 2026-10-18 20:14:52.610348
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e9b7d3a42'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e94f0a16'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_test_cases_project_id_title",
+            "test_cases",
+            ["project_id", "title"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_test_cases_project_id_title",
+            table_name="test_cases",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,41 @@
+"""add test_results.duration_ms and test_case_stats table
+
+Revision ID: 8e3f0a6c2b17
+Revises: 5c1e9b7d3a42
+Create Date: 2026-10-18 21:02:37.184290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3f0a6c2b17'
+down_revision: Union[str, Sequence[str], None] = '5c1e9b7d3a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default: a catalog-only change, even on a large partitioned table
+    op.add_column('test_results', sa.Column('duration_ms', sa.Integer(), nullable=True))
+
+    op.create_table('test_case_stats',
+    sa.Column('test_case_id', sa.Integer(), nullable=False),
+    sa.Column('recent_durations_ms', postgresql.ARRAY(sa.Integer()), server_default='{}', nullable=False),
+    sa.Column('median_duration_ms', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['test_case_id'], ['test_cases.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('test_case_id')
+    )
+    # No backfill: existing results have no durations
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('test_case_stats')
+    op.drop_column('test_results', 'duration_ms')
@@ -0,0 +1,56 @@
+"""create test_run_summaries table
+
+Revision ID: a5d8e1c94b27
+Revises: 3f9c2b7d41e8
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d8e1c94b27'
+down_revision: Union[str, Sequence[str], None] = '3f9c2b7d41e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('test_run_summaries',
+    sa.Column('test_run_id', sa.Integer(), nullable=False),
+    sa.Column('executed_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('pass_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('fail_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('blocked_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('skipped_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['test_run_id'], ['test_runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('test_run_id')
+    )
+
+    # Backfill existing runs (same query as scripts/rebuild_run_summaries.py)
+    op.execute(
+        """
+        INSERT INTO test_run_summaries
+            (test_run_id, executed_count, pass_count, fail_count, blocked_count, skipped_count)
+        SELECT
+            r.id,
+            count(tr.id),
+            count(tr.id) FILTER (WHERE tr.status = 'pass'),
+            count(tr.id) FILTER (WHERE tr.status = 'fail'),
+            count(tr.id) FILTER (WHERE tr.status = 'blocked'),
+            count(tr.id) FILTER (WHERE tr.status = 'skipped')
+        FROM test_runs r
+        LEFT JOIN test_results tr ON tr.test_run_id = r.id
+        GROUP BY r.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('test_run_summaries')
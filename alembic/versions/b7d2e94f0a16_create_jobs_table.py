@@ -0,0 +1,50 @@
+"""create jobs table
+
+Revision ID: b7d2e94f0a16
+Revises: f3a8c61e2d95
+Create Date: 2026-10-18 19:26:41.382057
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e94f0a16'
+down_revision: Union[str, Sequence[str], None] = 'f3a8c61e2d95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+job_status = postgresql.ENUM("queued", "running", "succeeded", "failed", "cancelled", name="job_status")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=50), nullable=False),
+    sa.Column('params', postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False),
+    sa.Column('status', job_status, server_default='queued', nullable=False),
+    sa.Column('cancel_requested', sa.Boolean(), server_default='false', nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('artifact_path', sa.Text(), nullable=True),
+    sa.Column('artifact_media_type', sa.String(length=100), nullable=True),
+    sa.Column('artifact_bytes', sa.BigInteger(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_id', 'jobs', ['status', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_status_id', table_name='jobs')
+    op.drop_table('jobs')
+    job_status.drop(op.get_bind())
@@ -0,0 +1,38 @@
+"""add test_runs (project_id, started_at) index
+
+Revision ID: c4e7a2f95d13
+Revises: a5d8e1c94b27
+Create Date: 2026-10-18 15:04:27.519340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a2f95d13'
+down_revision: Union[str, Sequence[str], None] = 'a5d8e1c94b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_test_runs_project_id_started_at",
+            "test_runs",
+            ["project_id", "started_at"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_test_runs_project_id_started_at",
+            table_name="test_runs",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
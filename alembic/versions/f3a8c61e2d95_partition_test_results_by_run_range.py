@@ -0,0 +1,128 @@
+"""partition test_results by test_run_id range
+
+Revision ID: f3a8c61e2d95
+Revises: e91b6d3a7c40
+Create Date: 2026-10-18 17:02:44.106218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a8c61e2d95'
+down_revision: Union[str, Sequence[str], None] = 'e91b6d3a7c40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS = "id, test_run_id, test_case_id, status, notes, created_at"
+
+# Index-backed names are global to the schema, so the old table's must move out of the way
+OLD_INDEX_NAMES = [
+    "test_results_pkey",
+    "uq_test_results_run_case",
+    "ix_test_results_test_case_id_created_at",
+    "ix_test_results_created_at",
+]
+# Not global, but Postgres would otherwise name the new table's foreign keys ..._fkey1
+OLD_FOREIGN_KEYS = ["test_results_test_run_id_fkey", "test_results_test_case_id_fkey"]
+
+# The partition layout as of this revision (app.db.partitions manages it from here on)
+PARTITION_RUN_SPAN = 1000
+PARTITIONS_AHEAD = 2
+
+
+def _create_results_table(primary_key: sa.PrimaryKeyConstraint, **kw) -> None:
+    status = postgresql.ENUM("pass", "fail", "blocked", "skipped", name="test_status", create_type=False)
+    op.create_table(
+        "test_results",
+        sa.Column("id", sa.Integer(), server_default=sa.text("nextval('test_results_id_seq')"), nullable=False),
+        sa.Column("test_run_id", sa.Integer(), nullable=False),
+        sa.Column("test_case_id", sa.Integer(), nullable=False),
+        sa.Column("status", status, nullable=False),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["test_case_id"], ["test_cases.id"]),
+        sa.ForeignKeyConstraint(["test_run_id"], ["test_runs.id"]),
+        sa.UniqueConstraint("test_run_id", "test_case_id", name="uq_test_results_run_case"),
+        primary_key,
+        **kw,
+    )
+
+
+def _create_indexes() -> None:
+    op.create_index("ix_test_results_test_case_id_created_at", "test_results", ["test_case_id", sa.text("created_at DESC")])
+    op.create_index("ix_test_results_created_at", "test_results", ["created_at"])
+
+
+def _move_aside_old_table() -> None:
+    op.execute("ALTER SEQUENCE test_results_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE test_results RENAME TO test_results_old")
+    for name in OLD_INDEX_NAMES:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_old")
+    for name in OLD_FOREIGN_KEYS:
+        op.execute(f"ALTER TABLE test_results_old RENAME CONSTRAINT {name} TO {name}_old")
+
+
+def _create_partitions() -> None:
+    """The default partition, plus one per span from the oldest run to PARTITIONS_AHEAD spans past the newest."""
+    op.execute("CREATE TABLE test_results_default PARTITION OF test_results DEFAULT")
+    min_run_id, max_run_id = op.get_bind().execute(
+        sa.text("SELECT coalesce(min(id), 0), coalesce(max(id), 0) FROM test_runs")
+    ).one()
+    lower = min_run_id // PARTITION_RUN_SPAN * PARTITION_RUN_SPAN
+    upper = (max_run_id // PARTITION_RUN_SPAN + 1 + PARTITIONS_AHEAD) * PARTITION_RUN_SPAN
+    for start in range(lower, upper, PARTITION_RUN_SPAN):
+        op.execute(
+            f"CREATE TABLE test_results_r{start} PARTITION OF test_results "
+            f"FOR VALUES FROM ({start}) TO ({start + PARTITION_RUN_SPAN})"
+        )
+
+
+def _drop_old_table() -> None:
+    op.execute("DROP TABLE test_results_old")
+    op.execute("ALTER SEQUENCE test_results_id_seq OWNED BY test_results.id")
+    op.execute("ANALYZE test_results")
+
+
+def upgrade() -> None:
+    # Rewrites test_results: run it in a maintenance window on large databases.
+    op.create_table(
+        "test_results_archives",
+        sa.Column("partition_name", sa.String(length=100), nullable=False),
+        sa.Column("from_run_id", sa.Integer(), nullable=False),
+        sa.Column("to_run_id", sa.Integer(), nullable=False),
+        sa.Column("row_count", sa.BigInteger(), nullable=False),
+        sa.Column("path", sa.Text(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("partition_name"),
+    )
+
+    _move_aside_old_table()
+    _create_results_table(
+        sa.PrimaryKeyConstraint("id", "test_run_id"),
+        postgresql_partition_by="RANGE (test_run_id)",
+    )
+    # Partitions for every existing run, plus the default partition
+    _create_partitions()
+
+    # Load before building the secondary indexes: one sorted build per partition is much
+    # cheaper than maintaining them row by row
+    op.execute(f"INSERT INTO test_results ({COLUMNS}) SELECT {COLUMNS} FROM test_results_old")
+    _create_indexes()
+    _drop_old_table()
+
+
+def downgrade() -> None:
+    # Archived partitions are not restored; run `manage_partitions restore` first if needed.
+    _move_aside_old_table()
+    _create_results_table(sa.PrimaryKeyConstraint("id"))
+    op.execute(f"INSERT INTO test_results ({COLUMNS}) SELECT {COLUMNS} FROM test_results_old")
+    _create_indexes()
+    _drop_old_table()
+    op.drop_table("test_results_archives")
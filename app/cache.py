@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.serialization import dumps
+
+
+class LRUBackend:
+    """In-process cache store with entry-count, byte-size and TTL limits.
+
+    Each worker process has its own copy, so invalidations are only seen by the worker
+    that handled the write. Its entries are kept briefly (CACHE_MEMORY_TTL_SECONDS) and
+    served without an ETag, so another worker's write leaves them stale for that long at
+    most. Use the Redis backend when running several workers.
+    """
+
+    # Invalidations don't reach the other workers' copies
+    shared = False
+
+    # Tag versions are never evicted individually (that could make a stale entry look fresh);
+    # past this many, the whole cache is flushed instead.
+    MAX_VERSIONS = 100_000
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        # Version of any tag not in _versions; raised past every old version when flushing
+        self._version_floor = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._bytes += len(value)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def get_versions(self, tags: list[str]) -> list[int]:
+        with self._lock:
+            return [self._versions.get(tag, self._version_floor) for tag in tags]
+
+    def bump_versions(self, tags: list[str]) -> None:
+        with self._lock:
+            if len(self._versions) + len(tags) > self.MAX_VERSIONS:
+                # An entry stored after the flush with versions read before it must never match
+                self._version_floor = max(self._versions.values(), default=self._version_floor) + 1
+                self._entries.clear()
+                self._versions.clear()
+                self._bytes = 0
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, self._version_floor) + 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class RedisBackend:
+    """Shared cache store for multi-worker deployments (requires the `redis` package)."""
+
+    shared = True
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "qatm:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package to be installed.") from e
+
+        self._client = redis.Redis.from_url(url)
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes) -> None:
+        self._client.set(self.prefix + key, value, ex=max(int(self.ttl_seconds), 1))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self.prefix + key)
+
+    def get_versions(self, tags: list[str]) -> list[int]:
+        values = self._client.mget([f"{self.prefix}v:{tag}" for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump_versions(self, tags: list[str]) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for tag in tags:
+            pipeline.incr(f"{self.prefix}v:{tag}")
+        pipeline.execute()
+
+
+class ResponseCache:
+    """Pre-serialized JSON responses with tag-based invalidation.
+
+    Every entry records the version of each tag it depends on (e.g. "run:5", "project:2").
+    Writes bump the versions of the tags they touch after committing; an entry whose recorded
+    versions no longer match is treated as a miss. Read the versions *before* querying the
+    data you are about to cache, so a write that lands in between can only make the entry stale.
+    """
+
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def versions(self, tags: list[str]) -> dict[str, int]:
+        if not self.enabled:
+            return {}
+        return dict(zip(tags, self.backend.get_versions(tags)))
+
+    def lookup(self, key: str) -> tuple[str, bytes] | None:
+        """Return (etag, body) for a fresh entry, or None. The etag is None unless the backend is shared."""
+        if not self.enabled:
+            return None
+
+        raw = self.backend.get(key)
+        if raw is not None:
+            header, body = raw.split(b"\n", 1)
+            meta = json.loads(header)
+            tags = list(meta["versions"])
+            fresh = meta.get("expires_at") is None or meta["expires_at"] > time.time()
+            if fresh and self.backend.get_versions(tags) == [meta["versions"][tag] for tag in tags]:
+                self.hits += 1
+                return meta["etag"], body
+            self.backend.delete(key)
+
+        self.misses += 1
+        return None
+
+    def store(self, key: str, body: bytes, versions: dict[str, int], max_age: float | None = None) -> str:
+        """Cache `body` under the tag versions read before building it.
+
+        `max_age` (seconds) bounds the entry's life below the backend TTL regardless of the
+        versions, e.g. for data read from a replica that may lag the invalidation.
+        Returns the body's ETag, or None when it is cached in a per-process backend: a
+        worker that missed an invalidation would otherwise answer a stale 304.
+        """
+        etag = make_etag(body) if self.backend.shared or not self.enabled else None
+        if self.enabled:
+            meta = {"etag": etag, "versions": versions}
+            if max_age is not None:
+                meta["expires_at"] = time.time() + max_age
+            header = json.dumps(meta).encode()
+            self.backend.set(key, header + b"\n" + body)
+        return etag
+
+    def invalidate(self, tags: list[str]) -> None:
+        if self.enabled and tags:
+            self.backend.bump_versions(tags)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def json_response(request: Request, etag: str | None, body: bytes) -> Response:
+    """200 with the cached body, or 304 when the client already has this version."""
+    if etag is None:
+        return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-cache"})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_response(request: Request, key: str) -> Response | None:
+    cached = response_cache.lookup(key)
+    if cached is None:
+        return None
+    etag, body = cached
+    return json_response(request, etag, body)
+
+
+def store_response(request: Request, key: str, versions: dict[str, int], model: BaseModel) -> Response:
+    return store_body(request, key, versions, model.model_dump_json().encode())
+
+
+def store_json(request: Request, key: str, versions: dict[str, int], content) -> Response:
+    """Like store_response, for plain dicts/lists (e.g. built straight from row tuples)."""
+    return store_body(request, key, versions, dumps(content))
+
+
+def store_body(request: Request, key: str, versions: dict[str, int], body: bytes) -> Response:
+    # A replica can still be behind the write that bumped these versions, so its answer is
+    # only trusted for a short while (see app.db.routing)
+    max_age = REPLICA_MAX_AGE_SECONDS if getattr(request.state, "db_replica", False) else None
+    etag = response_cache.store(key, body, versions, max_age=max_age)
+    return json_response(request, etag, body)
+
+
+def _build_backend():
+    if os.getenv("CACHE_BACKEND", "memory").lower() == "redis":
+        ttl_seconds = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+        return RedisBackend(os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"), ttl_seconds)
+    # Short: it is how long another worker's write can go unseen
+    return LRUBackend(
+        max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+        max_bytes=int(os.getenv("CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        ttl_seconds=float(os.getenv("CACHE_MEMORY_TTL_SECONDS", "2")),
+    )
+
+
+# Lifetime of entries built from a read replica
+REPLICA_MAX_AGE_SECONDS = float(os.getenv("CACHE_REPLICA_MAX_AGE_SECONDS", "5"))
+
+response_cache = ResponseCache(
+    _build_backend(),
+    enabled=os.getenv("CACHE_ENABLED", "true").lower() == "true",
+)
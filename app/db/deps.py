@@ -1,4 +1,13 @@
-from app.db.session import SessionLocal
+import functools
+import inspect
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db.routing import async_read_sessionmaker, read_sessionmaker
+from app.db.session import AsyncSessionLocal, SessionLocal, db_async
 
 
 def get_db():
@@ -7,3 +16,96 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: served by a read replica when one is configured."""
+    db = read_sessionmaker(request)()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    async with async_read_sessionmaker(request)() as db:
+        yield db
+
+
+# The async dependency db_route swaps in for each sync one
+ASYNC_DEPENDENCIES = {get_db: get_async_db, get_read_db: get_async_read_db}
+
+
+def _step(plan, value):
+    # StopIteration can't cross run_in_threadpool's future: report the end of the plan instead
+    try:
+        return False, plan.send(value)
+    except StopIteration as stop:
+        return True, stop.value
+
+
+def run_plan(db: Session, plan):
+    """Run a route plan on a sync Session (the whole plan runs on the current thread)."""
+    done, value = _step(plan, None)
+    while not done:
+        done, value = _step(plan, db.execute(value))
+    return value
+
+
+async def run_plan_async(db: AsyncSession, plan):
+    """Run a route plan on an AsyncSession.
+
+    Statements await on the event loop; the plan's own code between them (cache calls,
+    row processing, JSON encoding) runs on the threadpool, so it never blocks the loop.
+    """
+    done, value = await run_in_threadpool(_step, plan, None)
+    while not done:
+        result = await db.execute(value)
+        done, value = await run_in_threadpool(_step, plan, result)
+    return value
+
+
+def db_route(dependency=get_read_db):
+    """Serve a route written as a plan: a generator that yields statements and gets their Results back.
+
+    The route gets a `db` session from `dependency` (get_db or get_read_db) and returns
+    what the plan returns. Normally the plan runs on the threadpool against a sync
+    Session. With DB_ASYNC on, the session is an AsyncSession (get_async_db or
+    get_async_read_db) and its statements await on the event loop. See run_plan_async.
+    Results must be consumed inside the plan, and anything returned must be fully loaded
+    (no lazy loads during response serialization). Routes that aren't plans stay plain
+    sync routes on the threadpool, whatever DB_ASYNC says.
+    """
+
+    def decorate(plan_function):
+        signature = inspect.signature(plan_function)
+        if db_async:
+            db_param = inspect.Parameter(
+                "db",
+                inspect.Parameter.KEYWORD_ONLY,
+                annotation=AsyncSession,
+                default=Depends(ASYNC_DEPENDENCIES[dependency]),
+            )
+
+            @functools.wraps(plan_function)
+            async def wrapper(*args, db: AsyncSession, **kwargs):
+                return await run_plan_async(db, plan_function(*args, **kwargs))
+
+        else:
+            db_param = inspect.Parameter(
+                "db", inspect.Parameter.KEYWORD_ONLY, annotation=Session, default=Depends(dependency)
+            )
+
+            @functools.wraps(plan_function)
+            def wrapper(*args, db: Session, **kwargs):
+                return run_plan(db, plan_function(*args, **kwargs))
+
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), db_param])
+        return wrapper
+
+    return decorate
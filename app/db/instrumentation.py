@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+
+logger = logging.getLogger("app.db")
+
+# Statements slower than this are logged at WARNING with their route and parameter shape
+SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+
+class RequestDbStats:
+    """Statement count and database time for the request currently being served."""
+
+    __slots__ = ("scope", "query_count", "db_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.query_count = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # Route template (e.g. /test-runs/{run_id}/report) once routing has happened
+        route = self.scope.get("route")
+        return getattr(route, "path", self.scope.get("path", ""))
+
+
+# One mutable stats object per request; threadpool endpoints get a copy of the context
+# that still points at the same object, so their queries are counted too.
+_current_stats: ContextVar[RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def _parameter_shape(parameters, depth: int = 0):
+    """Describe bind parameters by name and type only (values may be sensitive or huge)."""
+    if isinstance(parameters, dict):
+        shape = {key: type(value).__name__ for key, value in list(parameters.items())[:20]}
+        if len(parameters) > 20:
+            shape["..."] = f"{len(parameters)} params"
+        return shape
+    if isinstance(parameters, (list, tuple)):
+        if parameters and depth == 0 and isinstance(parameters[0], (dict, list, tuple)):
+            return {"executemany": len(parameters), "row": _parameter_shape(parameters[0], depth + 1)}
+        return [type(value).__name__ for value in parameters[:20]]
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started_at
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_seconds += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_query",
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "route": stats.route if stats else None,
+                    "statement": " ".join(statement.split())[:1000],
+                    "parameters": _parameter_shape(parameters),
+                },
+                default=str,
+            )
+        )
+
+
+def instrument_engine(engine) -> None:
+    """Attach per-request statement counting and slow-query logging to a (sync) engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Adds a Server-Timing header and a structured log line with per-request DB stats.
+
+    Plain ASGI middleware (no BaseHTTPMiddleware) to keep the per-request overhead to a
+    couple of attribute updates per statement.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats(scope)
+        token = _current_stats.set(stats)
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                total_ms = (time.perf_counter() - started_at) * 1000
+                headers = MutableHeaders(scope=message)
+                # For streamed responses this covers the queries made before the first byte
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.query_count} queries", app;dur={total_ms:.2f}',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(
+                    json.dumps(
+                        {
+                            "event": "request",
+                            "method": scope["method"],
+                            "route": stats.route,
+                            "status": status_code,
+                            "duration_ms": round((time.perf_counter() - started_at) * 1000, 2),
+                            "db_queries": stats.query_count,
+                            "db_ms": round(stats.db_seconds * 1000, 2),
+                        }
+                    )
+                )
@@ -0,0 +1,35 @@
+from fastapi import Query
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PageParams:
+    """Keyset pagination query parameters shared by the list endpoints."""
+
+    def __init__(
+        self,
+        after_id: int | None = Query(default=None, ge=0, description="Return rows with id greater than this cursor"),
+        limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.after_id = after_id
+        self.limit = limit
+
+
+def paginate(query, id_column, page: PageParams) -> dict:
+    """Apply keyset pagination on id_column and return a Page-shaped dict.
+
+    Fetches one extra row to know whether another page exists without a COUNT(*).
+    """
+    if page.after_id is not None:
+        query = query.filter(id_column > page.after_id)
+
+    rows = query.order_by(id_column).limit(page.limit + 1).all()
+
+    next_after_id = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_after_id = rows[-1].id
+
+    return {"items": rows, "next_after_id": next_after_id}
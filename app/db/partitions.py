@@ -0,0 +1,307 @@
+"""Range partitions of test_results by test_run_id.
+
+test_results is partitioned by test_run_id so that uq_test_results_run_case stays a real
+unique constraint (it includes the partition key) and every per-run query is pruned to a
+single partition. Each partition holds PARTITION_RUN_SPAN consecutive run ids; a DEFAULT
+partition catches rows for runs beyond the last partition until `ensure_partitions` moves
+them into a proper one; each API process runs `maintain_partitions`, which calls it when the
+newest run gets within PARTITIONS_AHEAD spans of the last partition. Old partitions are
+detached and archived to gzipped CSV files.
+"""
+import asyncio
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from starlette.concurrency import run_in_threadpool
+
+
+PARENT_TABLE = "test_results"
+DEFAULT_PARTITION = "test_results_default"
+PARTITION_RUN_SPAN = int(os.getenv("TEST_RESULTS_PARTITION_RUNS", "1000"))
+# Partitions kept ready beyond the one holding the newest run
+PARTITIONS_AHEAD = 2
+ARCHIVE_DIR = os.getenv("TEST_RESULTS_ARCHIVE_DIR", "archive")
+# First key of pg_advisory_xact_lock(int, int) for creating partitions (second key: 0)
+PARTITIONS_LOCK = 0x7150
+
+# How often each API process checks the partitions; PARTITIONS_AHEAD spans of runs are the headroom
+PARTITIONS_CHECK_SECONDS = float(os.getenv("TEST_RESULTS_PARTITION_CHECK_SECONDS", "300"))
+
+logger = logging.getLogger("app.db")
+
+COLUMNS = ["id", "test_run_id", "test_case_id", "status", "notes", "duration_ms", "created_at"]
+
+_BOUND_RE = re.compile(r"FOR VALUES FROM \('?(-?\d+)'?\) TO \('?(-?\d+)'?\)")
+
+
+def partition_name(lower: int) -> str:
+    return f"{PARENT_TABLE}_r{lower}"
+
+
+def span_for(run_id: int, span: int = PARTITION_RUN_SPAN) -> tuple[int, int]:
+    lower = (run_id // span) * span
+    return lower, lower + span
+
+
+def list_partitions(conn: Connection) -> list[dict]:
+    """Attached partitions, lowest range first (the default partition last), with sizes."""
+    rows = conn.execute(
+        text(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+                   pg_total_relation_size(c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = :parent
+            """
+        ),
+        {"parent": PARENT_TABLE},
+    ).all()
+
+    partitions = []
+    for name, bound, estimated_rows, size in rows:
+        match = _BOUND_RE.search(bound)
+        partitions.append(
+            {
+                "name": name,
+                "from_run_id": int(match.group(1)) if match else None,
+                "to_run_id": int(match.group(2)) if match else None,
+                "estimated_rows": max(estimated_rows, 0),
+                "bytes": size,
+            }
+        )
+    partitions.sort(key=lambda p: (p["from_run_id"] is None, p["from_run_id"] or 0))
+    return partitions
+
+
+def detached_partitions(conn: Connection) -> list[str]:
+    """test_results_r* tables that are no longer attached (e.g. an interrupted archive run)."""
+    return list(
+        conn.scalars(
+            text(
+                """
+                SELECT c.relname FROM pg_class c
+                WHERE c.relkind = 'r' AND c.relname ~ :pattern AND NOT c.relispartition
+                ORDER BY c.relname
+                """
+            ),
+            {"pattern": f"^{PARENT_TABLE}_r[0-9]+$"},
+        )
+    )
+
+
+def create_partition(conn: Connection, lower: int, upper: int, rows: io.BufferedIOBase | None = None) -> str:
+    """Create and attach the partition for [lower, upper), optionally loading CSV rows into it first.
+
+    Rows for this range that already landed in the default partition are moved into it;
+    otherwise attaching would fail the default partition's constraint check.
+    """
+    name = partition_name(lower)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    if rows is not None:
+        _copy_in(conn, name, rows)
+    conn.execute(
+        text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE test_run_id >= :lower AND test_run_id < :upper"),
+        {"lower": lower, "upper": upper},
+    )
+    conn.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE test_run_id >= :lower AND test_run_id < :upper"),
+        {"lower": lower, "upper": upper},
+    )
+    # A CHECK matching the bound lets ATTACH skip its validation scan of the new partition
+    conn.execute(
+        text(
+            f"ALTER TABLE {name} ADD CONSTRAINT {name}_bound "
+            f"CHECK (test_run_id >= {int(lower)} AND test_run_id < {int(upper)})"
+        )
+    )
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ({int(lower)}) TO ({int(upper)})"))
+    conn.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bound"))
+    return name
+
+
+def ensure_partitions(conn: Connection, ahead: int = PARTITIONS_AHEAD) -> list[str]:
+    """Create partitions up to `ahead` spans past the newest run. Returns the names created.
+
+    Only ever extends the top of the range, so archived spans are never re-created.
+    Concurrent callers (API workers, the manage_partitions script) take turns.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(:key, 0)"), {"key": PARTITIONS_LOCK})
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+    max_run_id = conn.scalar(text("SELECT coalesce(max(id), 0) FROM test_runs"))
+    target = span_for(max_run_id)[1] + ahead * PARTITION_RUN_SPAN
+
+    uppers = [p["to_run_id"] for p in list_partitions(conn) if p["to_run_id"] is not None]
+    uppers += list(conn.scalars(text("SELECT to_run_id FROM test_results_archives")))
+    if uppers:
+        lower = max(uppers)
+    else:
+        min_run_id = conn.scalar(text("SELECT coalesce(min(id), 0) FROM test_runs"))
+        lower = span_for(min_run_id)[0]
+
+    created = []
+    while lower < target:
+        created.append(create_partition(conn, lower, lower + PARTITION_RUN_SPAN))
+        lower += PARTITION_RUN_SPAN
+    return created
+
+
+def partitions_needed(conn: Connection, ahead: int = PARTITIONS_AHEAD) -> bool:
+    """Whether `ensure_partitions` has work to do. Only reads, and takes no locks."""
+    partitions = list_partitions(conn)
+    if not any(p["name"] == DEFAULT_PARTITION for p in partitions):
+        return True
+    max_run_id = conn.scalar(text("SELECT coalesce(max(id), 0) FROM test_runs"))
+    uppers = [p["to_run_id"] for p in partitions if p["to_run_id"] is not None]
+    return not uppers or max(uppers) < span_for(max_run_id)[1] + ahead * PARTITION_RUN_SPAN
+
+
+def keep_partitions_ahead(engine: Engine) -> list[str]:
+    """Run `ensure_partitions` if it is needed; returns the partitions created.
+
+    The check is a cheap read, so the lock and the DDL are only taken once every
+    PARTITION_RUN_SPAN runs.
+    """
+    with engine.connect() as conn:
+        if not partitions_needed(conn):
+            return []
+    with engine.begin() as conn:
+        return ensure_partitions(conn)
+
+
+async def check_partitions(engine: Engine) -> None:
+    """`keep_partitions_ahead` on the threadpool. A failure is logged, not raised: results
+    land in the default partition until the next check."""
+    try:
+        created = await run_in_threadpool(keep_partitions_ahead, engine)
+    except Exception:
+        logger.exception("Creating test_results partitions failed")
+    else:
+        if created:
+            logger.info("Created test_results partitions: %s", ", ".join(created))
+
+
+async def maintain_partitions(engine: Engine, interval: float = PARTITIONS_CHECK_SECONDS) -> None:
+    """Check the partitions every `interval` seconds for the life of the process.
+
+    Started by the app's lifespan after its own check at startup, so creating partitions
+    never adds to a request's latency.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        await check_partitions(engine)
+
+
+def archivable_partitions(conn: Connection, older_than: datetime) -> list[dict]:
+    """Attached partitions whose runs all started before `older_than` and that can't receive new runs."""
+    max_run_id = conn.scalar(text("SELECT coalesce(max(id), 0) FROM test_runs"))
+    current_lower = span_for(max_run_id)[0]
+
+    candidates = []
+    for partition in list_partitions(conn):
+        if partition["to_run_id"] is None or partition["to_run_id"] > current_lower:
+            continue
+        newest = conn.scalar(
+            text("SELECT max(started_at) FROM test_runs WHERE id >= :lower AND id < :upper"),
+            {"lower": partition["from_run_id"], "upper": partition["to_run_id"]},
+        )
+        if newest is None or newest < older_than:
+            candidates.append(partition)
+    return candidates
+
+
+def detach_partition(conn: Connection, partition: dict) -> None:
+    name = partition["name"]
+    # A detached table no longer has a bound; keep it in the comment so archiving can resume
+    conn.execute(text(f"COMMENT ON TABLE {name} IS '{int(partition['from_run_id'])}:{int(partition['to_run_id'])}'"))
+    conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+
+
+def archive_detached(conn: Connection, name: str, archive_dir: str = ARCHIVE_DIR) -> dict:
+    """Dump a detached partition to <archive_dir>/<name>.csv.gz, register it and drop the table."""
+    bounds = conn.scalar(text("SELECT obj_description(CAST(:name AS regclass), 'pg_class')"), {"name": name})
+    lower, upper = (int(bound) for bound in bounds.split(":"))
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    tmp_path = path + ".tmp"
+
+    digest = hashlib.sha256()
+    cursor = conn.connection.dbapi_connection.cursor()
+    with open(tmp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            query = f"COPY (SELECT {', '.join(COLUMNS)} FROM {name} ORDER BY id) TO STDOUT WITH (FORMAT csv, HEADER)"
+            with cursor.copy(query) as copy:
+                for chunk in copy:
+                    chunk = bytes(chunk)
+                    out.write(chunk)
+                    digest.update(chunk)
+        # The file must be durable before the table is dropped
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp_path, path)
+    row_count = conn.scalar(text(f"SELECT count(*) FROM {name}"))
+
+    conn.execute(
+        text(
+            """
+            INSERT INTO test_results_archives (partition_name, from_run_id, to_run_id, row_count, path, sha256)
+            VALUES (:name, :lower, :upper, :row_count, :path, :sha256)
+            """
+        ),
+        {"name": name, "lower": lower, "upper": upper, "row_count": row_count, "path": path, "sha256": digest.hexdigest()},
+    )
+    conn.execute(text(f"DROP TABLE {name}"))
+    return {"name": name, "from_run_id": lower, "to_run_id": upper, "row_count": row_count, "path": path}
+
+
+def restore_archive(conn: Connection, name: str) -> int:
+    """Load an archived partition back from its file and re-attach it. Returns the row count."""
+    archive = conn.execute(
+        text("SELECT from_run_id, to_run_id, path FROM test_results_archives WHERE partition_name = :name"),
+        {"name": name},
+    ).first()
+    if archive is None:
+        raise ValueError(f"No archive named {name}")
+
+    with gzip.open(archive.path, "rb") as rows:
+        create_partition(conn, archive.from_run_id, archive.to_run_id, rows)
+    conn.execute(text("DELETE FROM test_results_archives WHERE partition_name = :name"), {"name": name})
+    return conn.scalar(text(f"SELECT count(*) FROM {name}"))
+
+
+def iter_archived_rows(path: str, run_id: int | None = None, test_case_id: int | None = None):
+    """Stream rows (as dicts) out of an archive file, optionally filtered, without touching the database."""
+    with gzip.open(path, "rt", newline="") as f:
+        for row in csv.DictReader(f):
+            for column in ("id", "test_run_id", "test_case_id"):
+                row[column] = int(row[column])
+            if run_id is not None and row["test_run_id"] != run_id:
+                continue
+            if test_case_id is not None and row["test_case_id"] != test_case_id:
+                continue
+            # COPY writes NULL as an empty field (an empty string would be quoted)
+            row["notes"] = row["notes"] or None
+            # Archived before results had durations: the column is missing
+            row["duration_ms"] = int(row["duration_ms"]) if row.get("duration_ms") else None
+            yield row
+
+
+def _copy_in(conn: Connection, table: str, rows) -> None:
+    # Columns come from the file's header: archives written before a column was added lack it
+    columns = rows.readline().decode().strip().split(",")
+    if not set(columns) <= set(COLUMNS):
+        raise ValueError(f"Unexpected archive columns: {columns}")
+    cursor = conn.connection.dbapi_connection.cursor()
+    with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)") as copy:
+        while chunk := rows.read(1 << 20):
+            copy.write(chunk)
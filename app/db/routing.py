@@ -0,0 +1,77 @@
+import os
+import time
+from http.cookies import SimpleCookie
+
+from fastapi import Request
+from starlette.datastructures import MutableHeaders
+
+from app.db.session import (
+    AsyncReplicaSessionLocals,
+    AsyncSessionLocal,
+    ReplicaSessionLocals,
+    SessionLocal,
+    next_replica,
+)
+
+
+# After a successful write, the same client reads from the primary for this many seconds
+# (0 disables read-your-writes; replicas may then lag the client's own writes).
+STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "0"))
+PRIMARY_COOKIE = "qatm_primary_until"
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def reads_from_primary(request: Request) -> bool:
+    """True while the client's read-your-writes cookie is still running."""
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_sessionmaker(request: Request):
+    """Session factory for a read-only request: the next replica, or the primary if none
+    is configured or the client recently wrote."""
+    if not ReplicaSessionLocals or reads_from_primary(request):
+        return SessionLocal
+    # Lets the response cache know the data may lag the primary
+    request.state.db_replica = True
+    return ReplicaSessionLocals[next_replica()]
+
+
+def async_read_sessionmaker(request: Request):
+    if not AsyncReplicaSessionLocals or reads_from_primary(request):
+        return AsyncSessionLocal
+    request.state.db_replica = True
+    return AsyncReplicaSessionLocals[next_replica()]
+
+
+class ReadYourWritesMiddleware:
+    """Sets PRIMARY_COOKIE on successful writes so the client's next reads see them.
+
+    Plain ASGI middleware like QueryStatsMiddleware; only installed when replicas are
+    configured and STICKY_SECONDS is positive.
+    """
+
+    def __init__(self, app, sticky_seconds: float = STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[PRIMARY_COOKIE] = f"{time.time() + self.sticky_seconds:.3f}"
+                cookie[PRIMARY_COOKIE]["max-age"] = int(self.sticky_seconds) + 1
+                cookie[PRIMARY_COOKIE]["path"] = "/"
+                cookie[PRIMARY_COOKIE]["httponly"] = True
+                cookie[PRIMARY_COOKIE]["samesite"] = "Lax"
+                MutableHeaders(scope=message).append("Set-Cookie", cookie.output(header="").strip())
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
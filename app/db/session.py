@@ -1,9 +1,14 @@
+import itertools
 import os
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
+from app.db.instrumentation import instrument_engine
+from app.db.pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -24,6 +29,72 @@ if not DATABASE_URL or "None" in DATABASE_URL:
 
 # engine = create_engine(DATABASE_URL, echo=True)            # Uncomment this line and comment the two lines below if you want SQL logs 
 sql_echo = os.getenv("SQL_ECHO", "false").lower() == "true"
-engine = create_engine(DATABASE_URL, echo=sql_echo)
+
+# Connection pool sizing (defaults match SQLAlchemy's own)
+pool_options = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower() == "true",
+}
+
+engine = create_engine(DATABASE_URL, echo=sql_echo, poolclass=InstrumentedQueuePool, **pool_options)
+instrument_engine(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Optional read replicas (comma-separated URLs). Read-only endpoints take them in turn;
+# everything else, and every write, stays on the primary above.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+replica_engines = [
+    create_engine(url, echo=sql_echo, poolclass=InstrumentedQueuePool, **pool_options) for url in DATABASE_REPLICA_URLS
+]
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine)
+
+ReplicaSessionLocals = [sessionmaker(autocommit=False, autoflush=False, bind=replica) for replica in replica_engines]
+
+_replica_turns = itertools.count()
+
+
+def next_replica() -> int:
+    """Index of the replica to use next (round robin; itertools.count is thread-safe under the GIL)."""
+    return next(_replica_turns) % len(replica_engines)
+
+# Opt-in async mode: routes run on an AsyncSession (psycopg3's async driver) on the event loop
+# instead of in Starlette's threadpool. The sync engine above stays available either way.
+db_async = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+async_engine = None
+AsyncSessionLocal = None
+async_replica_engines = []
+AsyncReplicaSessionLocals = []
+
+if db_async:
+    async_engine = create_async_engine(
+        DATABASE_URL, echo=sql_echo, poolclass=InstrumentedAsyncAdaptedQueuePool, **pool_options
+    )
+    instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+
+    async_replica_engines = [
+        create_async_engine(url, echo=sql_echo, poolclass=InstrumentedAsyncAdaptedQueuePool, **pool_options)
+        for url in DATABASE_REPLICA_URLS
+    ]
+    for replica_engine in async_replica_engines:
+        instrument_engine(replica_engine.sync_engine)
+    AsyncReplicaSessionLocals = [async_sessionmaker(replica, autoflush=False) for replica in async_replica_engines]
+
+
+def engine_pools() -> dict:
+    """Every connection pool of this process, by the name used in /health/db/pool and /metrics."""
+    pools = {"sync": engine.pool}
+    if async_engine is not None:
+        pools["async"] = async_engine.sync_engine.pool
+    for index, replica in enumerate(replica_engines):
+        pools[f"replica{index}"] = replica.pool
+    for index, replica in enumerate(async_replica_engines):
+        pools[f"replica{index}-async"] = replica.sync_engine.pool
+    return pools
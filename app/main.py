@@ -1,12 +1,32 @@
 from fastapi import FastAPI
-from sqlalchemy import text
-from app.db.session import engine
-
-from fastapi import Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import String, and_, cast, func, select, text
+from app.db.session import engine, engine_pools, replica_engines
+from app.db.partitions import check_partitions, maintain_partitions
+from app.db.pool import pool_status
+from app.db.instrumentation import QueryStatsMiddleware
+from app.db.routing import STICKY_SECONDS, ReadYourWritesMiddleware, read_sessionmaker
+from app.cache import cached_response, response_cache, store_json
+from app.metrics import MetricsMiddleware, render_metrics, worker_metrics
+from app.serialization import DefaultJSONResponse, json_body, model_body, model_columns, page_body, row_dicts
+
+import asyncio
+import base64
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from fastapi import Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.exc import IntegrityError, DataError
 
-from app.db.deps import get_db
+from app.db.deps import db_route, get_db, get_read_db
+from app.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageParams, paginate
+from app.schemas.pagination import Page
 from app.models.user import User
 from app.schemas.user import UserCreate, UserOut
 
@@ -18,10 +38,15 @@ from app.schemas.test_case import TestCaseCreate, TestCaseOut
 from app.schemas.test_case import TestCaseUpdate
 
 from app.models.test_run import TestRun
-from app.schemas.test_run import TestRunCreate, TestRunOut
+from app.models.test_run_summary import TestRunSummary
+from app.schemas.test_run import TestRunCreate, TestRunOut, TestRunSummaryOut
 
 from app.models.test_result import TestResult
 from app.schemas.test_result import TestResultCreate, TestResultOut
+from app.schemas.test_result import TestResultBatchItem, TestResultBatchOut, TestResultImportOut
+from app.services.results import ingest_results, record_result
+from app.services.imports import ReportError, import_report, iter_request_body
+from app.services.export import EXPORT_MEDIA_TYPES, build_export_query, iter_export
 
 from app.schemas.report import TestRunReportOut, TestRunInfo, TestResultLine
 
@@ -29,9 +54,56 @@ from app.schemas.coverage import TestRunCoverageOut, CoverageLine
 
 from app.schemas.history import TestCaseHistoryOut, TestCaseHistoryLine
 
+from app.schemas.analytics import FlakinessLine, ProjectFlakinessOut, ProjectShardPlanOut
+from app.schemas.analytics import ProjectTestOrderOut, TestOrderLine
+from app.schemas.analytics import ProjectHealthOut, ProjectStatusMatrixOut
+from app.services.analytics import DEFAULT_WINDOW_RUNS, MAX_WINDOW_RUNS, project_flakiness
+from app.services.sharding import MAX_SHARDS, plan_shards
+from app.services.test_order import project_test_order
+from app.services.latest import project_health
+from app.services.matrix import (
+    DEFAULT_MATRIX_RUNS,
+    MAX_MATRIX_RUNS,
+    STATUS_CODES,
+    matrix_binary,
+    pack_cells,
+    status_matrix,
+)
+
+from app.schemas.diff import RunDiffLine, TestRunDiffOut
+from app.services.diff import diff_counts, diff_lines_query, previous_run
+
+from app.models.job import Job
+from app.schemas.job import JobCreate, JobOut
+from app.services.jobs import job_runner
+
+from app.services.live import open_run_feed, result_broker
+
+
+
+# LOG_LEVEL=INFO emits one structured line per request (route, status, DB queries and time)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING").upper(), format="%(message)s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # New runs' results must never pile up in the default partition of test_results
+    await check_partitions(engine)
+    partitions = asyncio.get_running_loop().create_task(maintain_partitions(engine))
+    # Pick up jobs left queued (or orphaned) by a previous process
+    job_runner.wake()
+    yield
+    partitions.cancel()
+    job_runner.shutdown()
+    await result_broker.close()
 
 
-app = FastAPI(title="QA Test Management API")
+app = FastAPI(title="QA Test Management API", default_response_class=DefaultJSONResponse, lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
+if replica_engines and STICKY_SECONDS > 0:
+    app.add_middleware(ReadYourWritesMiddleware)
+# Added last so it is outermost and its timings cover the other middleware too
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get("/")
@@ -48,10 +120,37 @@ def database_health_check():
     try:
         with engine.connect() as connection:
             connection.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "error": str(e)}
 
+    health = {"status": "healthy", "database": "connected"}
+    if replica_engines:
+        health["replicas"] = {f"replica{index}": _replica_health(replica) for index, replica in enumerate(replica_engines)}
+    return health
+
+
+def _replica_health(replica) -> dict:
+    try:
+        with replica.connect() as connection:
+            # NULL when the server is not a streaming standby (or hasn't replayed anything yet)
+            lag = connection.scalar(text("SELECT extract(epoch FROM now() - pg_last_xact_replay_timestamp())"))
+    except Exception as e:
+        return {"status": "unreachable", "error": str(e)}
+    return {"status": "connected", "lag_seconds": float(lag) if lag is not None else None}
+
+
+@app.get("/health/db/pool")
+def database_pool_status():
+    return {name: pool_status(pool) for name, pool in engine_pools().items()}
+
+
+# async so it runs on the event loop, the only place the per-worker counters are mutated
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    # Snapshot this worker on the event loop, which is the only thread that updates it; the
+    # other workers' snapshot files are read and parsed on a threadpool thread
+    body = await run_in_threadpool(render_metrics, worker_metrics.snapshot())
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
 
 
 # ------------------ USERS ------------------
@@ -64,15 +163,23 @@ def create_user(payload: UserCreate, db: Session = Depends(get_db)):
     return user
 
 
-@app.get("/users", response_model=list[UserOut])
-def list_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+@app.get("/users", response_model=Page[UserOut])
+def list_users(
+    project_id: int | None = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    # UserOut nests the project, so load it in the same query rather than once per user
+    query = db.query(User).options(joinedload(User.project))
+    if project_id is not None:
+        query = query.filter(User.project_id == project_id)
+
+    return paginate(query, User.id, page)
 
 
 @app.get("/users/{user_id}", response_model=UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
+    user = db.query(User).options(joinedload(User.project)).filter(User.id == user_id).first()
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -91,9 +198,9 @@ def create_project(payload: ProjectCreate, db: Session = Depends(get_db)):
     return project
 
 
-@app.get("/projects", response_model=list[ProjectOut])
-def list_projects(db: Session = Depends(get_db)):
-    return db.query(Project).all()
+@app.get("/projects", response_model=Page[ProjectOut])
+def list_projects(page: PageParams = Depends(), db: Session = Depends(get_read_db)):
+    return page_body(paginate(db.query(*model_columns(Project, ProjectOut)), Project.id, page), ProjectOut)
 
 
 
@@ -105,12 +212,28 @@ def create_test_case(payload: TestCaseCreate, db: Session = Depends(get_db)):
     db.add(test_case)
     db.commit()
     db.refresh(test_case)
+    # Coverage of every run in the project now has one more case
+    response_cache.invalidate([f"project:{test_case.project_id}"])
     return test_case
 
 
-@app.get("/test-cases", response_model=list[TestCaseOut])
-def list_test_cases(db: Session = Depends(get_db)):
-    return db.query(TestCase).all()
+@app.get("/test-cases", response_model=Page[TestCaseOut])
+def list_test_cases(
+    project_id: int | None = None,
+    is_active: bool | None = None,
+    priority: str | None = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = db.query(*model_columns(TestCase, TestCaseOut))
+    if project_id is not None:
+        query = query.filter(TestCase.project_id == project_id)
+    if is_active is not None:
+        query = query.filter(TestCase.is_active == is_active)
+    if priority is not None:
+        query = query.filter(TestCase.priority == priority)
+
+    return page_body(paginate(query, TestCase.id, page), TestCaseOut)
 
 
 @app.delete("/test-cases/{test_case_id}", status_code=204)
@@ -120,8 +243,10 @@ def delete_test_case(test_case_id: int, db: Session = Depends(get_db)):
     if not test_case:
         raise HTTPException(status_code=404, detail="Test case not found")
 
+    project_id = test_case.project_id
     db.delete(test_case)
     db.commit()
+    response_cache.invalidate([f"case:{test_case_id}", f"project:{project_id}"])
     return
 
 
@@ -143,6 +268,8 @@ def update_test_case(
 
     db.commit()
     db.refresh(test_case)
+    # Titles appear in the history of this case and in reports/coverage of every run in the project
+    response_cache.invalidate([f"case:{test_case_id}", f"project:{test_case.project_id}"])
     return test_case
 
 
@@ -157,9 +284,58 @@ def create_test_run(payload: TestRunCreate, db: Session = Depends(get_db)):
     return test_run
 
 
-@app.get("/test-runs", response_model=list[TestRunOut])
-def list_test_runs(db: Session = Depends(get_db)):
-    return db.query(TestRun).all()
+@app.get("/test-runs", response_model=Page[TestRunOut])
+def list_test_runs(
+    project_id: int | None = None,
+    environment: str | None = None,
+    started_after: datetime | None = None,
+    started_before: datetime | None = None,
+    with_summary: bool = False,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = db.query(*model_columns(TestRun, TestRunOut))
+    if project_id is not None:
+        query = query.filter(TestRun.project_id == project_id)
+    if environment is not None:
+        query = query.filter(TestRun.environment == environment)
+    if started_after is not None:
+        query = query.filter(TestRun.started_at >= started_after)
+    if started_before is not None:
+        query = query.filter(TestRun.started_at < started_before)
+
+    result = paginate(query, TestRun.id, page)
+    if not with_summary:
+        return page_body(result, TestRunOut)
+
+    # One primary-key lookup batch for the page, no scan of test_results
+    run_ids = [run.id for run in result["items"]]
+    summaries = {
+        summary.test_run_id: summary
+        for summary in db.query(TestRunSummary).filter(TestRunSummary.test_run_id.in_(run_ids))
+    }
+
+    items = row_dicts(TestRunOut, result["items"])
+    for item in items:
+        summary = summaries.get(item["id"])
+        out = TestRunSummaryOut.model_validate(summary) if summary else TestRunSummaryOut(test_run_id=item["id"])
+        item["summary"] = out.model_dump()
+
+    return json_body({"items": items, "next_after_id": result["next_after_id"]})
+
+
+@app.get("/test-runs/{run_id}/summary", response_model=TestRunSummaryOut)
+@db_route(get_read_db)
+def get_test_run_summary(run_id: int):
+    summary = (yield select(TestRunSummary).where(TestRunSummary.test_run_id == run_id)).scalar_one_or_none()
+    if summary:
+        return summary
+
+    # No results recorded yet (or not backfilled): distinguish from an unknown run
+    if (yield select(TestRun.id).where(TestRun.id == run_id)).first() is None:
+        raise HTTPException(status_code=404, detail="Test run not found")
+
+    return TestRunSummaryOut(test_run_id=run_id)
 
 
 
@@ -167,11 +343,7 @@ def list_test_runs(db: Session = Depends(get_db)):
 @app.post("/test-results", response_model=TestResultOut, status_code=201)
 def create_test_result(payload: TestResultCreate, db: Session = Depends(get_db)):
     try:
-        result = TestResult(**payload.model_dump())
-        db.add(result)
-        db.commit()
-        db.refresh(result)
-        return result
+        return record_result(db, payload)
     except IntegrityError:
         db.rollback()
         raise HTTPException(
@@ -187,145 +359,661 @@ def create_test_result(payload: TestResultCreate, db: Session = Depends(get_db))
 
 
 
-@app.get("/test-results", response_model=list[TestResultOut])
-def list_test_results(db: Session = Depends(get_db)):
-    return db.query(TestResult).all()
+async def read_batch_rows(request: Request) -> list:
+    """Parse a batch body sent either as a JSON array or as NDJSON (one result per line)."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonl" in content_type:
+        rows = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # Keep the row so it gets an "invalid" outcome at its own index
+                rows.append(None)
+        return rows
+
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body is not valid JSON.")
+
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of results.")
+
+    return rows
+
+
+_batch_item_schema = TestResultBatchItem.model_json_schema()
+
+
+@app.post(
+    "/test-runs/{run_id}/results:batch",
+    response_model=TestResultBatchOut,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": _batch_item_schema}},
+                "application/x-ndjson": {"schema": _batch_item_schema},
+            },
+        }
+    },
+)
+def create_test_results_batch(
+    run_id: int,
+    mode: Literal["insert", "upsert"] = "insert",
+    rows: list = Depends(read_batch_rows),
+    db: Session = Depends(get_db),
+):
+    run = db.query(TestRun).filter(TestRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Test run not found")
+
+    lines = ingest_results(db, run_id, rows, upsert=(mode == "upsert"))
+
+    # Built from already-validated models, so skip response_model re-validation
+    return model_body(
+        TestResultBatchOut(
+            test_run_id=run_id,
+            created=sum(1 for line in lines if line.outcome == "created"),
+            updated=sum(1 for line in lines if line.outcome == "updated"),
+            rejected=sum(1 for line in lines if line.outcome in ("duplicate", "invalid")),
+            results=lines,
+        )
+    )
+
+
+@app.post(
+    "/test-runs/{run_id}/results:import",
+    response_model=TestResultImportOut,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/xml": {"schema": {"type": "string", "description": "JUnit XML report"}},
+                "application/json": {"schema": {"type": "object", "description": "CTRF report"}},
+            },
+        }
+    },
+)
+def import_test_results(
+    request: Request,
+    run_id: int,
+    format: Literal["junit", "ctrf"] = "junit",
+    mode: Literal["insert", "upsert"] = "insert",
+    auto_create: bool = False,
+    qualified_titles: bool = False,
+    db: Session = Depends(get_db),
+):
+    # The body is parsed on this threadpool thread as it's received, so a large report
+    # never runs on the event loop
+    run = db.get(TestRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Test run not found")
+
+    try:
+        out = import_report(
+            db,
+            run,
+            iter_request_body(request),
+            format,
+            upsert=(mode == "upsert"),
+            auto_create=auto_create,
+            qualified_titles=qualified_titles,
+        )
+    except ReportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return model_body(out)
+
+
+
+@app.get("/test-results", response_model=Page[TestResultOut])
+def list_test_results(
+    run_id: int | None = None,
+    test_case_id: int | None = None,
+    status: Literal["pass", "fail", "blocked", "skipped"] | None = None,
+    project_id: int | None = None,
+    environment: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    query = db.query(*model_columns(TestResult, TestResultOut))
+    if run_id is not None:
+        query = query.filter(TestResult.test_run_id == run_id)
+    if test_case_id is not None:
+        query = query.filter(TestResult.test_case_id == test_case_id)
+    if status is not None:
+        query = query.filter(TestResult.status == status)
+    if created_after is not None:
+        query = query.filter(TestResult.created_at >= created_after)
+    if created_before is not None:
+        query = query.filter(TestResult.created_at < created_before)
+
+    # Project and environment live on the run
+    if project_id is not None or environment is not None:
+        query = query.join(TestRun, TestRun.id == TestResult.test_run_id)
+        if project_id is not None:
+            query = query.filter(TestRun.project_id == project_id)
+        if environment is not None:
+            query = query.filter(TestRun.environment == environment)
+
+    return page_body(paginate(query, TestResult.id, page), TestResultOut)
+
+
+@app.get(
+    "/test-results/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}},
+)
+def export_test_results(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    project_id: int | None = None,
+    run_id: int | None = None,
+    environment: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    stmt = build_export_query(
+        project_id=project_id,
+        run_id=run_id,
+        environment=environment,
+        created_after=created_after,
+        created_before=created_before,
+    )
+
+    return StreamingResponse(
+        iter_export(stmt, format, read_sessionmaker(request)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="test_results.{format}"'},
+    )
+
+
+
+# ------------------ LIVE FEED ------------------
+@app.get(
+    "/test-runs/{run_id}/events",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_test_run_events(
+    run_id: int,
+    request: Request,
+    after_id: int | None = Query(default=None, ge=0, description="Replay results created after this id first"),
+):
+    # EventSource sends the last event id back when it reconnects
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        after_id = int(last_event_id)
+
+    try:
+        events = await open_run_feed(run_id, after_id)
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="Live feed is unavailable")
+    if events is None:
+        raise HTTPException(status_code=404, detail="Test run not found")
+
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 
 # ------------------ TEST REPORTS ------------------
+def _report_lines(run_id: int):
+    # Build result lines with test case titles from one joined, column-only query
+    # (walking run.results -> r.test_case would lazy-load one case per result)
+    return (
+        select(
+            TestResult.id,
+            TestResult.test_case_id,
+            TestCase.title.label("test_case_title"),
+            TestResult.status,
+            TestResult.notes,
+            TestResult.duration_ms,
+            TestResult.created_at,
+        )
+        .join(TestCase, TestCase.id == TestResult.test_case_id)
+        .where(TestResult.test_run_id == run_id)
+        .order_by(TestResult.id)
+    )
+
+
+def _report_body(run: TestRun, rows) -> dict:
+    # Serialized straight from the row tuples: a TestResultLine per row dominated large reports
+    return {
+        "run": TestRunInfo.model_validate(run).model_dump(),
+        "results": row_dicts(TestResultLine, rows),
+    }
+
+
 @app.get("/test-runs/{run_id}/report", response_model=TestRunReportOut)
-def get_test_run_report(run_id: int, db: Session = Depends(get_db)):
-    run = db.query(TestRun).filter(TestRun.id == run_id).first()
+@db_route(get_read_db)
+def get_test_run_report(run_id: int, request: Request):
+    cache_key = f"report:{run_id}"
+    cached = cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    run = (yield select(TestRun).where(TestRun.id == run_id)).scalar_one_or_none()
 
     if not run:
         raise HTTPException(status_code=404, detail="Test run not found")
 
-    # Build result lines (includes test case titles via ORM relationship)
-    lines: list[TestResultLine] = []
-    for r in run.results:
-        lines.append(
-            TestResultLine(
-                id=r.id,
-                test_case_id=r.test_case_id,
-                test_case_title=r.test_case.title,
-                status=r.status,
-                notes=r.notes,
-                created_at=r.created_at,
-            )
-        )
+    # Read before querying so a write racing with this request can only make the entry stale
+    versions = response_cache.versions([f"run:{run_id}", f"project:{run.project_id}"])
+
+    rows = (yield _report_lines(run_id)).all()
+    return store_json(request, cache_key, versions, _report_body(run, rows))
+
+
+
+# ------------------ RUN DIFF ------------------
+def _run_diff_response(
+    request: Request,
+    db: Session,
+    run: TestRun,
+    base_run: TestRun,
+    change: str | None,
+    page: PageParams,
+):
+    if base_run.project_id != run.project_id:
+        raise HTTPException(status_code=422, detail="Both test runs must belong to the same project.")
+
+    cache_key = f"diff:{run.id}:{base_run.id}:{change}:{page.after_id}:{page.limit}"
+    cached = cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    versions = response_cache.versions([f"run:{run.id}", f"run:{base_run.id}", f"project:{run.project_id}"])
+
+    rows = db.execute(diff_lines_query(run.id, base_run.id, change, page.after_id).limit(page.limit + 1)).all()
+    next_after_id = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_after_id = rows[-1].test_case_id
+
+    diff = {
+        "run_id": run.id,
+        "base_run_id": base_run.id,
+        "counts": diff_counts(db, run.id, base_run.id),
+        "items": row_dicts(RunDiffLine, rows),
+        "next_after_id": next_after_id,
+    }
+    return store_json(request, cache_key, versions, diff)
+
+
+DiffChange = Literal["regression", "fixed", "not_run", "added", "changed"]
+
+
+# Declared before /diff/{base_run_id} so "previous" isn't parsed as a run id
+@app.get("/test-runs/{run_id}/diff/previous", response_model=TestRunDiffOut)
+def diff_test_run_with_previous(
+    run_id: int,
+    request: Request,
+    change: DiffChange | None = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    run = db.get(TestRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Test run not found")
+
+    base_run = previous_run(db, run)
+    if not base_run:
+        raise HTTPException(status_code=404, detail="No previous run for this project and environment")
+
+    return _run_diff_response(request, db, run, base_run, change, page)
+
 
-    return TestRunReportOut(run=run, results=lines)
+@app.get("/test-runs/{run_id}/diff/{base_run_id}", response_model=TestRunDiffOut)
+def diff_test_runs(
+    run_id: int,
+    base_run_id: int,
+    request: Request,
+    change: DiffChange | None = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_read_db),
+):
+    """Cases whose status in run_id differs from base_run_id, keyset-paged by test_case_id."""
+    run = db.get(TestRun, run_id)
+    base_run = db.get(TestRun, base_run_id)
+    if not run or not base_run:
+        raise HTTPException(status_code=404, detail="Test run not found")
+
+    return _run_diff_response(request, db, run, base_run, change, page)
 
 
 
 # ------------------ TEST COVERAGE ------------------
+def _coverage_result_join(run_id: int):
+    # Every test case of the project, paired with this run's result for it (if any)
+    return and_(TestResult.test_case_id == TestCase.id, TestResult.test_run_id == run_id)
+
+
+def _coverage_counts(run: TestRun):
+    # Counts are aggregated in the database in one pass instead of loading every row
+    return (
+        select(
+            func.count(TestCase.id).label("total"),
+            func.count(TestResult.id).label("executed"),
+            func.count(TestResult.id).filter(TestResult.status == "pass").label("pass_count"),
+            func.count(TestResult.id).filter(TestResult.status == "fail").label("fail_count"),
+            func.count(TestResult.id).filter(TestResult.status == "blocked").label("blocked_count"),
+            func.count(TestResult.id).filter(TestResult.status == "skipped").label("skipped_count"),
+        )
+        .select_from(TestCase)
+        .outerjoin(TestResult, _coverage_result_join(run.id))
+        .where(TestCase.project_id == run.project_id)
+    )
+
+
+def _coverage_lines(run: TestRun):
+    return (
+        select(
+            TestCase.id.label("test_case_id"),
+            TestCase.title,
+            func.coalesce(cast(TestResult.status, String), "not_run").label("status"),
+            TestResult.notes,
+        )
+        .outerjoin(TestResult, _coverage_result_join(run.id))
+        .where(TestCase.project_id == run.project_id)
+        .order_by(TestCase.id)
+    )
+
+
+def _coverage_body(run: TestRun, counts, rows) -> dict:
+    pass_rate = None
+    if counts.executed > 0:
+        pass_rate = counts.pass_count / counts.executed
+
+    return {
+        "run_id": run.id,
+        "project_id": run.project_id,
+        "total_cases": counts.total,
+        "executed_cases": counts.executed,
+        "not_run_cases": counts.total - counts.executed,
+        "lines": row_dicts(CoverageLine, rows) if rows is not None else None,
+        "pass_count": counts.pass_count,
+        "fail_count": counts.fail_count,
+        "blocked_count": counts.blocked_count,
+        "skipped_count": counts.skipped_count,
+        "pass_rate": pass_rate,
+    }
+
+
 @app.get("/test-runs/{run_id}/coverage", response_model=TestRunCoverageOut)
-def get_test_run_coverage(run_id: int, db: Session = Depends(get_db)):
-    run = db.query(TestRun).filter(TestRun.id == run_id).first()
+@db_route(get_read_db)
+def get_test_run_coverage(run_id: int, request: Request, summary_only: bool = False):
+    cache_key = f"coverage:{run_id}:{int(summary_only)}"
+    cached = cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    run = (yield select(TestRun).where(TestRun.id == run_id)).scalar_one_or_none()
     if not run:
         raise HTTPException(status_code=404, detail="Test run not found")
 
-    # All test cases for the project
-    test_cases = db.query(TestCase).filter(TestCase.project_id == run.project_id).all()
-
-    # All results for this run, keyed by test_case_id
-    results = db.query(TestResult).filter(TestResult.test_run_id == run_id).all()
-    results_by_case_id = {r.test_case_id: r for r in results}
-
-    lines: list[CoverageLine] = []
-    executed = 0
-    pass_count = 0
-    fail_count = 0
-    blocked_count = 0
-    skipped_count = 0
-
-
-    for tc in test_cases:
-        r = results_by_case_id.get(tc.id)
-        if r:
-            executed += 1
-            if r.status == "pass":
-                pass_count += 1
-            elif r.status == "fail":
-                fail_count += 1
-            elif r.status == "blocked":
-                blocked_count += 1
-            elif r.status == "skipped":
-                skipped_count += 1
-
-            lines.append(
-                CoverageLine(
-                    test_case_id=tc.id,
-                    title=tc.title,
-                    status=r.status,
-                    notes=r.notes,
-                )
-            )
-        else:
-            lines.append(
-                CoverageLine(
-                    test_case_id=tc.id,
-                    title=tc.title,
-                    status="not_run",
-                    notes=None,
-                )
-            )
-
-    total = len(test_cases)
-    not_run = total - executed
-    pass_rate = None
-    if executed > 0:
-        pass_rate = pass_count / executed
+    versions = response_cache.versions([f"run:{run_id}", f"project:{run.project_id}"])
 
+    counts = (yield _coverage_counts(run)).one()
+    rows = None if summary_only else (yield _coverage_lines(run)).all()
+    return store_json(request, cache_key, versions, _coverage_body(run, counts, rows))
 
-    return TestRunCoverageOut(
-        run_id=run_id,
-        project_id=run.project_id,
-        total_cases=total,
-        executed_cases=executed,
-        not_run_cases=not_run,
-        lines=lines,
-        pass_count=pass_count,
-        fail_count=fail_count,
-        blocked_count=blocked_count,
-        skipped_count=skipped_count,
-        pass_rate=pass_rate,
+
+
+# ------------------ TEST CASE HISTORY ------------------
+def _history_lines(test_case_id: int):
+    # Run details come from the same joined query instead of a lazy load per result
+    return (
+        select(
+            TestRun.id.label("run_id"),
+            TestRun.name.label("run_name"),
+            TestRun.environment,
+            TestResult.status,
+            TestResult.notes,
+            TestResult.duration_ms,
+            TestResult.created_at,
+        )
+        .join(TestRun, TestRun.id == TestResult.test_run_id)
+        .where(TestResult.test_case_id == test_case_id)
+        .order_by(TestResult.created_at.desc())
     )
 
 
+def _history_body(test_case: TestCase, rows) -> dict:
+    return {
+        "test_case_id": test_case.id,
+        "title": test_case.title,
+        "history": row_dicts(TestCaseHistoryLine, rows),
+    }
+
 
-# ------------------ TEST CASE HISTORY ------------------
 @app.get("/test-cases/{test_case_id}/history", response_model=TestCaseHistoryOut)
-def get_test_case_history(test_case_id: int, db: Session = Depends(get_db)):
-    test_case = db.query(TestCase).filter(TestCase.id == test_case_id).first()
+@db_route(get_read_db)
+def get_test_case_history(test_case_id: int, request: Request):
+    cache_key = f"history:{test_case_id}"
+    cached = cached_response(request, cache_key)
+    if cached:
+        return cached
+
+    versions = response_cache.versions([f"case:{test_case_id}"])
+
+    test_case = (yield select(TestCase).where(TestCase.id == test_case_id)).scalar_one_or_none()
     if not test_case:
         raise HTTPException(status_code=404, detail="Test case not found")
 
-    results = (
-        db.query(TestResult)
-        .filter(TestResult.test_case_id == test_case_id)
-        .order_by(TestResult.created_at.desc())
-        .all()
+    rows = (yield _history_lines(test_case_id)).all()
+    return store_json(request, cache_key, versions, _history_body(test_case, rows))
+
+
+
+# ------------------ ANALYTICS ------------------
+@app.get("/projects/{project_id}/flakiness", response_model=ProjectFlakinessOut)
+def get_project_flakiness(
+    project_id: int,
+    environment: str | None = None,
+    window_runs: int | None = Query(
+        default=None, ge=1, le=MAX_WINDOW_RUNS, description=f"Latest N runs (default {DEFAULT_WINDOW_RUNS})"
+    ),
+    window_days: int | None = Query(default=None, ge=1, description="Runs started in the last N days"),
+    min_runs: int = Query(default=2, ge=1, description="Skip cases with fewer results in the window"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # The window is the latest N runs, the last N days, or both (whichever is smaller)
+    if window_runs is None and window_days is None:
+        window_runs = DEFAULT_WINDOW_RUNS
+    since = datetime.now(timezone.utc) - timedelta(days=window_days) if window_days else None
+
+    # Sorted by a computed score, so pages are offset-based rather than keyset
+    result = project_flakiness(db, project_id, environment, window_runs, since, min_runs, offset, limit)
+
+    return json_body(
+        {
+            "project_id": project_id,
+            "environment": environment,
+            "window_runs": window_runs,
+            "window_days": window_days,
+            "run_count": result["run_count"],
+            "items": row_dicts(FlakinessLine, result["rows"]),
+            "next_offset": result["next_offset"],
+        }
     )
 
-    lines: list[TestCaseHistoryLine] = []
-    for r in results:
-        # r.test_run may be lazily loaded; SQLAlchemy will fetch it when accessed
-        run = r.test_run
-        lines.append(
-            TestCaseHistoryLine(
-                run_id=run.id,
-                run_name=run.name,
-                environment=run.environment,
-                status=r.status,
-                notes=r.notes,
-                created_at=r.created_at,
-            )
-        )
 
-    return TestCaseHistoryOut(
-        test_case_id=test_case.id,
-        title=test_case.title,
-        history=lines,
+@app.get("/projects/{project_id}/shards", response_model=ProjectShardPlanOut)
+def get_project_shard_plan(
+    project_id: int,
+    shards: int = Query(ge=1, le=MAX_SHARDS, description="Number of CI shards to split the cases into"),
+    priority: str | None = None,
+    db: Session = Depends(get_read_db),
+):
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Not cached: every result write can move a case's median duration
+    return json_body(plan_shards(db, project_id, shards, priority))
+
+
+@app.get("/projects/{project_id}/test-order", response_model=ProjectTestOrderOut)
+def get_project_test_order(
+    project_id: int,
+    by_duration: bool = Query(default=False, description="Rank by score per second of median duration"),
+    priority: str | None = None,
+    as_of: datetime | None = Query(default=None, description="Rank as of this time (default now); reuse across pages"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if as_of is None:
+        as_of = datetime.now(timezone.utc)
+    elif as_of.tzinfo is None:
+        as_of = as_of.replace(tzinfo=timezone.utc)
+
+    # Sorted by a computed score, so pages are offset-based rather than keyset
+    result = project_test_order(db, project_id, as_of, by_duration, priority, offset, limit)
+
+    return json_body(
+        {
+            "project_id": project_id,
+            "as_of": as_of,
+            "by_duration": by_duration,
+            "priority": priority,
+            "items": row_dicts(TestOrderLine, result["rows"]),
+            "next_offset": result["next_offset"],
+        }
+    )
+
+
+@app.get("/projects/{project_id}/health", response_model=ProjectHealthOut)
+def get_project_health(
+    project_id: int,
+    environment: str | None = Query(default=None, description='Only this environment ("" for runs without one)'),
+    failing_limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=0, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_read_db),
+):
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Each case's latest status is kept up to date by result writes, so this reads no results
+    return json_body({"project_id": project_id, **project_health(db, project_id, environment, failing_limit)})
+
+
+@app.get(
+    "/projects/{project_id}/status-matrix",
+    response_model=ProjectStatusMatrixOut,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+def get_project_status_matrix(
+    project_id: int,
+    environment: str | None = None,
+    runs: int = Query(default=DEFAULT_MATRIX_RUNS, ge=1, le=MAX_MATRIX_RUNS, description="Latest N runs"),
+    encoding: Literal["packed", "ints", "binary"] = "packed",
+    db: Session = Depends(get_read_db),
+):
+    if db.get(Project, project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    matrix = status_matrix(db, project_id, environment, runs)
+
+    if encoding == "binary":
+        return Response(matrix_binary(matrix), media_type="application/octet-stream")
+
+    grid, width = matrix["grid"], len(matrix["run_ids"])
+    return json_body(
+        {
+            "project_id": project_id,
+            "environment": environment,
+            "statuses": [None, *STATUS_CODES],
+            "run_ids": matrix["run_ids"],
+            "test_case_ids": matrix["test_case_ids"],
+            "encoding": encoding,
+            "packed": base64.b64encode(pack_cells(grid)).decode() if encoding == "packed" else None,
+            "rows": (
+                [list(grid[start:start + width]) for start in range(0, len(grid), width)]
+                if encoding == "ints"
+                else None
+            ),
+        }
+    )
+
+
+# ------------------ JOBS ------------------
+@app.post("/jobs", response_model=JobOut, status_code=202)
+def create_job(payload: JobCreate, response: Response, db: Session = Depends(get_db)):
+    if payload.kind == "flakiness" and db.get(Project, payload.params.project_id) is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    job = Job(kind=payload.kind, params=payload.params.model_dump(mode="json", exclude_none=True))
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    # After the commit, so the worker can see the row
+    job_runner.wake()
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+
+# Job state is read from the primary: a replica could still show a finished job as running
+@app.get("/jobs/{job_id}", response_model=JobOut)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/artifact", response_class=FileResponse)
+def download_job_artifact(job_id: int, db: Session = Depends(get_db)):
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if not os.path.exists(job.artifact_path):
+        raise HTTPException(status_code=410, detail="Artifact is no longer available")
+
+    return FileResponse(
+        job.artifact_path,
+        media_type=job.artifact_media_type,
+        filename=os.path.basename(job.artifact_path),
     )
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobOut)
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    # Row lock so a worker can't claim the job between the check and the update
+    job = db.get(Job, job_id, with_for_update=True)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = func.now()
+    elif job.status == "running":
+        # The worker stops at its next checkpoint (within JOBS_HEARTBEAT_SECONDS)
+        job.cancel_requested = True
+    else:
+        raise HTTPException(status_code=409, detail=f"Job is already {job.status}")
+
+    db.commit()
+    db.refresh(job)
+    return job
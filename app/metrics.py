@@ -0,0 +1,260 @@
+import atexit
+import json
+import os
+import time
+from bisect import bisect_left
+
+from app.cache import response_cache
+from app.db.pool import pool_status
+from app.db.session import engine_pools
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# With several uvicorn/gunicorn workers, point this at a directory shared by all of them:
+# each worker writes its snapshot there and /metrics sums every worker's file.
+MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+# Tells this process's snapshot apart from one left by an exited worker that had the same pid
+_start_token = time.time_ns()
+
+
+def _reset_start_token() -> None:
+    global _start_token
+    _start_token = time.time_ns()
+
+
+os.register_at_fork(after_in_child=_reset_start_token)
+
+
+class Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, bucket_count: int):
+        # One slot per bucket plus +Inf; stored per-bucket, made cumulative on export
+        self.counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+
+
+class WorkerMetrics:
+    """Request metrics for this worker process.
+
+    Only ever updated from the event loop thread (by MetricsMiddleware), so plain integer
+    updates need no locking and add no contention to the request path.
+    """
+
+    def __init__(self):
+        # (method, route, status) -> [latency histogram, response size histogram]
+        self.requests: dict[tuple[str, str, str], tuple[Histogram, Histogram]] = {}
+        self.in_flight = 0
+        self._last_flush = 0.0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int) -> None:
+        key = (method, route, str(status))
+        histograms = self.requests.get(key)
+        if histograms is None:
+            histograms = self.requests[key] = (Histogram(len(LATENCY_BUCKETS)), Histogram(len(SIZE_BUCKETS)))
+        latency, response_size = histograms
+        latency.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        latency.sum += seconds
+        response_size.counts[bisect_left(SIZE_BUCKETS, size)] += 1
+        response_size.sum += size
+
+        if MULTIPROC_DIR and time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+            self.flush()
+
+    def snapshot(self) -> dict:
+        pools = {name: pool_status(pool) for name, pool in engine_pools().items()}
+
+        return {
+            "pid": os.getpid(),
+            "started": _start_token,
+            "requests": [
+                [list(key), latency.counts, latency.sum, size.counts, size.sum]
+                for key, (latency, size) in self.requests.items()
+            ],
+            "in_flight": self.in_flight,
+            "pools": pools,
+            "cache": {"hits": response_cache.hits, "misses": response_cache.misses},
+        }
+
+    def flush(self) -> None:
+        """Write this worker's snapshot atomically into MULTIPROC_DIR."""
+        self._last_flush = time.monotonic()
+        _write_snapshot(self.snapshot())
+
+
+def _snapshot_path(snapshot: dict) -> str:
+    return os.path.join(MULTIPROC_DIR, f"worker-{snapshot['pid']}-{snapshot['started']}.json")
+
+
+def _write_snapshot(snapshot: dict) -> None:
+    path = _snapshot_path(snapshot)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+worker_metrics = WorkerMetrics()
+
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    atexit.register(worker_metrics.flush)
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware recording latency, response size and in-flight requests per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status_code = 500
+        size = 0
+        worker_metrics.in_flight += 1
+
+        async def send_and_measure(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            worker_metrics.in_flight -= 1
+            # Label by route template, never the raw path, to keep label cardinality bounded
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            worker_metrics.observe(scope["method"], route, status_code, time.perf_counter() - started_at, size)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _collect_snapshots(current: dict) -> list[tuple[dict, bool]]:
+    """(snapshot, is_live) for every worker; just this one unless multiprocess mode is on."""
+    if not MULTIPROC_DIR:
+        return [(current, True)]
+
+    _write_snapshot(current)
+    own_name = os.path.basename(_snapshot_path(current))
+    snapshots = [current]
+    for name in os.listdir(MULTIPROC_DIR):
+        if not name.endswith(".json") or name == own_name:
+            continue
+        try:
+            with open(os.path.join(MULTIPROC_DIR, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    # A pid reused by a new worker is alive, but only its newest snapshot belongs to a live process
+    newest = {}
+    for snapshot in snapshots:
+        newest[snapshot["pid"]] = max(newest.get(snapshot["pid"], 0), snapshot.get("started", 0))
+    return [
+        (snapshot, snapshot.get("started", 0) == newest[snapshot["pid"]] and _pid_alive(snapshot["pid"]))
+        for snapshot in snapshots
+    ]
+
+
+def _labels(**labels) -> str:
+    escaped = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _histogram_lines(name: str, buckets: tuple, series: dict) -> list[str]:
+    lines = []
+    for (method, route, status), (counts, total) in sorted(series.items()):
+        cumulative = 0
+        for bound, count in zip([*buckets, "+Inf"], counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, status=status, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route, status=status)} {total}")
+        lines.append(f"{name}_count{_labels(method=method, route=route, status=status)} {cumulative}")
+    return lines
+
+
+def render_metrics(current: dict) -> str:
+    """Prometheus text exposition of every worker's metrics, summed.
+
+    `current` is this worker's snapshot, taken on the event loop; the other workers'
+    snapshot files are read here, so call this from a thread.
+    Counters and histograms include exited workers (they must never go backwards);
+    gauges only count workers that are still alive.
+    """
+    latency: dict[tuple, tuple[list[int], float]] = {}
+    sizes: dict[tuple, tuple[list[int], float]] = {}
+    in_flight = 0
+    cache = {"hits": 0, "misses": 0}
+    pool_gauges: dict[tuple[str, str], float] = {}
+    pool_counters: dict[tuple[str, str], float] = {}
+
+    for snapshot, live in _collect_snapshots(current):
+        for key, latency_counts, latency_sum, size_counts, size_sum in snapshot["requests"]:
+            key = tuple(key)
+            for series, counts, total in ((latency, latency_counts, latency_sum), (sizes, size_counts, size_sum)):
+                existing_counts, existing_total = series.get(key, ([0] * len(counts), 0.0))
+                series[key] = ([a + b for a, b in zip(existing_counts, counts)], existing_total + total)
+
+        cache["hits"] += snapshot["cache"]["hits"]
+        cache["misses"] += snapshot["cache"]["misses"]
+
+        for pool_name, status in snapshot["pools"].items():
+            for metric in ("checkouts", "timeouts"):
+                pool_counters[(pool_name, metric)] = pool_counters.get((pool_name, metric), 0) + status[metric]
+            if live:
+                for metric in ("pool_size", "checked_out", "checked_in", "overflow"):
+                    pool_gauges[(pool_name, metric)] = pool_gauges.get((pool_name, metric), 0) + status[metric]
+
+        if live:
+            in_flight += snapshot["in_flight"]
+
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route template.",
+        "# TYPE http_request_duration_seconds histogram",
+        *_histogram_lines("http_request_duration_seconds", LATENCY_BUCKETS, latency),
+        "# HELP http_response_size_bytes Response body size by route template.",
+        "# TYPE http_response_size_bytes histogram",
+        *_histogram_lines("http_response_size_bytes", SIZE_BUCKETS, sizes),
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight}",
+        "# HELP db_pool_connections Connection pool state.",
+        "# TYPE db_pool_connections gauge",
+        *(f"db_pool_connections{_labels(pool=pool, state=state)} {value}" for (pool, state), value in sorted(pool_gauges.items())),
+        "# HELP db_pool_checkouts_total Connection checkouts, by outcome.",
+        "# TYPE db_pool_checkouts_total counter",
+        *(
+            f"db_pool_checkouts_total{_labels(pool=pool, outcome='ok' if metric == 'checkouts' else 'timeout')} {value}"
+            for (pool, metric), value in sorted(pool_counters.items())
+        ),
+        "# HELP response_cache_requests_total Response cache lookups, by result.",
+        "# TYPE response_cache_requests_total counter",
+        f'response_cache_requests_total{{result="hit"}} {cache["hits"]}',
+        f'response_cache_requests_total{{result="miss"}} {cache["misses"]}',
+        "# HELP response_cache_hit_ratio Share of response cache lookups served from the cache.",
+        "# TYPE response_cache_hit_ratio gauge",
+        f"response_cache_hit_ratio {cache['hits'] / (cache['hits'] + cache['misses']) if cache['hits'] + cache['misses'] else 0}",
+    ]
+    return "\n".join(lines) + "\n"
@@ -3,3 +3,8 @@ from app.models.project import Project
 from app.models.test_case import TestCase
 from app.models.test_run import TestRun
 from app.models.test_result import TestResult
+from app.models.test_run_summary import TestRunSummary
+from app.models.test_results_archive import TestResultsArchive
+from app.models.job import Job
+from app.models.test_case_stats import TestCaseStats
+from app.models.test_case_latest_result import TestCaseLatestResult
@@ -0,0 +1,47 @@
+from sqlalchemy import BigInteger, DateTime, Enum, Index, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+JOB_STATUS_ENUM = Enum(
+    "queued",
+    "running",
+    "succeeded",
+    "failed",
+    "cancelled",
+    name="job_status",
+)
+
+
+class Job(Base):
+    """A background export/report job. The table is also the queue workers claim jobs from."""
+
+    __tablename__ = "jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # export / flakiness (see app/services/jobs.py JOB_KINDS)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    params: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict, server_default="{}")
+
+    # queued / running / succeeded / failed / cancelled
+    status: Mapped[str] = mapped_column(JOB_STATUS_ENUM, nullable=False, default="queued", server_default="queued")
+    # Set by POST /jobs/{id}/cancel while the job runs; the worker checks it between batches
+    cancel_requested: Mapped[bool] = mapped_column(nullable=False, default=False, server_default="false")
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    artifact_path: Mapped[str | None] = mapped_column(Text, nullable=True)
+    artifact_media_type: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    artifact_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+
+    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Refreshed while running; a running job with a stale heartbeat lost its worker and is failed
+    heartbeat_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+# Workers claim the oldest queued job and look for running jobs with a stale heartbeat
+Index("ix_jobs_status_id", Job.status, Job.id)
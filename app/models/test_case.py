@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, String, Text
+from sqlalchemy import ForeignKey, Index, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -7,6 +7,12 @@ from app.db.base import Base
 class TestCase(Base):
     __tablename__ = "test_cases"
 
+    __table_args__ = (
+        Index("ix_test_cases_project_id_id", "project_id", "id"),
+        # Report imports match cases by title
+        Index("ix_test_cases_project_id_title", "project_id", "title"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
 
     project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), nullable=False)
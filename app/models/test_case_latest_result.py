@@ -0,0 +1,44 @@
+from sqlalchemy import DateTime, ForeignKey, Index, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.test_result import TEST_STATUS_ENUM
+
+
+class TestCaseLatestResult(Base):
+    """Each case's most recent result per project and environment, maintained in the same transaction as result writes.
+
+    "Most recent" is by run start (then run id), so uploading an older run's results
+    late doesn't replace a newer status.
+    """
+
+    __tablename__ = "test_case_latest_results"
+
+    __table_args__ = (
+        # Health: counts per environment and status, and the failing cases
+        Index(
+            "ix_test_case_latest_results_project_id_status_environment",
+            "project_id",
+            "status",
+            "environment",
+            "test_case_id",
+        ),
+        # Deleting a case or a run deletes its rows
+        Index("ix_test_case_latest_results_test_case_id", "test_case_id"),
+        Index("ix_test_case_latest_results_test_run_id", "test_run_id"),
+    )
+
+    project_id: Mapped[int] = mapped_column(ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    # Runs without an environment are stored under ''
+    environment: Mapped[str] = mapped_column(String(100), primary_key=True, server_default="")
+    test_case_id: Mapped[int] = mapped_column(ForeignKey("test_cases.id", ondelete="CASCADE"), primary_key=True)
+
+    test_run_id: Mapped[int] = mapped_column(ForeignKey("test_runs.id", ondelete="CASCADE"), nullable=False)
+    # test_results is partitioned, so this can't be a foreign key
+    result_id: Mapped[int] = mapped_column(nullable=False)
+    status: Mapped[str] = mapped_column(TEST_STATUS_ENUM, nullable=False)
+    run_started_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy import DateTime, Float, ForeignKey, Integer, func
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TestCaseStats(Base):
+    """Per-case statistics over recent results, maintained incrementally in the same transaction as result writes."""
+
+    __tablename__ = "test_case_stats"
+
+    test_case_id: Mapped[int] = mapped_column(ForeignKey("test_cases.id", ondelete="CASCADE"), primary_key=True)
+
+    # Durations of the latest results that reported one, oldest first (at most DURATION_WINDOW)
+    recent_durations_ms: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), nullable=False, default=list, server_default="{}"
+    )
+    median_duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    # Exponentially weighted average of recent pass (0) / fail (1) results; blocked and
+    # skipped results don't move it
+    failure_rate: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    pass_fail_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    last_failure_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, ForeignKey, String, Text, func, UniqueConstraint, Enum
+from sqlalchemy import DateTime, ForeignKey, Integer, String, Text, func, UniqueConstraint, Enum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -16,14 +16,17 @@ TEST_STATUS_ENUM = Enum(
 class TestResult(Base):
     __tablename__ = "test_results"
 
+    # Range-partitioned by test_run_id (partitions are managed in app/db/partitions.py); the
+    # partition key has to be part of every unique constraint, hence the (id, test_run_id) key.
     __table_args__ = (
         UniqueConstraint("test_run_id", "test_case_id", name="uq_test_results_run_case"),
+        {"postgresql_partition_by": "RANGE (test_run_id)"},
     )
 
 
-    id: Mapped[int] = mapped_column(primary_key=True)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
-    test_run_id: Mapped[int] = mapped_column(ForeignKey("test_runs.id"), nullable=False)
+    test_run_id: Mapped[int] = mapped_column(ForeignKey("test_runs.id"), primary_key=True)
     test_case_id: Mapped[int] = mapped_column(ForeignKey("test_cases.id"), nullable=False)
 
     # pass / fail / blocked / skipped
@@ -31,6 +34,9 @@ class TestResult(Base):
 
     notes: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Wall-clock time the test took, when the runner reported it
+    duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     test_run = relationship("TestRun", back_populates="results")
@@ -38,4 +44,8 @@ class TestResult(Base):
 
     test_case = relationship("TestCase", back_populates="results")
     test_run = relationship("TestRun")
-    
\ No newline at end of file
+
+
+# History reads filter by test_case_id and sort newest first; date-range reads filter on created_at
+Index("ix_test_results_test_case_id_created_at", TestResult.test_case_id, TestResult.created_at.desc())
+Index("ix_test_results_created_at", TestResult.created_at)
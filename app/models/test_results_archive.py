@@ -0,0 +1,23 @@
+from sqlalchemy import BigInteger, DateTime, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TestResultsArchive(Base):
+    """A test_results partition that was detached and dumped to a file (see app/db/partitions.py)."""
+
+    __tablename__ = "test_results_archives"
+
+    partition_name: Mapped[str] = mapped_column(String(100), primary_key=True)
+
+    # Covers runs with from_run_id <= id < to_run_id
+    from_run_id: Mapped[int] = mapped_column(nullable=False)
+    to_run_id: Mapped[int] = mapped_column(nullable=False)
+
+    row_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    path: Mapped[str] = mapped_column(Text, nullable=False)
+    # Of the uncompressed CSV
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    archived_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
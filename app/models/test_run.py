@@ -1,4 +1,4 @@
-from sqlalchemy import DateTime, ForeignKey, String, func
+from sqlalchemy import DateTime, ForeignKey, Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -7,12 +7,20 @@ from app.db.base import Base
 class TestRun(Base):
     __tablename__ = "test_runs"
 
+    __table_args__ = (
+        Index("ix_test_runs_project_id_id", "project_id", "id"),
+        # Most recent runs of a project (analytics windows)
+        Index("ix_test_runs_project_id_started_at", "project_id", "started_at"),
+        # Previous run in the same project and environment (run diff)
+        Index("ix_test_runs_project_id_environment_started_at", "project_id", "environment", "started_at"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
 
     project_id: Mapped[int] = mapped_column(ForeignKey("projects.id"), nullable=False)
 
     # Who executed the run (nullable for now so it's flexible early on)
-    executed_by_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    executed_by_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True, index=True)
 
     name: Mapped[str] = mapped_column(String(200), nullable=False)
 
@@ -0,0 +1,28 @@
+from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class TestRunSummary(Base):
+    """Per-run result counts, maintained incrementally in the same transaction as result writes."""
+
+    __tablename__ = "test_run_summaries"
+
+    test_run_id: Mapped[int] = mapped_column(ForeignKey("test_runs.id", ondelete="CASCADE"), primary_key=True)
+
+    executed_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    pass_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    fail_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    blocked_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    skipped_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+
+    updated_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    @property
+    def pass_rate(self) -> float | None:
+        if not self.executed_count:
+            return None
+        return self.pass_count / self.executed_count
@@ -0,0 +1,115 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+
+class FlakinessLine(BaseModel):
+    test_case_id: int
+    title: str
+    runs: int
+    pass_count: int
+    fail_count: int
+    pass_rate: float
+    # pass<->fail transitions between consecutive runs (blocked/skipped ignored)
+    flip_count: int
+    # flip_count / (pass+fail results - 1); None with fewer than two pass/fail results
+    flakiness: float | None = None
+    last_failure_at: datetime | None = None
+    last_failure_run_id: int | None = None
+
+
+class ProjectFlakinessOut(BaseModel):
+    project_id: int
+    environment: str | None = None
+    window_runs: int | None = None
+    window_days: int | None = None
+    # Runs actually inside the window
+    run_count: int
+    items: list[FlakinessLine]
+    next_offset: int | None = None
+
+
+class ShardLine(BaseModel):
+    shard: int
+    # Sum of the cases' median recent durations (estimates included)
+    duration_ms: int
+    # Cases without a recorded duration, counted at default_duration_ms
+    estimated_cases: int
+    test_case_ids: list[int]
+
+
+class ProjectShardPlanOut(BaseModel):
+    project_id: int
+    shards: int
+    priority: str | None = None
+    case_count: int
+    estimated_cases: int
+    default_duration_ms: int
+    total_duration_ms: int
+    # Expected duration of the slowest shard
+    makespan_ms: int
+    items: list[ShardLine]
+
+
+class TestOrderLine(BaseModel):
+    test_case_id: int
+    title: str
+    priority: str
+    score: float
+    failure_rate: float
+    last_failure_at: datetime | None = None
+    median_duration_ms: int | None = None
+
+
+class ProjectTestOrderOut(BaseModel):
+    project_id: int
+    # Recency is measured from here; pass it back when fetching further pages
+    as_of: datetime
+    by_duration: bool
+    priority: str | None = None
+    items: list[TestOrderLine]
+    next_offset: int | None = None
+
+
+class HealthEnvironmentLine(BaseModel):
+    environment: str | None = None
+    # Cases with a latest result in this environment, then split by that result's status
+    executed_count: int
+    pass_count: int
+    fail_count: int
+    blocked_count: int
+    skipped_count: int
+    # pass_count / executed_count
+    pass_rate: float | None = None
+
+
+class FailingCaseLine(BaseModel):
+    test_case_id: int
+    title: str
+    environment: str | None = None
+    test_run_id: int
+    result_id: int
+    run_started_at: datetime
+
+
+class ProjectHealthOut(BaseModel):
+    project_id: int
+    environments: list[HealthEnvironmentLine]
+    # Cases whose latest result is a failure, by environment then case id; at most failing_limit
+    failing: list[FailingCaseLine]
+    failing_count: int
+
+
+class ProjectStatusMatrixOut(BaseModel):
+    project_id: int
+    environment: str | None = None
+    # Status of each code: index 0 (no result) is None
+    statuses: list[str | None]
+    # Columns, oldest run first
+    run_ids: list[int]
+    # Rows, by id
+    test_case_ids: list[int]
+    encoding: str
+    # encoding=packed: base64 of the cells, row-major, 3 bits each (see app/services/matrix.py)
+    packed: str | None = None
+    # encoding=ints: one list of codes per case
+    rows: list[list[int]] | None = None
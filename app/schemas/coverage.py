@@ -14,7 +14,8 @@ class TestRunCoverageOut(BaseModel):
     total_cases: int
     executed_cases: int
     not_run_cases: int
-    lines: list[CoverageLine]
+    # None when requested with ?summary_only=true
+    lines: list[CoverageLine] | None = None
     pass_count: int
     fail_count: int
     blocked_count: int
@@ -0,0 +1,28 @@
+from typing import Literal
+from pydantic import BaseModel
+
+
+class RunDiffLine(BaseModel):
+    test_case_id: int
+    title: str
+    change: Literal["regression", "fixed", "not_run", "added", "changed"]
+    # None when the case has no result in that run
+    base_status: str | None = None
+    status: str | None = None
+    notes: str | None = None
+
+
+class RunDiffCounts(BaseModel):
+    regression: int = 0
+    fixed: int = 0
+    not_run: int = 0
+    added: int = 0
+    changed: int = 0
+
+
+class TestRunDiffOut(BaseModel):
+    run_id: int
+    base_run_id: int
+    counts: RunDiffCounts
+    items: list[RunDiffLine]
+    next_after_id: int | None = None
@@ -8,6 +8,7 @@ class TestCaseHistoryLine(BaseModel):
     environment: str | None = None
     status: str
     notes: str | None = None
+    duration_ms: int | None = None
     created_at: datetime
 
 
@@ -0,0 +1,53 @@
+from datetime import datetime
+from typing import Annotated, Literal
+
+from pydantic import BaseModel, Field
+
+
+class ExportJobParams(BaseModel):
+    # Same filters as GET /test-results/export
+    format: Literal["ndjson", "csv"] = "ndjson"
+    project_id: int | None = None
+    run_id: int | None = None
+    environment: str | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+
+
+class FlakinessJobParams(BaseModel):
+    # Same window as GET /projects/{project_id}/flakiness, without its run cap or paging
+    project_id: int
+    environment: str | None = None
+    window_runs: int | None = Field(default=None, ge=1)
+    window_days: int | None = Field(default=None, ge=1)
+    min_runs: int = Field(default=2, ge=1)
+
+
+class ExportJobCreate(BaseModel):
+    kind: Literal["export"]
+    params: ExportJobParams = Field(default_factory=ExportJobParams)
+
+
+class FlakinessJobCreate(BaseModel):
+    kind: Literal["flakiness"]
+    params: FlakinessJobParams
+
+
+JobCreate = Annotated[ExportJobCreate | FlakinessJobCreate, Field(discriminator="kind")]
+
+
+class JobOut(BaseModel):
+    id: int
+    kind: str
+    params: dict
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"]
+    cancel_requested: bool = False
+    error: str | None = None
+    artifact_media_type: str | None = None
+    artifact_bytes: int | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,11 @@
+from typing import Generic, TypeVar
+from pydantic import BaseModel
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    # Pass as ?after_id= to fetch the next page; null on the last page
+    next_after_id: int | None = None
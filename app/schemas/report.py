@@ -20,6 +20,7 @@ class TestResultLine(BaseModel):
     test_case_title: str
     status: str
     notes: str | None = None
+    duration_ms: int | None = None
     created_at: datetime
 
 
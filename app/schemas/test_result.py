@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Literal
 
 
@@ -8,6 +8,7 @@ class TestResultCreate(BaseModel):
     test_case_id: int
     status: Literal["pass", "fail", "blocked", "skipped"]
     notes: str | None = None
+    duration_ms: int | None = Field(default=None, ge=0, le=2**31 - 1)
 
 
 class TestResultOut(BaseModel):
@@ -16,7 +17,54 @@ class TestResultOut(BaseModel):
     test_case_id: int
     status: Literal["pass", "fail", "blocked", "skipped"]
     notes: str | None = None
+    duration_ms: int | None = None
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class TestResultBatchItem(BaseModel):
+    test_case_id: int
+    # Validated per row by the batch endpoint so one bad status doesn't reject the whole upload
+    status: str
+    notes: str | None = None
+    duration_ms: int | None = Field(default=None, ge=0, le=2**31 - 1)
+
+
+class TestResultBatchLine(BaseModel):
+    index: int
+    test_case_id: int | None = None
+    outcome: Literal["created", "updated", "duplicate", "invalid"]
+    result_id: int | None = None
+    detail: str | None = None
+
+
+class TestResultBatchOut(BaseModel):
+    test_run_id: int
+    created: int
+    updated: int
+    rejected: int
+    results: list[TestResultBatchLine]
+
+
+class TestResultImportLine(BaseModel):
+    # Position of the test in the report
+    index: int
+    title: str | None = None
+    outcome: Literal["duplicate", "invalid", "unmatched"]
+    detail: str | None = None
+
+
+class TestResultImportOut(BaseModel):
+    test_run_id: int
+    format: Literal["junit", "ctrf"]
+    parsed: int
+    created: int
+    updated: int
+    rejected: int
+    # Tests whose title matches no test case of the project (auto_create off)
+    unmatched: int
+    cases_created: int
+    # The first problems only; the counts above cover every test
+    problems: list[TestResultImportLine]
@@ -9,6 +9,20 @@ class TestRunCreate(BaseModel):
     environment: str | None = None
 
 
+class TestRunSummaryOut(BaseModel):
+    test_run_id: int
+    executed_count: int = 0
+    pass_count: int = 0
+    fail_count: int = 0
+    blocked_count: int = 0
+    skipped_count: int = 0
+    pass_rate: float | None = None
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
 class TestRunOut(BaseModel):
     id: int
     project_id: int
@@ -17,6 +31,8 @@ class TestRunOut(BaseModel):
     environment: str | None = None
     started_at: datetime
     completed_at: datetime | None = None
+    # Only populated by GET /test-runs?with_summary=true
+    summary: TestRunSummaryOut | None = None
 
     class Config:
         from_attributes = True
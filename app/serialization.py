@@ -0,0 +1,57 @@
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+# OPT_UTC_Z keeps datetimes byte-identical to Pydantic's output ("...Z" rather than "+00:00")
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+class DefaultJSONResponse(ORJSONResponse):
+    """App-wide response class: orjson instead of the stdlib encoder."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, option=ORJSON_OPTIONS)
+
+
+def model_columns(entity, model: type[BaseModel]) -> list:
+    """The entity's columns named like the model's fields, in field order, for column-only queries."""
+    mapped = entity.__mapper__.columns
+    return [getattr(entity, name) for name in model.model_fields if name in mapped]
+
+
+def row_dicts(model: type[BaseModel], rows) -> list[dict]:
+    """Turn column-only query rows into dicts shaped like `model`, without building model instances.
+
+    Keys come from the selected column names; model fields that were not selected get their
+    defaults. Only use this for values the database already constrains to the model's types.
+    """
+    if not rows:
+        return []
+    names = rows[0]._fields
+    missing = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in model.model_fields.items()
+        if name not in names
+    }
+    return [{**dict(zip(names, row)), **missing} for row in rows]
+
+
+def json_body(content) -> Response:
+    """Send already-serializable content without response_model re-validation."""
+    return Response(content=dumps(content), media_type="application/json")
+
+
+def model_body(model: BaseModel) -> Response:
+    """Send a model the endpoint already built, skipping FastAPI's validate-then-serialize pass."""
+    return Response(content=model.model_dump_json(), media_type="application/json")
+
+
+def page_body(page: dict, model: type[BaseModel]) -> Response:
+    """Send a paginate() result over column-only rows as a Page[model]."""
+    return json_body({"items": row_dicts(model, page["items"]), "next_after_id": page["next_after_id"]})
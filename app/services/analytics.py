@@ -0,0 +1,139 @@
+from datetime import datetime
+
+from sqlalchemy import ARRAY, Float, Integer, Select, cast, func, nulls_last, select, type_coerce
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.orm import Session
+
+from app.models.test_case import TestCase
+from app.models.test_result import TestResult
+from app.models.test_run import TestRun
+
+
+DEFAULT_WINDOW_RUNS = 20
+MAX_WINDOW_RUNS = 500
+
+
+def window_runs_query(
+    project_id: int,
+    environment: str | None = None,
+    window_runs: int | None = None,
+    since: datetime | None = None,
+) -> Select:
+    """The project's most recent runs (id, started_at), newest first.
+
+    Served by ix_test_runs_project_id_started_at, so it only touches the rows it returns.
+    """
+    stmt = select(TestRun.id, TestRun.started_at).where(TestRun.project_id == project_id)
+    if environment is not None:
+        stmt = stmt.where(TestRun.environment == environment)
+    if since is not None:
+        stmt = stmt.where(TestRun.started_at >= since)
+    stmt = stmt.order_by(TestRun.started_at.desc(), TestRun.id.desc())
+    if window_runs is not None:
+        stmt = stmt.limit(window_runs)
+    return stmt
+
+
+def flakiness_query(
+    project_id: int,
+    environment: str | None = None,
+    window_runs: int | None = DEFAULT_WINDOW_RUNS,
+    since: datetime | None = None,
+    min_runs: int = 2,
+) -> Select:
+    """Per-case pass rate, pass<->fail flips and last failure over a window of recent runs.
+
+    One statement: the window of runs is resolved first (index range scan), then only the
+    results of those runs are read through uq_test_results_run_case, so the cost depends on
+    the window size rather than on the project's full history. Sorted flakiest first.
+    """
+    runs = window_runs_query(project_id, environment, window_runs, since).cte("window_runs")
+
+    # Partitioning by "is pass/fail" makes LAG skip blocked/skipped results, so
+    # pass, skipped, fail still counts as one flip.
+    decisive = TestResult.status.in_(("pass", "fail"))
+    ordered = (
+        select(
+            TestResult.test_case_id,
+            TestResult.test_run_id,
+            TestResult.status,
+            runs.c.started_at,
+            decisive.label("decisive"),
+            func.lag(TestResult.status)
+            .over(partition_by=(TestResult.test_case_id, decisive), order_by=(runs.c.started_at, runs.c.id))
+            .label("previous_status"),
+        )
+        .select_from(TestResult)
+        .join(runs, runs.c.id == TestResult.test_run_id)
+        .subquery("ordered")
+    )
+
+    decisive_count = func.count().filter(ordered.c.decisive)
+    flip_count = func.count().filter(ordered.c.decisive, ordered.c.status != ordered.c.previous_status)
+    failed = ordered.c.status == "fail"
+    per_case = (
+        select(
+            ordered.c.test_case_id,
+            func.count().label("runs"),
+            func.count().filter(ordered.c.status == "pass").label("pass_count"),
+            func.count().filter(failed).label("fail_count"),
+            flip_count.label("flip_count"),
+            # Flips per pass/fail transition opportunity: 1.0 alternates on every run
+            (cast(flip_count, Float) / cast(func.nullif(func.greatest(decisive_count - 1, 0), 0), Float)).label("flakiness"),
+            func.max(ordered.c.started_at).filter(failed).label("last_failure_at"),
+            type_coerce(
+                array_agg(aggregate_order_by(ordered.c.test_run_id, ordered.c.started_at.desc())).filter(failed),
+                ARRAY(Integer),
+            )[1].label("last_failure_run_id"),
+        )
+        .group_by(ordered.c.test_case_id)
+        .having(func.count() >= min_runs)
+        .subquery("per_case")
+    )
+
+    return (
+        select(
+            per_case.c.test_case_id,
+            TestCase.title,
+            per_case.c.runs,
+            per_case.c.pass_count,
+            per_case.c.fail_count,
+            (cast(per_case.c.pass_count, Float) / cast(per_case.c.runs, Float)).label("pass_rate"),
+            per_case.c.flip_count,
+            per_case.c.flakiness,
+            per_case.c.last_failure_at,
+            per_case.c.last_failure_run_id,
+        )
+        .join(TestCase, TestCase.id == per_case.c.test_case_id)
+        .order_by(
+            nulls_last(per_case.c.flakiness.desc()),
+            per_case.c.fail_count.desc(),
+            per_case.c.test_case_id,
+        )
+    )
+
+
+def project_flakiness(
+    db: Session,
+    project_id: int,
+    environment: str | None,
+    window_runs: int | None,
+    since: datetime | None,
+    min_runs: int,
+    offset: int,
+    limit: int,
+) -> dict:
+    """One page of flakiness lines plus the number of runs in the window."""
+    run_count = db.scalar(
+        select(func.count()).select_from(window_runs_query(project_id, environment, window_runs, since).subquery())
+    )
+
+    stmt = flakiness_query(project_id, environment, window_runs, since, min_runs)
+    rows = db.execute(stmt.offset(offset).limit(limit + 1)).all()
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+
+    return {"run_count": run_count, "rows": rows, "next_offset": next_offset}
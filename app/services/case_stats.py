@@ -0,0 +1,179 @@
+import os
+from typing import NamedTuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer, String
+
+
+# Recent durations kept per case; the median over them is what shard planning uses
+DURATION_WINDOW = int(os.getenv("DURATION_WINDOW_RESULTS", "20"))
+# Weight of the newest pass/fail result in a case's failure rate (an exponentially weighted average)
+FAILURE_RATE_ALPHA = float(os.getenv("FAILURE_RATE_ALPHA", "0.3"))
+# Results per case the rebuild reads: older ones would weigh less than (1 - alpha)^100
+REBUILD_FAILURE_RESULTS = 100
+
+
+class ResultSample(NamedTuple):
+    test_case_id: int
+    status: str
+    duration_ms: int | None
+    # None for a newly inserted result, otherwise the status it overwrote
+    previous_status: str | None = None
+
+
+_APPLY_SAMPLES = text(
+    """
+    INSERT INTO test_case_stats AS stats
+        (test_case_id, recent_durations_ms, failure_rate, pass_fail_count, last_failure_at)
+    SELECT test_case_id,
+           CASE WHEN duration_ms IS NULL THEN '{}'::int[] ELSE ARRAY[duration_ms] END,
+           CASE WHEN status = 'fail' THEN 1.0 ELSE 0.0 END,
+           CASE WHEN status IN ('pass', 'fail') THEN 1 ELSE 0 END,
+           CASE WHEN status = 'fail' THEN now() END
+    FROM unnest(:case_ids, :statuses, :durations) AS s(test_case_id, status, duration_ms)
+    ORDER BY test_case_id
+    ON CONFLICT (test_case_id) DO UPDATE SET
+        recent_durations_ms = (stats.recent_durations_ms || excluded.recent_durations_ms)[
+            greatest(cardinality(stats.recent_durations_ms) + cardinality(excluded.recent_durations_ms) - :window + 1, 1):
+        ],
+        -- blocked/skipped leave the rate alone; the first pass/fail result sets it outright
+        failure_rate = CASE
+            WHEN excluded.pass_fail_count = 0 THEN stats.failure_rate
+            WHEN stats.pass_fail_count = 0 THEN excluded.failure_rate
+            ELSE :alpha * excluded.failure_rate + (1 - :alpha) * stats.failure_rate
+        END,
+        pass_fail_count = stats.pass_fail_count + excluded.pass_fail_count,
+        last_failure_at = coalesce(excluded.last_failure_at, stats.last_failure_at),
+        updated_at = now()
+    """
+).bindparams(
+    bindparam("case_ids", type_=ARRAY(Integer)),
+    bindparam("statuses", type_=ARRAY(String)),
+    bindparam("durations", type_=ARRAY(Integer)),
+)
+
+_MEDIAN = "(SELECT round(percentile_cont(0.5) WITHIN GROUP (ORDER BY d))::int FROM unnest(recent_durations_ms) AS d)"
+
+_REFRESH_MEDIANS = text(
+    f"UPDATE test_case_stats SET median_duration_ms = {_MEDIAN} WHERE test_case_id = ANY(:case_ids)"
+).bindparams(bindparam("case_ids", type_=ARRAY(Integer)))
+
+
+def apply_result_samples(db: Session, samples: list[ResultSample]) -> None:
+    """Fold written results, in write order, into their cases' statistics.
+
+    Each new result adds its duration to the case's recent durations (refreshing the
+    median) and a pass/fail result moves its failure rate. An overwritten result can't be
+    folded in: its old status and duration are already counted, at its place among the
+    case's results. Those cases are recomputed from test_results instead, as
+    rebuild_case_stats would. Every statement is a single INSERT ... ON CONFLICT DO UPDATE
+    with rows locked in case id order, so concurrent writers don't lose samples. Does not
+    commit; call inside the result write transaction.
+    """
+    overwritten = sorted({sample.test_case_id for sample in samples if sample.previous_status is not None})
+    samples = [sample for sample in samples if sample.previous_status is None]
+
+    # ON CONFLICT can touch a row only once per statement: one round per repeat of a case
+    rounds: list[list[ResultSample]] = []
+    seen: dict[int, int] = {}
+    for sample in samples:
+        repeat = seen.get(sample.test_case_id, 0)
+        seen[sample.test_case_id] = repeat + 1
+        if repeat == len(rounds):
+            rounds.append([])
+        rounds[repeat].append(sample)
+
+    for batch in rounds:
+        db.execute(
+            _APPLY_SAMPLES,
+            {
+                "case_ids": [sample.test_case_id for sample in batch],
+                "statuses": [sample.status for sample in batch],
+                "durations": [sample.duration_ms for sample in batch],
+                "window": DURATION_WINDOW,
+                "alpha": FAILURE_RATE_ALPHA,
+            },
+        )
+
+    timed = sorted({sample.test_case_id for sample in samples if sample.duration_ms is not None})
+    if timed:
+        db.execute(_REFRESH_MEDIANS, {"case_ids": timed})
+
+    if overwritten:
+        _recompute(db, "AND r.test_case_id = ANY(:case_ids)", {"case_ids": overwritten})
+
+
+def _recompute(db: Session, case_filter: str, params: dict) -> int:
+    """Recompute the statistics of the cases matching `case_filter` from test_results; returns their number."""
+    stmt = text(
+        f"""
+        WITH ordered AS (
+            SELECT r.test_case_id, r.status, r.duration_ms, r.created_at,
+                   row_number() OVER (
+                       PARTITION BY r.test_case_id, r.duration_ms IS NOT NULL ORDER BY r.created_at DESC, r.id DESC
+                   ) AS newest_timed,
+                   row_number() OVER (
+                       PARTITION BY r.test_case_id, r.status IN ('pass', 'fail') ORDER BY r.created_at DESC, r.id DESC
+                   ) AS newest_decisive,
+                   count(*) FILTER (WHERE r.status IN ('pass', 'fail')) OVER (PARTITION BY r.test_case_id) AS decisive,
+                   r.id
+            FROM test_results r
+            JOIN test_cases tc ON tc.id = r.test_case_id
+            WHERE true {case_filter}
+        )
+        INSERT INTO test_case_stats
+            (test_case_id, recent_durations_ms, median_duration_ms, failure_rate, pass_fail_count, last_failure_at, updated_at)
+        SELECT test_case_id,
+               coalesce(
+                   array_agg(duration_ms ORDER BY created_at, id)
+                       FILTER (WHERE duration_ms IS NOT NULL AND newest_timed <= :window),
+                   '{{}}'
+               ),
+               round(percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms)
+                   FILTER (WHERE duration_ms IS NOT NULL AND newest_timed <= :window))::int,
+               -- The incremental average in closed form: the oldest counted result seeds it
+               -- with weight (1-a)^(n-1), the k-th newest adds a(1-a)^(k-1)
+               coalesce(sum(
+                   CASE WHEN status = 'fail' THEN
+                       CASE WHEN newest_decisive = least(decisive, :depth)
+                            THEN power(1 - :alpha, newest_decisive - 1)
+                            ELSE :alpha * power(1 - :alpha, newest_decisive - 1) END
+                   ELSE 0 END
+               ) FILTER (WHERE status IN ('pass', 'fail') AND newest_decisive <= :depth), 0),
+               count(*) FILTER (WHERE status IN ('pass', 'fail')),
+               max(created_at) FILTER (WHERE status = 'fail'),
+               now()
+        FROM ordered
+        GROUP BY test_case_id
+        -- Same lock order as _APPLY_SAMPLES
+        ORDER BY test_case_id
+        ON CONFLICT (test_case_id) DO UPDATE SET
+            recent_durations_ms = excluded.recent_durations_ms,
+            median_duration_ms = excluded.median_duration_ms,
+            failure_rate = excluded.failure_rate,
+            pass_fail_count = excluded.pass_fail_count,
+            last_failure_at = excluded.last_failure_at,
+            updated_at = excluded.updated_at
+        RETURNING 1
+        """
+    )
+    if "case_ids" in params:
+        stmt = stmt.bindparams(bindparam("case_ids", type_=ARRAY(Integer)))
+    params = {**params, "window": DURATION_WINDOW, "alpha": FAILURE_RATE_ALPHA, "depth": REBUILD_FAILURE_RESULTS}
+    return len(db.execute(stmt, params).all())
+
+
+def rebuild_case_stats(db: Session, project_id: int | None = None) -> int:
+    """Recompute every statistic from test_results (backfill / repair).
+
+    Returns the number of cases rebuilt. Scans the results of every case, so this is
+    for maintenance, not the request path.
+    """
+    if project_id is None:
+        rebuilt = _recompute(db, "", {})
+    else:
+        rebuilt = _recompute(db, "AND tc.project_id = :project_id", {"project_id": project_id})
+    db.commit()
+    return rebuilt
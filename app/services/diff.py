@@ -0,0 +1,96 @@
+from sqlalchemy import Select, and_, case, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.test_case import TestCase
+from app.models.test_result import TestResult
+from app.models.test_run import TestRun
+
+
+# regression: now failing (and wasn't)      fixed: now passing, was failing
+# not_run: had a result in the base run only  added: first result, not a failure
+# changed: any other status change (e.g. pass -> skipped)
+DIFF_CHANGES = ("regression", "fixed", "not_run", "added", "changed")
+
+
+def previous_run(db: Session, run: TestRun) -> TestRun | None:
+    """The run started just before `run` in the same project and environment."""
+    return (
+        db.query(TestRun)
+        .filter(
+            TestRun.project_id == run.project_id,
+            TestRun.environment.is_not_distinct_from(run.environment),
+            or_(
+                TestRun.started_at < run.started_at,
+                and_(TestRun.started_at == run.started_at, TestRun.id < run.id),
+            ),
+        )
+        .order_by(TestRun.started_at.desc(), TestRun.id.desc())
+        .first()
+    )
+
+
+def _diff_join(run_id: int, base_run_id: int):
+    """(case_id, change, head, base, from_clause) for the changed cases between two runs.
+
+    A single FULL OUTER JOIN on test_case_id of the two runs' results; both sides are read in
+    test_case_id order from uq_test_results_run_case, so nothing is loaded into Python.
+    """
+    def results(of_run_id: int, name: str):
+        return (
+            select(TestResult.test_case_id, TestResult.status, TestResult.notes)
+            .where(TestResult.test_run_id == of_run_id)
+            .subquery(name)
+        )
+
+    head = results(run_id, "head")
+    base = results(base_run_id, "base")
+    case_id = func.coalesce(head.c.test_case_id, base.c.test_case_id)
+    change = case(
+        (head.c.test_case_id.is_(None), "not_run"),
+        (head.c.status == "fail", "regression"),
+        (and_(base.c.status == "fail", head.c.status == "pass"), "fixed"),
+        (base.c.test_case_id.is_(None), "added"),
+        else_="changed",
+    )
+    joined = head.join(base, head.c.test_case_id == base.c.test_case_id, full=True)
+    return case_id, change, head, base, joined
+
+
+def diff_counts(db: Session, run_id: int, base_run_id: int) -> dict[str, int]:
+    case_id, change, head, base, joined = _diff_join(run_id, base_run_id)
+    rows = db.execute(
+        select(change.label("change"), func.count())
+        .select_from(joined)
+        .where(head.c.status.is_distinct_from(base.c.status))
+        .group_by(change)
+    ).all()
+    return {**dict.fromkeys(DIFF_CHANGES, 0), **dict(rows)}
+
+
+def diff_lines_query(
+    run_id: int,
+    base_run_id: int,
+    change_filter: str | None = None,
+    after_id: int | None = None,
+) -> Select:
+    """Changed cases ordered by test case id (keyset-pageable on test_case_id)."""
+    case_id, change, head, base, joined = _diff_join(run_id, base_run_id)
+    stmt = (
+        select(
+            case_id.label("test_case_id"),
+            TestCase.title,
+            change.label("change"),
+            base.c.status.label("base_status"),
+            head.c.status.label("status"),
+            head.c.notes,
+        )
+        .select_from(joined)
+        .join(TestCase, TestCase.id == case_id)
+        .where(head.c.status.is_distinct_from(base.c.status))
+        .order_by(case_id)
+    )
+    if change_filter is not None:
+        stmt = stmt.where(change == change_filter)
+    if after_id is not None:
+        stmt = stmt.where(case_id > after_id)
+    return stmt
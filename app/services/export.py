@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db.session import SessionLocal
+from app.models.test_case import TestCase
+from app.models.test_result import TestResult
+from app.models.test_run import TestRun
+
+
+# Rows fetched per round trip from the server-side cursor (and emitted per chunk)
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id",
+    "test_run_id",
+    "run_name",
+    "project_id",
+    "environment",
+    "test_case_id",
+    "test_case_title",
+    "status",
+    "notes",
+    "duration_ms",
+    "created_at",
+]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def build_export_query(
+    project_id: int | None = None,
+    run_id: int | None = None,
+    environment: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+):
+    # Column-only select: rows come back as tuples, no ORM identity map to grow
+    stmt = (
+        select(
+            TestResult.id,
+            TestResult.test_run_id,
+            TestRun.name.label("run_name"),
+            TestRun.project_id,
+            TestRun.environment,
+            TestResult.test_case_id,
+            TestCase.title.label("test_case_title"),
+            TestResult.status,
+            TestResult.notes,
+            TestResult.duration_ms,
+            TestResult.created_at,
+        )
+        .join(TestRun, TestRun.id == TestResult.test_run_id)
+        .join(TestCase, TestCase.id == TestResult.test_case_id)
+        .order_by(TestResult.id)
+    )
+
+    if project_id is not None:
+        stmt = stmt.where(TestRun.project_id == project_id)
+    if run_id is not None:
+        stmt = stmt.where(TestResult.test_run_id == run_id)
+    if environment is not None:
+        stmt = stmt.where(TestRun.environment == environment)
+    if created_after is not None:
+        stmt = stmt.where(TestResult.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(TestResult.created_at < created_before)
+
+    return stmt
+
+
+def _encode_ndjson(rows) -> bytes:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["created_at"] = record["created_at"].isoformat()
+        lines.append(json.dumps(record))
+    return ("\n".join(lines) + "\n").encode()
+
+
+def _encode_csv(rows, include_header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+    return buffer.getvalue().encode()
+
+
+def iter_export(stmt, fmt: str, session_factory=SessionLocal):
+    """Yield the export as encoded chunks, one per cursor batch.
+
+    Uses its own session (from `session_factory`, e.g. a read replica's) so the server-side
+    cursor outlives the request handler, and yield_per so only EXPORT_BATCH_SIZE rows are
+    in memory at any time.
+    """
+    with session_factory() as db:
+        result = db.execute(stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE})
+
+        if fmt == "csv":
+            # Header goes out even when the export is empty
+            first = True
+            for rows in result.partitions():
+                yield _encode_csv(rows, include_header=first)
+                first = False
+            if first:
+                yield _encode_csv([], include_header=True)
+        else:
+            for rows in result.partitions():
+                yield _encode_ndjson(rows)
@@ -0,0 +1,397 @@
+"""Streaming import of JUnit XML and CTRF JSON reports into a test run.
+
+The upload is parsed as it arrives: JUnit with an XMLPullParser whose finished
+<testcase> elements are dropped from the tree, CTRF by decoding one entry of its
+`results.tests` array at a time. Parsed results are matched to test cases by title and
+written through ingest_results every BATCH_CHUNK_SIZE rows, each chunk in its own
+transaction, so memory is bounded by the chunk size rather than the size of the report.
+"""
+import codecs
+import json
+import zlib
+from itertools import islice
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+import anyio.from_thread
+from fastapi import Request
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.cache import response_cache
+from app.models.test_case import TestCase
+from app.models.test_run import TestRun
+from app.schemas.test_result import TestResultImportLine, TestResultImportOut
+from app.services.results import BATCH_CHUNK_SIZE, ingest_results
+
+
+REPORT_FORMATS = ("junit", "ctrf")
+
+TITLE_MAX_LENGTH = TestCase.__table__.c.title.type.length
+# Failure messages can carry whole stack traces; keep the start of them as the result's notes
+NOTES_MAX_CHARS = 4000
+# Largest duration test_results.duration_ms (an integer column) can hold
+MAX_DURATION_MS = 2**31 - 1
+# Problems listed in the response; the rest are only counted
+MAX_REPORTED_PROBLEMS = 100
+# A single CTRF test entry larger than this is rejected rather than buffered
+CTRF_MAX_ENTRY_BYTES = 16 * 1024 * 1024
+# Inflated bytes handed to the parser at a time for gzip uploads
+INFLATE_CHUNK_BYTES = 1 << 20
+# First key of pg_advisory_xact_lock(int, int) for auto-creating a project's test cases
+CASE_CREATE_LOCK = 0x7154
+
+CTRF_STATUSES = {"passed": "pass", "failed": "fail", "skipped": "skipped", "pending": "skipped", "other": "blocked"}
+
+
+class ReportError(ValueError):
+    """The upload isn't a well-formed report of the declared format."""
+
+
+def iter_request_body(request: Request):
+    """Iterate a request body from a threadpool endpoint, one received chunk at a time.
+
+    Each chunk is awaited on the event loop, so reading keeps the client's upload
+    backpressured and the body is never buffered whole. Gzip request bodies are inflated.
+    """
+    stream = request.stream()
+
+    def received():
+        while True:
+            try:
+                chunk = anyio.from_thread.run(stream.__anext__)
+            except StopAsyncIteration:
+                return
+            if chunk:
+                yield chunk
+
+    if request.headers.get("content-encoding", "").lower() != "gzip":
+        yield from received()
+        return
+
+    inflater = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    try:
+        for chunk in received():
+            # Bounded output per call, so a small compressed upload can't inflate all at once
+            while chunk:
+                yield inflater.decompress(chunk, INFLATE_CHUNK_BYTES)
+                chunk = inflater.unconsumed_tail
+    except zlib.error as e:
+        raise ReportError(f"Invalid gzip body: {e}")
+
+
+def _notes(text: str | None) -> str | None:
+    text = (text or "").strip()
+    return text[:NOTES_MAX_CHARS] or None
+
+
+def _duration_ms(value, scale: float) -> int | None:
+    """A reported duration converted to whole milliseconds; None when missing or unusable."""
+    try:
+        duration = round(float(value) * scale)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return duration if 0 <= duration <= MAX_DURATION_MS else None
+
+
+def _junit_result(case, qualified_titles: bool) -> dict:
+    name = case.get("name", "")
+    classname = case.get("classname")
+    title = f"{classname}.{name}" if qualified_titles and classname else name
+
+    status, notes = "pass", None
+    for child in case:
+        if child.tag in ("failure", "error"):
+            status, notes = "fail", _notes(child.get("message") or child.text)
+            break
+        if child.tag == "skipped":
+            status, notes = "skipped", _notes(child.get("message") or child.text)
+    # JUnit reports seconds
+    return {"title": title, "status": status, "notes": notes, "duration_ms": _duration_ms(case.get("time"), 1000)}
+
+
+def parse_junit(chunks, qualified_titles: bool = False):
+    """Yield {title, status, notes, duration_ms} for each <testcase> of a JUnit XML report.
+
+    failure/error -> fail, skipped -> skipped, anything else -> pass. With
+    `qualified_titles` the title is "classname.name" instead of the bare name.
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    # Open elements; finished ones outside a testcase are removed from their parent
+    # so the tree never grows with the report
+    open_elements = []
+    case_depth = 0
+
+    def finished():
+        nonlocal case_depth
+        for event, element in parser.read_events():
+            if event == "start":
+                open_elements.append(element)
+                case_depth += element.tag == "testcase"
+                continue
+
+            open_elements.pop()
+            if element.tag == "testcase":
+                case_depth -= 1
+                if case_depth == 0:
+                    yield _junit_result(element, qualified_titles)
+            if case_depth == 0 and open_elements:
+                open_elements[-1].remove(element)
+                element.clear()
+
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield from finished()
+        parser.close()
+        yield from finished()
+    except ParseError as e:
+        raise ReportError(f"Invalid JUnit XML: {e}")
+
+
+class _CtrfScanner:
+    """Finds the `[` opening results.tests without decoding anything before it.
+
+    Tracks just enough JSON structure (nesting, strings, the current object key) to know
+    where it is; fed text piece by piece, it returns the text after the `[` once found.
+    """
+
+    def __init__(self):
+        # One entry per open container: [current key] for objects, None for arrays
+        self.stack: list[list | None] = []
+        self.expect_key = False
+        self.in_string = False
+        self.escaped = False
+        self.token: list[str] = []
+
+    def feed(self, text: str) -> str | None:
+        for position, char in enumerate(text):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.expect_key:
+                        self.stack[-1][0] = "".join(self.token)
+                    continue
+                # Only keys are kept; values can be arbitrarily long
+                if self.expect_key:
+                    self.token.append(char)
+            elif char == '"':
+                self.in_string = True
+                self.token = []
+            elif char == "{":
+                self.stack.append([None])
+                self.expect_key = True
+            elif char == "[":
+                if [entry and entry[0] for entry in self.stack] == ["results", "tests"]:
+                    return text[position + 1:]
+                self.stack.append(None)
+                self.expect_key = False
+            elif char in "}]":
+                if not self.stack:
+                    raise ReportError("Invalid CTRF JSON: unbalanced brackets.")
+                self.stack.pop()
+                self.expect_key = False
+            elif char == ":":
+                self.expect_key = False
+            elif char == ",":
+                self.expect_key = bool(self.stack) and self.stack[-1] is not None
+        return None
+
+
+def _ctrf_result(entry) -> dict:
+    if not isinstance(entry, dict) or not isinstance(entry.get("name"), str):
+        return {"title": None, "status": None, "notes": "Test entry has no name.", "duration_ms": None}
+    return {
+        "title": entry["name"],
+        "status": CTRF_STATUSES.get(entry.get("status")),
+        "notes": _notes(entry.get("message") if isinstance(entry.get("message"), str) else None),
+        # CTRF reports milliseconds
+        "duration_ms": _duration_ms(entry.get("duration"), 1),
+    }
+
+
+def parse_ctrf(chunks):
+    """Yield {title, status, notes, duration_ms} for each entry of a CTRF report's results.tests.
+
+    passed -> pass, failed -> fail, skipped/pending -> skipped, other -> blocked; an
+    unknown status yields status None. Anything after the tests array is not read.
+    """
+    text = codecs.getincrementaldecoder("utf-8")()
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+
+    scanner = _CtrfScanner()
+    buffer = None
+    for chunk in chunks:
+        buffer = scanner.feed(text.decode(chunk))
+        if buffer is not None:
+            break
+    if buffer is None:
+        raise ReportError("Invalid CTRF JSON: no results.tests array.")
+
+    position = 0
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            if position == len(buffer):
+                raise ValueError("more input needed")
+            entry, position = decoder.raw_decode(buffer, position)
+        except ValueError as e:
+            # Most likely an entry split across chunks: read more and decode it again
+            buffer = buffer[position:]
+            position = 0
+            if len(buffer) > CTRF_MAX_ENTRY_BYTES:
+                raise ReportError("Invalid CTRF JSON: test entry too large.")
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise ReportError(f"Invalid CTRF JSON: {e}")
+            buffer += text.decode(chunk)
+            continue
+        yield _ctrf_result(entry)
+
+
+def _invalid_reason(result: dict) -> str | None:
+    if result["title"] is None:
+        return result["notes"]
+    if not result["title"].strip():
+        return "Test has an empty name."
+    if len(result["title"]) > TITLE_MAX_LENGTH:
+        return f"Test name is longer than {TITLE_MAX_LENGTH} characters."
+    if result["status"] is None:
+        return "Unknown status value."
+    return None
+
+
+def _resolve_titles(db: Session, project_id: int, titles: set[str], auto_create: bool) -> tuple[dict[str, int], int]:
+    """Map titles to test case ids ({title: id}, cases created).
+
+    The oldest case wins when a project has several with the same title. With
+    `auto_create`, missing titles become new test cases in the current transaction.
+    """
+    def lookup(wanted):
+        return dict(
+            db.execute(
+                select(TestCase.title, func.min(TestCase.id))
+                .where(TestCase.project_id == project_id, TestCase.title.in_(wanted))
+                .group_by(TestCase.title)
+            ).all()
+        )
+
+    case_ids = lookup(titles)
+    missing = titles - case_ids.keys()
+    if not auto_create or not missing:
+        return case_ids, 0
+
+    # Serializes concurrent imports creating this project's cases, so a title is only created once
+    db.execute(select(func.pg_advisory_xact_lock(CASE_CREATE_LOCK, project_id)))
+    case_ids.update(lookup(missing))
+    missing = sorted(titles - case_ids.keys())
+    if missing:
+        created = db.execute(
+            insert(TestCase)
+            .values([{"project_id": project_id, "title": title} for title in missing])
+            .returning(TestCase.title, TestCase.id)
+        ).all()
+        case_ids.update(dict(created))
+    return case_ids, len(missing)
+
+
+def import_report(
+    db: Session,
+    run: TestRun,
+    chunks,
+    fmt: str,
+    upsert: bool = False,
+    auto_create: bool = False,
+    qualified_titles: bool = False,
+) -> TestResultImportOut:
+    """Parse a report from an iterable of byte chunks and record its results against `run`.
+
+    Results whose title matches no test case of the run's project are reported as
+    "unmatched" unless `auto_create` creates the case. Every chunk of BATCH_CHUNK_SIZE
+    results is committed as it's parsed; a ReportError raised mid-report keeps the
+    chunks before it (re-importing with upsert=True is safe).
+    """
+    parsed = parse_junit(chunks, qualified_titles) if fmt == "junit" else parse_ctrf(chunks)
+
+    out = TestResultImportOut(
+        test_run_id=run.id, format=fmt, parsed=0, created=0, updated=0, rejected=0, unmatched=0, cases_created=0, problems=[]
+    )
+
+    def problem(index, title, outcome, detail):
+        if len(out.problems) < MAX_REPORTED_PROBLEMS:
+            out.problems.append(TestResultImportLine(index=index, title=title, outcome=outcome, detail=detail))
+
+    # Titles already resolved in this import (None: no such case)
+    case_ids: dict[str, int | None] = {}
+
+    try:
+        while batch := list(islice(parsed, BATCH_CHUNK_SIZE)):
+            start = out.parsed
+            out.parsed += len(batch)
+
+            titles = set()
+            for index, result in enumerate(batch, start):
+                detail = _invalid_reason(result)
+                if detail is not None:
+                    out.rejected += 1
+                    problem(index, result["title"], "invalid", detail)
+                    result["title"] = None
+                elif result["title"] not in case_ids:
+                    titles.add(result["title"])
+
+            created = 0
+            if titles:
+                resolved, created = _resolve_titles(db, run.project_id, titles, auto_create)
+                out.cases_created += created
+                case_ids.update({title: resolved.get(title) for title in titles})
+
+            rows, indexes = [], []
+            for index, result in enumerate(batch, start):
+                if result["title"] is None:
+                    continue
+                case_id = case_ids[result["title"]]
+                if case_id is None:
+                    out.unmatched += 1
+                    problem(index, result["title"], "unmatched", "No test case with this title in the project.")
+                    continue
+                rows.append(
+                    {
+                        "test_case_id": case_id,
+                        "status": result["status"],
+                        "notes": result["notes"],
+                        "duration_ms": result["duration_ms"],
+                    }
+                )
+                indexes.append(index)
+
+            # ingest_results commits the chunk, along with any cases created for it
+            if rows:
+                lines = ingest_results(db, run.id, rows, upsert=upsert)
+            else:
+                lines = []
+                db.commit()
+            if created:
+                response_cache.invalidate([f"project:{run.project_id}"])
+
+            for line, index in zip(lines, indexes):
+                if line.outcome == "created":
+                    out.created += 1
+                elif line.outcome == "updated":
+                    out.updated += 1
+                else:
+                    out.rejected += 1
+                    problem(index, batch[index - start]["title"], line.outcome, line.detail)
+    except ReportError as e:
+        db.rollback()
+        raise ReportError(f"{e} ({out.created + out.updated} results before it were recorded)")
+
+    out.problems.sort(key=lambda line: line.index)
+    return out
@@ -0,0 +1,315 @@
+"""Background jobs for exports and reports too slow to serve within a request.
+
+The `jobs` table is the queue: POST /jobs inserts a queued row and wakes the local runner,
+whose workers claim rows with FOR UPDATE SKIP LOCKED, so several API processes (or
+scripts/run_jobs.py workers) can share one queue. Artifacts are written to
+JOBS_ARTIFACT_DIR, which must be shared when workers run on other hosts.
+"""
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select, update
+
+from app.db.session import ReplicaSessionLocals, SessionLocal, engine, next_replica
+from app.models.job import Job
+from app.schemas.analytics import FlakinessLine
+from app.serialization import dumps, row_dicts
+from app.services.analytics import DEFAULT_WINDOW_RUNS, flakiness_query, window_runs_query
+from app.services.export import EXPORT_MEDIA_TYPES, build_export_query, iter_export
+
+
+logger = logging.getLogger("app.jobs")
+
+# thread: a few threads in each API process (single process, dev, tests); process: a pool
+# of worker processes per API process; none: only enqueue, and leave running the jobs to
+# scripts/run_jobs.py workers (production, where the API runs several processes)
+JOBS_BACKEND = os.getenv("JOBS_BACKEND", "thread").lower()
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", "2"))
+# Wait before looking at the queue again after a worker crashed
+JOBS_RETRY_SECONDS = float(os.getenv("JOBS_RETRY_SECONDS", "5"))
+JOBS_ARTIFACT_DIR = os.getenv("JOBS_ARTIFACT_DIR", "artifacts")
+
+# How often a running job records a heartbeat and picks up a cancel request
+HEARTBEAT_SECONDS = float(os.getenv("JOBS_HEARTBEAT_SECONDS", "5"))
+# A running job without a heartbeat for this long lost its worker and is marked failed
+STALE_SECONDS = float(os.getenv("JOBS_STALE_SECONDS", "60"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Passed to job functions: where to write the artifact, and cancellation checkpoints.
+
+    A background thread refreshes the job's heartbeat every HEARTBEAT_SECONDS (even while
+    a long statement runs) and notices cancel requests; `checkpoint()` only reads a flag.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.path: str | None = None
+        self._cancelled = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"job-{job_id}-heartbeat", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _heartbeat(self) -> None:
+        while not self._stopped.wait(HEARTBEAT_SECONDS):
+            try:
+                with engine.begin() as conn:
+                    cancel_requested = conn.scalar(
+                        update(Job)
+                        .where(Job.id == self.job_id)
+                        .values(heartbeat_at=func.now())
+                        .returning(Job.cancel_requested)
+                    )
+            except Exception:
+                logger.exception("Heartbeat failed for job %s", self.job_id)
+                continue
+            if cancel_requested:
+                self._cancelled.set()
+
+    def checkpoint(self) -> None:
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def artifact_path(self, extension: str) -> str:
+        os.makedirs(JOBS_ARTIFACT_DIR, exist_ok=True)
+        self.path = os.path.join(JOBS_ARTIFACT_DIR, f"job-{self.job_id}.{extension}")
+        return self.path
+
+
+def _read_session():
+    # Jobs only read, so they go to a replica when one is configured
+    return ReplicaSessionLocals[next_replica()]() if ReplicaSessionLocals else SessionLocal()
+
+
+def run_export(ctx: JobContext, params: dict) -> str:
+    fmt = params.pop("format", "ndjson")
+    filters = {
+        key: datetime.fromisoformat(value) if key.startswith("created_") and value else value
+        for key, value in params.items()
+    }
+    stmt = build_export_query(**filters)
+
+    with open(ctx.artifact_path(fmt) + ".tmp", "wb") as out:
+        for chunk in iter_export(stmt, fmt, _read_session):
+            out.write(chunk)
+            ctx.checkpoint()
+    os.replace(ctx.path + ".tmp", ctx.path)
+    return EXPORT_MEDIA_TYPES[fmt]
+
+
+def run_flakiness(ctx: JobContext, params: dict) -> str:
+    window_runs = params.get("window_runs")
+    window_days = params.get("window_days")
+    if window_runs is None and window_days is None:
+        window_runs = DEFAULT_WINDOW_RUNS
+    since = datetime.now(timezone.utc) - timedelta(days=window_days) if window_days else None
+    args = (params["project_id"], params.get("environment"), window_runs, since)
+
+    with _read_session() as db:
+        run_count = db.scalar(select(func.count()).select_from(window_runs_query(*args).subquery()))
+        ctx.checkpoint()
+        rows = db.execute(flakiness_query(*args, params.get("min_runs", 2))).all()
+    ctx.checkpoint()
+
+    # Same shape as GET /projects/{project_id}/flakiness, with every line on one page
+    body = dumps(
+        {
+            "project_id": params["project_id"],
+            "environment": params.get("environment"),
+            "window_runs": window_runs,
+            "window_days": window_days,
+            "run_count": run_count,
+            "items": row_dicts(FlakinessLine, rows),
+            "next_offset": None,
+        }
+    )
+    with open(ctx.artifact_path("json") + ".tmp", "wb") as out:
+        out.write(body)
+    os.replace(ctx.path + ".tmp", ctx.path)
+    return "application/json"
+
+
+# kind -> function(ctx, params) that writes the artifact and returns its media type
+JOB_KINDS = {
+    "export": run_export,
+    "flakiness": run_flakiness,
+}
+
+
+def claim_next_job() -> tuple[int, str, dict] | None:
+    """Mark the oldest queued job running and return (id, kind, params), or None if there is none."""
+    with SessionLocal.begin() as db:
+        db.execute(
+            update(Job)
+            .where(Job.status == "running", Job.heartbeat_at < func.now() - timedelta(seconds=STALE_SECONDS))
+            .values(status="failed", error="Worker stopped responding", finished_at=func.now())
+        )
+        job = db.scalars(
+            select(Job).where(Job.status == "queued").order_by(Job.id).limit(1).with_for_update(skip_locked=True)
+        ).first()
+        if job is None:
+            return None
+        job.status = "running"
+        job.started_at = job.heartbeat_at = func.now()
+        return job.id, job.kind, dict(job.params)
+
+
+def _finish(job_id: int, **values) -> None:
+    with SessionLocal.begin() as db:
+        # Guarded by status so a job already failed as stale isn't resurrected
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running")
+            .values(finished_at=func.now(), heartbeat_at=func.now(), **values)
+        )
+
+
+def _remove_artifact(path: str | None) -> None:
+    for leftover in (path, f"{path}.tmp") if path else ():
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+def run_next_job() -> int | None:
+    """Claim and run one queued job. Returns its id, or None when the queue was empty.
+
+    Top-level function so it can be sent to a worker process.
+    """
+    claimed = claim_next_job()
+    if claimed is None:
+        return None
+    job_id, kind, params = claimed
+
+    ctx = JobContext(job_id)
+    try:
+        with ctx:
+            media_type = JOB_KINDS[kind](ctx, params)
+    except JobCancelled:
+        _remove_artifact(ctx.path)
+        _finish(job_id, status="cancelled")
+    except Exception as e:
+        logger.exception("Job %s (%s) failed", job_id, kind)
+        _remove_artifact(ctx.path)
+        _finish(job_id, status="failed", error=f"{type(e).__name__}: {e}")
+    else:
+        _finish(
+            job_id,
+            status="succeeded",
+            artifact_path=ctx.path,
+            artifact_media_type=media_type,
+            artifact_bytes=os.path.getsize(ctx.path),
+        )
+    return job_id
+
+
+def _init_worker_process() -> None:
+    # Never reuse connections inherited from the parent process
+    engine.dispose(close=False)
+
+
+class JobRunner:
+    """Runs queued jobs on at most `max_workers` workers of this process.
+
+    Each task claims one job; a worker that ran a job immediately asks for another, so the
+    queue drains without polling, and an idle runner costs nothing. A task that crashed
+    (a dead worker process, a lost database) wakes the runner again after `retry_seconds`,
+    so the rest of the queue isn't left waiting for the next enqueue.
+    """
+
+    def __init__(
+        self,
+        backend: str = JOBS_BACKEND,
+        max_workers: int = JOBS_MAX_WORKERS,
+        retry_seconds: float = JOBS_RETRY_SECONDS,
+    ):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.retry_seconds = retry_seconds
+        self._executor = None
+        self._pending = 0
+        # A wake-up that arrived while every worker was busy (one of them may be about to go idle)
+        self._rewake = False
+        self._retry: threading.Timer | None = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._executor is None:
+            if self.backend == "thread":
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="job")
+            else:
+                # spawn: forking a process that runs an event loop and thread pools is unsafe
+                self._executor = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker_process,
+                )
+        return self._executor
+
+    def wake(self) -> None:
+        """Make sure a worker looks at the queue; call after enqueueing a job."""
+        if self.backend == "none":
+            return
+        with self._lock:
+            if self._pending >= self.max_workers:
+                self._rewake = True
+                return
+            self._pending += 1
+            executor = self._pool()
+        executor.submit(run_next_job).add_done_callback(functools.partial(self._done, executor))
+
+    def _done(self, executor, future) -> None:
+        with self._lock:
+            self._pending -= 1
+            rewake, self._rewake = self._rewake, False
+
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logger.error("Job worker crashed", exc_info=future.exception())
+            if isinstance(future.exception(), BrokenProcessPool):
+                # A worker process died (e.g. killed for memory): release the broken pool's
+                # resources and start a fresh pool next time
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._schedule_retry()
+        elif future.result() is not None or rewake:
+            self.wake()
+
+    def _schedule_retry(self) -> None:
+        with self._lock:
+            if self._retry is not None and self._retry.is_alive():
+                return
+            self._retry = threading.Timer(self.retry_seconds, self.wake)
+            self._retry.daemon = True
+            self._retry.start()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            retry, self._retry = self._retry, None
+            executor, self._executor = self._executor, None
+        if retry is not None:
+            retry.cancel()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_runner = JobRunner()
@@ -0,0 +1,144 @@
+from sqlalchemy import bindparam, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer, String
+
+from app.models.test_case import TestCase
+from app.models.test_case_latest_result import TestCaseLatestResult
+
+
+_APPLY_LATEST = text(
+    """
+    INSERT INTO test_case_latest_results AS latest
+        (project_id, environment, test_case_id, test_run_id, result_id, status, run_started_at)
+    SELECT r.project_id, coalesce(r.environment, ''), w.test_case_id, r.id, w.result_id,
+           CAST(w.status AS test_status), r.started_at
+    FROM unnest(:case_ids, :result_ids, :statuses) AS w(test_case_id, result_id, status)
+    JOIN test_runs r ON r.id = :run_id
+    ORDER BY w.test_case_id
+    ON CONFLICT (project_id, environment, test_case_id) DO UPDATE SET
+        test_run_id = excluded.test_run_id,
+        result_id = excluded.result_id,
+        status = excluded.status,
+        run_started_at = excluded.run_started_at,
+        updated_at = now()
+    WHERE (latest.run_started_at, latest.test_run_id) <= (excluded.run_started_at, excluded.test_run_id)
+    """
+).bindparams(
+    bindparam("case_ids", type_=ARRAY(Integer)),
+    bindparam("result_ids", type_=ARRAY(Integer)),
+    bindparam("statuses", type_=ARRAY(String)),
+)
+
+
+def apply_latest_results(db: Session, run_id: int, written: list[tuple[int, int, str]]) -> None:
+    """Make (test_case_id, result_id, status) the latest result of each case in the run's environment.
+
+    A case whose latest result comes from a run that started later keeps it. One
+    INSERT ... ON CONFLICT DO UPDATE, rows locked in case id order. Does not commit; call
+    inside the result write transaction.
+    """
+    # The last write for a case wins (ON CONFLICT can only touch a row once per statement)
+    latest = {case_id: (case_id, result_id, status) for case_id, result_id, status in written}
+    if not latest:
+        return
+    rows = list(latest.values())
+    db.execute(
+        _APPLY_LATEST,
+        {
+            "run_id": run_id,
+            "case_ids": [row[0] for row in rows],
+            "result_ids": [row[1] for row in rows],
+            "statuses": [row[2] for row in rows],
+        },
+    )
+
+
+def rebuild_latest_results(db: Session, project_id: int | None = None) -> int:
+    """Recompute the latest result of every case from test_results (backfill / repair).
+
+    Returns the number of rows rebuilt. Cases whose results were all archived keep their
+    row; their results are no longer in test_results.
+    """
+    project_filter = "WHERE r.project_id = :project_id" if project_id is not None else ""
+    stmt = text(
+        f"""
+        INSERT INTO test_case_latest_results
+            (project_id, environment, test_case_id, test_run_id, result_id, status, run_started_at, updated_at)
+        SELECT DISTINCT ON (r.project_id, coalesce(r.environment, ''), tr.test_case_id)
+               r.project_id, coalesce(r.environment, ''), tr.test_case_id, r.id, tr.id, tr.status, r.started_at, now()
+        FROM test_results tr
+        JOIN test_runs r ON r.id = tr.test_run_id
+        {project_filter}
+        ORDER BY r.project_id, coalesce(r.environment, ''), tr.test_case_id, r.started_at DESC, r.id DESC
+        ON CONFLICT (project_id, environment, test_case_id) DO UPDATE SET
+            test_run_id = excluded.test_run_id,
+            result_id = excluded.result_id,
+            status = excluded.status,
+            run_started_at = excluded.run_started_at,
+            updated_at = excluded.updated_at
+        RETURNING 1
+        """
+    )
+    params = {"project_id": project_id} if project_id is not None else {}
+
+    rebuilt = len(db.execute(stmt, params).all())
+    db.commit()
+    return rebuilt
+
+
+def project_health(db: Session, project_id: int, environment: str | None = None, failing_limit: int = 100) -> dict:
+    """Status counts per environment and the failing cases, from the latest results alone.
+
+    Both reads use the (project_id, status, environment, test_case_id) index; no result
+    or run is scanned. `environment=""` selects runs without an environment.
+    """
+    scope = [TestCaseLatestResult.project_id == project_id]
+    if environment is not None:
+        scope.append(TestCaseLatestResult.environment == environment)
+
+    counts = db.execute(
+        select(TestCaseLatestResult.environment, TestCaseLatestResult.status, func.count())
+        .where(*scope)
+        .group_by(TestCaseLatestResult.environment, TestCaseLatestResult.status)
+        .order_by(TestCaseLatestResult.environment)
+    ).all()
+    environments: dict[str, dict] = {}
+    for env, status, count in counts:
+        line = environments.setdefault(
+            env,
+            {
+                "environment": env or None,
+                "executed_count": 0,
+                "pass_count": 0,
+                "fail_count": 0,
+                "blocked_count": 0,
+                "skipped_count": 0,
+                "pass_rate": None,
+            },
+        )
+        line[f"{status}_count"] = count
+        line["executed_count"] += count
+    for line in environments.values():
+        line["pass_rate"] = line["pass_count"] / line["executed_count"]
+
+    failing = db.execute(
+        select(
+            TestCaseLatestResult.test_case_id,
+            TestCase.title,
+            TestCaseLatestResult.environment,
+            TestCaseLatestResult.test_run_id,
+            TestCaseLatestResult.result_id,
+            TestCaseLatestResult.run_started_at,
+        )
+        .join(TestCase, TestCase.id == TestCaseLatestResult.test_case_id)
+        .where(*scope, TestCaseLatestResult.status == "fail")
+        .order_by(TestCaseLatestResult.environment, TestCaseLatestResult.test_case_id)
+        .limit(failing_limit)
+    ).all()
+
+    return {
+        "environments": list(environments.values()),
+        "failing": [{**row._mapping, "environment": row.environment or None} for row in failing],
+        "failing_count": sum(line["fail_count"] for line in environments.values()),
+    }
@@ -0,0 +1,277 @@
+"""Live feed of a run's results over server-sent events.
+
+Result writes queue a NOTIFY with the ids they wrote (Postgres delivers it only when the
+write commits). Each API process holds one LISTEN connection; when a notification names a
+run that has subscribers, the rows are read once and fanned out to all of them, so the
+database cost doesn't grow with the number of viewers.
+
+Result ids are drawn before their transaction commits, so a result can become visible
+after one with a higher id. Replays (after_id, resyncs) therefore also re-read the results
+created up to REPLAY_OVERLAP_SECONDS before the cursor's: delivery is at least once, and
+only a result whose write transaction ran longer than that can be missed by a replay.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+import psycopg
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.db.session import DATABASE_URL, SessionLocal
+from app.models.test_result import TestResult
+from app.models.test_run import TestRun
+from app.schemas.test_result import TestResultOut
+from app.serialization import dumps, row_dicts
+
+
+logger = logging.getLogger("app.live")
+
+CHANNEL = "test_results"
+# Keeps each NOTIFY payload far below Postgres' 8000-byte limit
+NOTIFY_IDS_PER_MESSAGE = 500
+# Events buffered per subscriber; a subscriber that falls further behind re-reads from the database
+SUBSCRIBER_QUEUE_SIZE = 256
+# How long a new subscriber waits for the listener connection before giving up
+LISTEN_TIMEOUT_SECONDS = 10
+# Comment line sent on idle streams so proxies don't close them
+KEEPALIVE_SECONDS = float(os.getenv("LIVE_KEEPALIVE_SECONDS", "15"))
+# Replays also re-read results created this long before the cursor's (see above)
+REPLAY_OVERLAP_SECONDS = float(os.getenv("LIVE_REPLAY_OVERLAP_SECONDS", "60"))
+
+LISTEN_URL = make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def publish_results(db: Session, run_id: int, created_ids: list[int], updated_ids: list[int]) -> None:
+    """Queue notifications for written results; call inside the write transaction."""
+    for change, ids in (("created", created_ids), ("updated", updated_ids)):
+        for start in range(0, len(ids), NOTIFY_IDS_PER_MESSAGE):
+            payload = json.dumps({"run_id": run_id, "change": change, "ids": ids[start:start + NOTIFY_IDS_PER_MESSAGE]})
+            db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+def fetch_results(run_id: int, ids: list[int] | None = None, after_id: int | None = None) -> list[dict]:
+    """Results of a run by id, or created after `after_id` (with the replay overlap), in id order."""
+    stmt = select(
+        TestResult.id,
+        TestResult.test_run_id,
+        TestResult.test_case_id,
+        TestResult.status,
+        TestResult.notes,
+        TestResult.duration_ms,
+        TestResult.created_at,
+    ).where(TestResult.test_run_id == run_id)
+    if ids is not None:
+        stmt = stmt.where(TestResult.id.in_(ids))
+    if after_id is not None:
+        cursor_created_at = (
+            select(TestResult.created_at)
+            .where(TestResult.test_run_id == run_id, TestResult.id == after_id)
+            .scalar_subquery()
+        )
+        stmt = stmt.where(
+            or_(
+                TestResult.id > after_id,
+                TestResult.created_at >= cursor_created_at - timedelta(seconds=REPLAY_OVERLAP_SECONDS),
+            )
+        )
+
+    with SessionLocal() as db:
+        return row_dicts(TestResultOut, db.execute(stmt.order_by(TestResult.id)).all())
+
+
+def _initial_backlog(run_id: int, after_id: int | None) -> tuple[list[dict], int] | None:
+    """(results to replay, starting cursor), or None if the run doesn't exist."""
+    with SessionLocal() as db:
+        if db.get(TestRun, run_id) is None:
+            return None
+        if after_id is None:
+            # Nothing to replay; a later resync starts from the results that exist now
+            latest = db.scalar(select(func.max(TestResult.id)).where(TestResult.test_run_id == run_id))
+            return [], latest or 0
+    return fetch_results(run_id, after_id=after_id), after_id
+
+
+class Subscription:
+    def __init__(self, run_id: int):
+        self.run_id = run_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when events may have been missed (queue overflow, listener reconnect)
+        self.lagged = False
+
+    def push(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+class ResultBroker:
+    """One LISTEN connection per process, fanned out to per-run subscriptions."""
+
+    def __init__(self):
+        self._subscriptions: dict[int, set[Subscription]] = {}
+        self._task: asyncio.Task | None = None
+        self._listening = asyncio.Event()
+
+    async def subscribe(self, run_id: int) -> Subscription:
+        """Register for a run's events; returns once notifications are being received.
+
+        Raises TimeoutError when the listener can't connect within LISTEN_TIMEOUT_SECONDS.
+        """
+        if self._task is None or self._task.done():
+            self._listening = asyncio.Event()
+            # Not in this subscriber's context: the listener outlives its request, and must not
+            # count its queries towards it (or log them under its route)
+            self._task = asyncio.get_running_loop().create_task(self._listen(), context=contextvars.Context())
+        await asyncio.wait_for(self._listening.wait(), LISTEN_TIMEOUT_SECONDS)
+
+        subscription = Subscription(run_id)
+        self._subscriptions.setdefault(run_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.run_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.run_id]
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(LISTEN_URL, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    if self._listening.is_set():
+                        # Reconnected: anything sent meanwhile was lost, so every subscriber re-reads
+                        for subscriptions in self._subscriptions.values():
+                            for subscription in subscriptions:
+                                subscription.lagged = True
+                                subscription.push(None)
+                    self._listening.set()
+                    async for notify in conn.notifies():
+                        await self._dispatch(json.loads(notify.payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Live feed listener failed; reconnecting")
+                await asyncio.sleep(1)
+
+    async def _dispatch(self, message: dict) -> None:
+        if not self._subscriptions.get(message["run_id"]):
+            return
+        rows = await run_in_threadpool(fetch_results, message["run_id"], message["ids"])
+        events = [(message["change"], row) for row in rows]
+        # Re-read: subscribers may have left while the rows were being fetched
+        for subscription in self._subscriptions.get(message["run_id"], ()):
+            subscription.push(events)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+result_broker = ResultBroker()
+
+
+def _sse(event: str, data: bytes, event_id: int | None = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\n".encode() + b"data: " + data + b"\n\n"
+
+
+async def open_run_feed(run_id: int, after_id: int | None = None):
+    """Subscribe to a run and return its event stream, or None if the run doesn't exist.
+
+    With `after_id`, results created after it are replayed first (at least once, see the
+    module docstring). Subscribing happens before that read, so nothing committed in
+    between is missed.
+    """
+    subscription = await result_broker.subscribe(run_id)
+    try:
+        initial = await run_in_threadpool(_initial_backlog, run_id, after_id)
+    except BaseException:
+        result_broker.unsubscribe(subscription)
+        raise
+    if initial is None:
+        result_broker.unsubscribe(subscription)
+        return None
+    return _run_events(subscription, *initial)
+
+
+class _SentResults:
+    """Ids of the created results a stream has sent that a replay could still return.
+
+    A replay re-reads results created up to REPLAY_OVERLAP_SECONDS before the cursor's, so
+    older ids are dropped; the set stays bounded by the overlap window, not the run's size.
+    """
+
+    def __init__(self):
+        self._created_at: dict[int, datetime] = {}
+        self._prune_at = 1024
+
+    def __contains__(self, result_id: int) -> bool:
+        return result_id in self._created_at
+
+    def add(self, row: dict, cursor_created_at: datetime | None) -> None:
+        self._created_at[row["id"]] = row["created_at"]
+        # Pruned once the set doubles, so each add costs O(1) amortized
+        if cursor_created_at is not None and len(self._created_at) >= self._prune_at:
+            window_start = cursor_created_at - timedelta(seconds=REPLAY_OVERLAP_SECONDS)
+            self._created_at = {
+                result_id: created_at
+                for result_id, created_at in self._created_at.items()
+                if created_at >= window_start
+            }
+            self._prune_at = max(1024, 2 * len(self._created_at))
+
+
+async def _run_events(subscription: Subscription, backlog: list[dict], cursor: int):
+    # The event id is the highest created result id sent so far: it's what a reconnecting
+    # client sends back as Last-Event-ID
+    try:
+        # An id without data sets the client's Last-Event-ID without dispatching an event
+        yield f"id: {cursor}\n\n".encode()
+        sent = _SentResults()
+        # created_at of the cursor's result, once this stream has sent it
+        cursor_created_at = None
+        while True:
+            for row in backlog:
+                # The replay overlap re-reads results this stream has already sent
+                if row["id"] in sent:
+                    continue
+                if row["id"] > cursor:
+                    cursor, cursor_created_at = row["id"], row["created_at"]
+                sent.add(row, cursor_created_at)
+                yield _sse("result", dumps({**row, "change": "created"}), cursor)
+            backlog = []
+
+            try:
+                events = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+
+            if subscription.lagged:
+                subscription.lagged = False
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                backlog = await run_in_threadpool(fetch_results, subscription.run_id, None, cursor)
+                continue
+
+            for change, row in events or ():
+                if change == "created":
+                    # Already replayed: its notification can arrive after the replay read it
+                    if row["id"] in sent:
+                        continue
+                    if row["id"] > cursor:
+                        cursor, cursor_created_at = row["id"], row["created_at"]
+                    sent.add(row, cursor_created_at)
+                yield _sse("result", dumps({**row, "change": change}), cursor)
+    finally:
+        result_broker.unsubscribe(subscription)
@@ -0,0 +1,104 @@
+"""Status matrix of a project's cases against its latest runs, for heatmaps.
+
+One cell per (case, run) holds a status code (STATUS_CODES; 0 when the case has no result
+in the run). Cells are row-major, one row per case, runs oldest first. Packed, each cell
+takes 3 bits: cell k is bits 3k..3k+2 of the little-endian bit stream, so 8 cells fill
+3 bytes.
+"""
+import struct
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Session
+from sqlalchemy.types import Integer
+
+from app.services.analytics import window_runs_query
+
+
+DEFAULT_MATRIX_RUNS = 50
+MAX_MATRIX_RUNS = 200
+# 0 is "no result"
+STATUS_CODES = {"pass": 1, "fail": 2, "blocked": 3, "skipped": 4}
+
+# One row: the case ids in order, plus the grid position and code of every result
+_PIVOT = text(
+    """
+    WITH cases AS (
+        SELECT id, row_number() OVER (ORDER BY id) - 1 AS position
+        FROM test_cases
+        WHERE project_id = :project_id
+    )
+    SELECT
+        ARRAY(SELECT id FROM cases ORDER BY id) AS case_ids,
+        array_agg(c.position * :run_count + array_position(:run_ids, r.test_run_id) - 1) AS cells,
+        array_agg(
+            CASE r.status WHEN 'pass' THEN 1 WHEN 'fail' THEN 2 WHEN 'blocked' THEN 3 ELSE 4 END
+        ) AS codes
+    FROM test_results r
+    JOIN cases c ON c.id = r.test_case_id
+    WHERE r.test_run_id = ANY(:run_ids)
+    """
+).bindparams(bindparam("run_ids", type_=ARRAY(Integer)))
+
+
+def status_matrix(db: Session, project_id: int, environment: str | None, run_count: int) -> dict:
+    """Run ids (oldest first), case ids (by id) and the grid, one status code byte per cell.
+
+    Two reads: the latest runs through ix_test_runs_project_id_started_at, then the pivot,
+    which reads only those runs' results (their partitions) and returns them as grid
+    positions in a single row.
+    """
+    runs = db.execute(window_runs_query(project_id, environment, run_count)).all()
+    run_ids = [run.id for run in reversed(runs)]
+
+    pivot = db.execute(_PIVOT, {"project_id": project_id, "run_ids": run_ids, "run_count": len(run_ids)}).one()
+    case_ids = pivot.case_ids
+
+    grid = bytearray(len(case_ids) * len(run_ids))
+    for cell, code in zip(pivot.cells or (), pivot.codes or ()):
+        grid[cell] = code
+
+    return {"run_ids": run_ids, "test_case_ids": case_ids, "grid": bytes(grid)}
+
+
+def _shift_table(shift: int) -> bytes:
+    # bytes.translate table: a cell's code (low 3 bits) moved `shift` bits within its byte
+    return bytes(((code & 7) << shift if shift >= 0 else (code & 7) >> -shift) & 0xFF for code in range(256))
+
+
+# 8 cells pack into 3 bytes; each byte ORs these (cell within the group, shift) terms
+_PACKED_BYTE_TERMS = [
+    [(0, 0), (1, 3), (2, 6)],
+    [(2, -2), (3, 1), (4, 4), (5, 7)],
+    [(5, -1), (6, 2), (7, 5)],
+]
+_SHIFT_TABLES = {shift: _shift_table(shift) for terms in _PACKED_BYTE_TERMS for _, shift in terms}
+
+
+def pack_cells(grid: bytes) -> bytes:
+    """Pack one code (0-7) per byte into 3 bits per cell.
+
+    Works on bit planes of whole columns (cell i of every 8-cell group) instead of cells:
+    bytes.translate shifts a column's codes into place, and OR-ing columns as integers
+    (int.from_bytes) combines them, so no Python-level loop runs per cell or per group.
+    """
+    padded = grid + bytes(-len(grid) % 8)
+    columns = [padded[i::8] for i in range(8)]
+    groups = len(columns[0])
+
+    packed = bytearray(groups * 3)
+    for position, terms in enumerate(_PACKED_BYTE_TERMS):
+        plane = 0
+        for cell, shift in terms:
+            plane |= int.from_bytes(columns[cell].translate(_SHIFT_TABLES[shift]), "little")
+        packed[position::3] = plane.to_bytes(groups, "little")
+    return bytes(packed[: (len(grid) * 3 + 7) // 8])
+
+
+def matrix_binary(matrix: dict) -> bytes:
+    """The binary encoding, all little-endian: uint32 case count, uint32 run count, the
+    case ids and run ids as uint32, then the packed cells.
+    """
+    case_ids, run_ids = matrix["test_case_ids"], matrix["run_ids"]
+    header = struct.pack(f"<II{len(case_ids)}I{len(run_ids)}I", len(case_ids), len(run_ids), *case_ids, *run_ids)
+    return header + pack_cells(matrix["grid"])
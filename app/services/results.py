@@ -0,0 +1,229 @@
+from typing import NamedTuple
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+
+from app.cache import response_cache
+from app.models.test_case import TestCase
+from app.models.test_result import TestResult, TEST_STATUS_ENUM
+from app.schemas.test_result import TestResultBatchItem, TestResultBatchLine, TestResultCreate
+from app.services.case_stats import ResultSample, apply_result_samples
+from app.services.latest import apply_latest_results
+from app.services.live import publish_results
+from app.services.summaries import apply_summary_changes
+
+
+TEST_STATUSES = frozenset(TEST_STATUS_ENUM.enums)
+
+# Rows per INSERT statement (keeps us well under Postgres' 65535 bind parameter limit)
+BATCH_CHUNK_SIZE = 1000
+
+# First key of pg_advisory_xact_lock(int, int) for writing a run's results
+RESULTS_WRITE_LOCK = 0x7152
+
+
+def _chunks(items: list, size: int = BATCH_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class WrittenResult(NamedTuple):
+    id: int
+    test_case_id: int
+    status: str
+    # None for a newly inserted result, otherwise the status it overwrote
+    previous_status: str | None
+    inserted: bool
+    duration_ms: int | None
+
+
+def _after_results_written(db: Session, run_id: int, written: list[WrittenResult]) -> None:
+    # Derived tables are kept in step inside the write transaction
+    apply_summary_changes(db, run_id, [(result.previous_status, result.status) for result in written])
+    apply_result_samples(
+        db,
+        [ResultSample(result.test_case_id, result.status, result.duration_ms, result.previous_status) for result in written],
+    )
+    apply_latest_results(db, run_id, [(result.test_case_id, result.id, result.status) for result in written])
+    # Delivered to live-feed listeners only if the transaction commits
+    publish_results(
+        db,
+        run_id,
+        [result.id for result in written if result.inserted],
+        [result.id for result in written if not result.inserted],
+    )
+
+
+def _lock_run_results(db: Session, run_id: int, exclusive: bool) -> None:
+    """Take the run's result-writing lock for this transaction: upserts exclusively, inserts shared.
+
+    An upsert reads the statuses it overwrites before its INSERT ... ON CONFLICT. A result
+    inserted by another transaction in between would be overwritten with its previous status
+    unknown, and counted as a new one. With the lock held exclusively the upsert waits for
+    in-flight inserts to commit, and new ones wait for the upsert.
+    """
+    lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+    db.execute(select(lock(RESULTS_WRITE_LOCK, run_id)))
+
+
+def record_result(db: Session, payload: TestResultCreate) -> TestResult:
+    """Insert a single result. Raises IntegrityError if the run already has a result for the case."""
+    _lock_run_results(db, payload.test_run_id, exclusive=False)
+    result = TestResult(**payload.model_dump())
+    db.add(result)
+    db.flush()
+    _after_results_written(
+        db,
+        result.test_run_id,
+        [WrittenResult(result.id, result.test_case_id, result.status, None, True, result.duration_ms)],
+    )
+    db.commit()
+    response_cache.invalidate([f"run:{result.test_run_id}", f"case:{result.test_case_id}"])
+    db.refresh(result)
+    return result
+
+
+def ingest_results(
+    db: Session,
+    run_id: int,
+    rows: list,
+    upsert: bool = False,
+) -> list[TestResultBatchLine]:
+    """Write a batch of results for one run with multi-row INSERTs in a single transaction.
+
+    Returns one outcome line per input row, in input order. Rows that fail validation,
+    point at an unknown test case, or collide with an existing result (insert mode) are
+    reported instead of aborting the batch. In upsert mode an existing result for the
+    same (run, case) is overwritten.
+    """
+    lines: list[TestResultBatchLine | None] = [None] * len(rows)
+    accepted: dict[int, tuple[int, TestResultBatchItem]] = {}
+
+    for index, raw in enumerate(rows):
+        try:
+            item = TestResultBatchItem.model_validate(raw)
+        except ValidationError as e:
+            # Echo the id only when it is one: a malformed id must not fail building the line
+            case_id = raw.get("test_case_id") if isinstance(raw, dict) else None
+            lines[index] = TestResultBatchLine(
+                index=index,
+                test_case_id=case_id if isinstance(case_id, int) and not isinstance(case_id, bool) else None,
+                outcome="invalid",
+                detail=str(e.errors()[0]["msg"]),
+            )
+            continue
+
+        if item.status not in TEST_STATUSES:
+            lines[index] = TestResultBatchLine(
+                index=index, test_case_id=item.test_case_id, outcome="invalid", detail="Invalid status value."
+            )
+            continue
+
+        previous = accepted.get(item.test_case_id)
+        if previous is not None:
+            # insert: first row for a case wins; upsert: last row wins
+            dropped_index = index if not upsert else previous[0]
+            lines[dropped_index] = TestResultBatchLine(
+                index=dropped_index,
+                test_case_id=item.test_case_id,
+                outcome="duplicate",
+                detail="Duplicate test_case_id within this batch.",
+            )
+            if not upsert:
+                continue
+
+        accepted[item.test_case_id] = (index, item)
+
+    # Unknown test cases would fail the FK and abort the whole statement, so filter them first
+    known_case_ids: set[int] = set()
+    for chunk in _chunks(list(accepted)):
+        known_case_ids.update(db.scalars(select(TestCase.id).where(TestCase.id.in_(chunk))))
+
+    for case_id in [c for c in accepted if c not in known_case_ids]:
+        index, _ = accepted.pop(case_id)
+        lines[index] = TestResultBatchLine(
+            index=index, test_case_id=case_id, outcome="invalid", detail="Test case not found."
+        )
+
+    written: list[WrittenResult] = []
+    if accepted:
+        _lock_run_results(db, run_id, exclusive=upsert)
+
+    for chunk in _chunks(list(accepted.values())):
+        previous_statuses = {}
+        if upsert:
+            # Lock and remember the statuses being overwritten so the run summary can be adjusted
+            previous_statuses = dict(
+                db.execute(
+                    select(TestResult.test_case_id, TestResult.status)
+                    .where(
+                        TestResult.test_run_id == run_id,
+                        TestResult.test_case_id.in_([item.test_case_id for _, item in chunk]),
+                    )
+                    .with_for_update()
+                ).all()
+            )
+
+        values = [
+            {
+                "test_run_id": run_id,
+                "test_case_id": item.test_case_id,
+                "status": item.status,
+                "notes": item.notes,
+                "duration_ms": item.duration_ms,
+            }
+            for _, item in chunk
+        ]
+        stmt = insert(TestResult).values(values)
+        if upsert:
+            stmt = stmt.on_conflict_do_update(
+                constraint="uq_test_results_run_case",
+                set_={
+                    "status": stmt.excluded.status,
+                    "notes": stmt.excluded.notes,
+                    "duration_ms": stmt.excluded.duration_ms,
+                },
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(constraint="uq_test_results_run_case")
+
+        # Partitioned tables can't return xmax; instead, a fresh row's created_at is this
+        # transaction's now(), while a row updated by ON CONFLICT keeps its original one
+        stmt = stmt.returning(
+            TestResult.id,
+            TestResult.test_case_id,
+            TestResult.status,
+            (TestResult.created_at == func.now()).label("inserted"),
+        )
+        returned = {row.test_case_id: row for row in db.execute(stmt)}
+
+        for index, item in chunk:
+            row = returned.get(item.test_case_id)
+            if row is None:
+                lines[index] = TestResultBatchLine(
+                    index=index,
+                    test_case_id=item.test_case_id,
+                    outcome="duplicate",
+                    detail="This test case already has a result for this test run.",
+                )
+            else:
+                lines[index] = TestResultBatchLine(
+                    index=index,
+                    test_case_id=item.test_case_id,
+                    outcome="created" if row.inserted else "updated",
+                    result_id=row.id,
+                )
+                # An overwritten row was read above: the run's lock keeps concurrent inserts out
+                previous_status = None if row.inserted else previous_statuses[item.test_case_id]
+                written.append(
+                    WrittenResult(row.id, item.test_case_id, row.status, previous_status, row.inserted, item.duration_ms)
+                )
+
+    _after_results_written(db, run_id, written)
+    db.commit()
+
+    written_case_ids = [line.test_case_id for line in lines if line.outcome in ("created", "updated")]
+    response_cache.invalidate([f"run:{run_id}", *(f"case:{case_id}" for case_id in written_case_ids)])
+    return lines
@@ -0,0 +1,65 @@
+import heapq
+import statistics
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.test_case import TestCase
+from app.models.test_case_stats import TestCaseStats
+
+
+MAX_SHARDS = 256
+# Estimate for every case when none of the selected cases has a recorded duration
+FALLBACK_DURATION_MS = 1000
+
+
+def plan_shards(db: Session, project_id: int, shards: int, priority: str | None = None) -> dict:
+    """Split a project's active test cases into `shards` groups of similar total duration.
+
+    Uses each case's median recent duration from test_case_stats (one indexed read, no
+    scan of test_results); cases without one are estimated at the median of the known
+    medians. Assignment is longest-processing-time first: cases sorted by duration, each
+    given to the currently lightest shard, which keeps the slowest shard within 4/3 of optimal.
+    """
+    stmt = (
+        select(TestCase.id, TestCaseStats.median_duration_ms)
+        .outerjoin(TestCaseStats, TestCaseStats.test_case_id == TestCase.id)
+        .where(TestCase.project_id == project_id, TestCase.is_active.is_(True))
+    )
+    if priority is not None:
+        stmt = stmt.where(TestCase.priority == priority)
+    cases = db.execute(stmt).all()
+
+    known = [duration for _, duration in cases if duration is not None]
+    default_duration = round(statistics.median(known)) if known else FALLBACK_DURATION_MS
+
+    weighted = sorted(
+        ((duration if duration is not None else default_duration, case_id) for case_id, duration in cases),
+        key=lambda case: (-case[0], case[1]),
+    )
+    items = [{"shard": index, "duration_ms": 0, "estimated_cases": 0, "test_case_ids": []} for index in range(shards)]
+    # (total duration, shard index): the lightest shard is always on top
+    heap = [(0, index) for index in range(shards)]
+    estimated = {case_id for case_id, duration in cases if duration is None}
+    for duration, case_id in weighted:
+        load, index = heapq.heappop(heap)
+        shard = items[index]
+        shard["duration_ms"] += duration
+        shard["estimated_cases"] += case_id in estimated
+        shard["test_case_ids"].append(case_id)
+        heapq.heappush(heap, (load + duration, index))
+
+    for shard in items:
+        shard["test_case_ids"].sort()
+
+    return {
+        "project_id": project_id,
+        "shards": shards,
+        "priority": priority,
+        "case_count": len(cases),
+        "estimated_cases": len(estimated),
+        "default_duration_ms": default_duration,
+        "total_duration_ms": sum(shard["duration_ms"] for shard in items),
+        "makespan_ms": max(shard["duration_ms"] for shard in items),
+        "items": items,
+    }
@@ -0,0 +1,81 @@
+from sqlalchemy import exists, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.test_result import TestResult
+from app.models.test_run import TestRun
+from app.models.test_run_summary import TestRunSummary
+from app.models.test_results_archive import TestResultsArchive
+
+
+# status -> counter column on test_run_summaries
+STATUS_COUNT_COLUMNS = {
+    "pass": "pass_count",
+    "fail": "fail_count",
+    "blocked": "blocked_count",
+    "skipped": "skipped_count",
+}
+
+COUNT_COLUMNS = ["executed_count", *STATUS_COUNT_COLUMNS.values()]
+
+
+def apply_summary_changes(db: Session, run_id: int, changes: list[tuple[str | None, str]]) -> None:
+    """Add (previous_status, new_status) transitions to the run's summary row.
+
+    previous_status is None for a newly inserted result. Runs as a single atomic
+    INSERT ... ON CONFLICT DO UPDATE SET col = col + delta, so concurrent writers to the
+    same run don't lose updates. Does not commit; call inside the result write transaction.
+    """
+    deltas = dict.fromkeys(COUNT_COLUMNS, 0)
+    for previous_status, status in changes:
+        if previous_status is None:
+            deltas["executed_count"] += 1
+        else:
+            deltas[STATUS_COUNT_COLUMNS[previous_status]] -= 1
+        deltas[STATUS_COUNT_COLUMNS[status]] += 1
+
+    if not any(deltas.values()):
+        return
+
+    table = TestRunSummary.__table__
+    stmt = insert(table).values(test_run_id=run_id, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.test_run_id],
+        set_={
+            **{column: table.c[column] + stmt.excluded[column] for column in COUNT_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+
+
+def rebuild_summaries(db: Session, run_id: int | None = None) -> int:
+    """Recompute summaries from test_results (backfill / repair). Returns the number of runs rebuilt.
+
+    Runs whose results were archived keep their summaries; their rows are no longer in test_results.
+    """
+    counts = [func.count(TestResult.id).label("executed_count")]
+    for status, column in STATUS_COUNT_COLUMNS.items():
+        counts.append(func.count(TestResult.id).filter(TestResult.status == status).label(column))
+
+    source = (
+        select(TestRun.id.label("test_run_id"), *counts, func.now().label("updated_at"))
+        .outerjoin(TestResult, TestResult.test_run_id == TestRun.id)
+        .where(
+            ~exists().where(TestResultsArchive.from_run_id <= TestRun.id, TestRun.id < TestResultsArchive.to_run_id)
+        )
+        .group_by(TestRun.id)
+    )
+    if run_id is not None:
+        source = source.where(TestRun.id == run_id)
+
+    table = TestRunSummary.__table__
+    stmt = insert(table).from_select(["test_run_id", *COUNT_COLUMNS, "updated_at"], source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.test_run_id],
+        set_={column: stmt.excluded[column] for column in [*COUNT_COLUMNS, "updated_at"]},
+    ).returning(literal_column("1"))
+
+    rebuilt = len(db.execute(stmt).all())
+    db.commit()
+    return rebuilt
@@ -0,0 +1,86 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import Float, Select, case, cast, extract, func, select
+from sqlalchemy.orm import Session
+
+from app.models.test_case import TestCase
+from app.models.test_case_stats import TestCaseStats
+
+
+# Relative weight of each signal in a case's score (they add up to 1)
+FAILURE_RATE_WEIGHT = 0.6
+RECENCY_WEIGHT = 0.3
+PRIORITY_WEIGHT = 0.1
+# The recency signal halves every this many hours since the case last failed
+RECENCY_HALF_LIFE_HOURS = float(os.getenv("TEST_ORDER_RECENCY_HALF_LIFE_HOURS", "72"))
+# Unlisted priorities count as medium
+PRIORITY_WEIGHTS = {"critical": 1.0, "high": 0.75, "medium": 0.5, "low": 0.25}
+# With by_duration, cases faster than this (or never timed) are treated as taking this long
+DURATION_FLOOR_MS = 1000
+
+
+def test_order_query(project_id: int, as_of: datetime, by_duration: bool = False, priority: str | None = None) -> Select:
+    """The project's active cases, likeliest failures first.
+
+    Reads test_cases (by project) joined to test_case_stats by primary key: no result is
+    scanned. The score combines the case's failure rate, how recently it last failed
+    (relative to `as_of`, so every page of one listing ranks alike) and its priority;
+    with `by_duration` it's divided by the median duration in seconds, favouring cheap
+    likely failures.
+    """
+    # Double precision throughout: numeric arithmetic over every case costs several times more
+    hours_since_failure = cast(extract("epoch", as_of - TestCaseStats.last_failure_at), Float) / 3600.0
+    recency = case(
+        (TestCaseStats.last_failure_at.is_(None), 0.0),
+        else_=func.power(0.5, func.greatest(hours_since_failure, 0.0) / RECENCY_HALF_LIFE_HOURS),
+    )
+    priority_weight = cast(case(PRIORITY_WEIGHTS, value=TestCase.priority, else_=PRIORITY_WEIGHTS["medium"]), Float)
+    score = (
+        FAILURE_RATE_WEIGHT * func.coalesce(TestCaseStats.failure_rate, 0.0)
+        + RECENCY_WEIGHT * recency
+        + PRIORITY_WEIGHT * priority_weight
+    )
+    if by_duration:
+        seconds = func.greatest(func.coalesce(TestCaseStats.median_duration_ms, 0), DURATION_FLOOR_MS) / 1000.0
+        score = score / seconds
+    score = cast(score, Float).label("score")
+
+    stmt = (
+        select(
+            TestCase.id.label("test_case_id"),
+            TestCase.title,
+            TestCase.priority,
+            score,
+            func.coalesce(TestCaseStats.failure_rate, 0.0).label("failure_rate"),
+            TestCaseStats.last_failure_at,
+            TestCaseStats.median_duration_ms,
+        )
+        .outerjoin(TestCaseStats, TestCaseStats.test_case_id == TestCase.id)
+        .where(TestCase.project_id == project_id, TestCase.is_active.is_(True))
+        .order_by(score.desc(), TestCase.id)
+    )
+    if priority is not None:
+        stmt = stmt.where(TestCase.priority == priority)
+    return stmt
+
+
+def project_test_order(
+    db: Session,
+    project_id: int,
+    as_of: datetime,
+    by_duration: bool,
+    priority: str | None,
+    offset: int,
+    limit: int,
+) -> dict:
+    """One page of the ranked cases."""
+    stmt = test_order_query(project_id, as_of, by_duration, priority)
+    rows = db.execute(stmt.offset(offset).limit(limit + 1)).all()
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+
+    return {"rows": rows, "next_offset": next_offset}
@@ -0,0 +1,459 @@
+"""Benchmark every API route in-process against the database in DATABASE_URL.
+
+Requests are driven straight through the ASGI app (no sockets, no network), so the numbers
+reflect the app and the database only. Seed a large dataset first, e.g.:
+
+    python -m scripts.seed_data --projects 1 --cases 20000 --runs 50 --results-per-run 20000
+    python -m scripts.benchmark --requests 200 --concurrency 16 --output bench.json
+    python -m scripts.benchmark --compare bench.json     # re-run and diff against a saved run
+
+Routes without a request factory below are listed as skipped, so new routes get noticed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from html import escape
+from urllib.parse import urlencode
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Measure the database path, not the response cache, unless asked otherwise
+if "--with-cache" not in sys.argv:
+    os.environ["CACHE_ENABLED"] = "false"
+# POST /jobs is measured up to the enqueue; jobs are not run inside the benchmark process
+os.environ["JOBS_BACKEND"] = "none"
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event, func, select
+
+from app.db.session import SessionLocal, async_engine, async_replica_engines, engine, replica_engines
+from app.main import app
+from app.models import Job, Project, TestCase, TestResult, TestRun, TestRunSummary, User
+from app.services.diff import previous_run
+from app.services.jobs import JOBS_ARTIFACT_DIR
+
+
+# ------------------ ASGI DRIVER ------------------
+async def asgi_request(method: str, path: str, query: dict | None = None, body: bytes = b"", content_type: str = "application/json"):
+    """Send one request through the ASGI app; returns (status, response_bytes)."""
+    query_string = urlencode(query or {}).encode()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query_string,
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"content-type", content_type.encode())],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+
+    response_done = asyncio.Event()
+    body_sent = False
+    status = 0
+    size = 0
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Streaming responses listen for a disconnect; only send it once the response is complete
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    return status, size
+
+
+# ------------------ QUERY COUNTING ------------------
+query_counter = {"count": 0}
+
+
+def _count_query(*args):
+    query_counter["count"] += 1
+
+
+for counted_engine in [engine, *replica_engines]:
+    event.listen(counted_engine, "before_cursor_execute", _count_query)
+if async_engine is not None:
+    for counted_engine in [async_engine, *async_replica_engines]:
+        event.listen(counted_engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+# ------------------ DATASET ------------------
+def discover_dataset(project_id: int | None) -> dict:
+    """Pick the largest project, its largest run and a case with history to aim the read routes at."""
+    with SessionLocal() as db:
+        if project_id is None:
+            project_id = db.execute(
+                select(TestCase.project_id).group_by(TestCase.project_id).order_by(func.count().desc()).limit(1)
+            ).scalar()
+        if project_id is None:
+            raise SystemExit("No data to benchmark. Seed some first: python -m scripts.seed_data --projects 1")
+
+        run_id = db.execute(
+            select(TestRun.id)
+            .outerjoin(TestRunSummary, TestRunSummary.test_run_id == TestRun.id)
+            .where(TestRun.project_id == project_id)
+            .order_by(func.coalesce(TestRunSummary.executed_count, 0).desc(), TestRun.id.desc())
+            .limit(1)
+        ).scalar()
+        case_ids = list(db.scalars(select(TestCase.id).where(TestCase.project_id == project_id).order_by(TestCase.id)))
+        case_id = db.execute(
+            select(TestResult.test_case_id).join(TestRun, TestRun.id == TestResult.test_run_id)
+            .where(TestRun.project_id == project_id).limit(1)
+        ).scalar() or case_ids[0]
+        user_id = db.execute(select(User.id).limit(1)).scalar()
+        # Diff the big run against its predecessor (or itself when it is the first of its environment)
+        base_run = previous_run(db, db.get(TestRun, run_id))
+        base_run_id = base_run.id if base_run else run_id
+
+        return {
+            "project_id": project_id,
+            "run_id": run_id,
+            "base_run_id": base_run_id,
+            "case_id": case_id,
+            "user_id": user_id,
+            "case_ids": case_ids,
+            "cases": len(case_ids),
+            "runs": db.scalar(select(func.count()).select_from(TestRun).where(TestRun.project_id == project_id)),
+            "results_in_run": db.scalar(select(func.count()).select_from(TestResult).where(TestResult.test_run_id == run_id)),
+            "projects": db.scalar(select(func.count()).select_from(Project)),
+        }
+
+
+def _scratch_run(ctx: dict) -> int:
+    # Write benchmarks go to their own run so they never collide with the dataset being read
+    with SessionLocal() as db:
+        run = TestRun(project_id=ctx["project_id"], name=f"Benchmark scratch run {time.time()}", environment="bench")
+        db.add(run)
+        db.commit()
+        return run.id
+
+
+def _scratch_cases(ctx: dict, count: int) -> list[int]:
+    with SessionLocal() as db:
+        cases = [TestCase(project_id=ctx["project_id"], title=f"Benchmark scratch case {i}") for i in range(count)]
+        db.add_all(cases)
+        db.commit()
+        return [case.id for case in cases]
+
+
+def _scratch_jobs(ctx: dict, count: int, status: str = "queued") -> list[int]:
+    with SessionLocal() as db:
+        jobs = [Job(kind="flakiness", params={"project_id": ctx["project_id"]}, status=status) for _ in range(count)]
+        db.add_all(jobs)
+        db.commit()
+        return [job.id for job in jobs]
+
+
+def _artifact_job_setup(ctx, n):
+    job_id = _scratch_jobs(ctx, 1, status="succeeded")[0]
+    os.makedirs(JOBS_ARTIFACT_DIR, exist_ok=True)
+    path = os.path.join(JOBS_ARTIFACT_DIR, f"job-{job_id}.ndjson")
+    with open(path, "wb") as f:
+        f.write(b'{"id": 1}\n' * 10_000)
+    with SessionLocal() as db:
+        job = db.get(Job, job_id)
+        job.artifact_path, job.artifact_media_type, job.artifact_bytes = path, "application/x-ndjson", os.path.getsize(path)
+        db.commit()
+    return {"job_id": job_id}
+
+
+# ------------------ REQUEST FACTORIES ------------------
+# (method, route path) -> setup(ctx, n) returning a per-route state; and request(ctx, state, i)
+# returning (path, query, body). Keep one entry per route in app/main.py, except
+# GET /test-runs/{run_id}/events: a stream that never completes, so it is reported as skipped.
+def _json(payload) -> bytes:
+    return json.dumps(payload).encode()
+
+
+def _batch_setup(ctx, n):
+    return {"run_id": _scratch_run(ctx)}
+
+
+def _batch_request(ctx, state, i):
+    rows = [{"test_case_id": case_id, "status": "pass"} for case_id in ctx["case_ids"][:1000]]
+    return f"/test-runs/{state['run_id']}/results:batch", {"mode": "upsert"}, _json(rows)
+
+
+def _import_setup(ctx, n):
+    with SessionLocal() as db:
+        titles = db.scalars(
+            select(TestCase.title).where(TestCase.id.in_(ctx["case_ids"][:1000])).order_by(TestCase.id)
+        ).all()
+    cases = "".join(f'<testcase classname="bench" name="{escape(title, quote=True)}" time="0.01"/>' for title in titles)
+    report = f'<testsuites><testsuite name="bench">{cases}</testsuite></testsuites>'.encode()
+    return {"run_id": _scratch_run(ctx), "report": report}
+
+
+def _import_request(ctx, state, i):
+    return f"/test-runs/{state['run_id']}/results:import", {"mode": "upsert"}, state["report"]
+
+
+REQUEST_FACTORIES = {
+    ("GET", "/"): (None, lambda ctx, s, i: ("/", None, b"")),
+    ("GET", "/health"): (None, lambda ctx, s, i: ("/health", None, b"")),
+    ("GET", "/health/db"): (None, lambda ctx, s, i: ("/health/db", None, b"")),
+    ("GET", "/health/db/pool"): (None, lambda ctx, s, i: ("/health/db/pool", None, b"")),
+    ("GET", "/metrics"): (None, lambda ctx, s, i: ("/metrics", None, b"")),
+    ("POST", "/users"): (
+        None,
+        lambda ctx, s, i: ("/users", None, _json({"email": f"bench{time.time_ns()}@example.com", "name": "Bench", "role": "qa"})),
+    ),
+    ("GET", "/users"): (None, lambda ctx, s, i: ("/users", {"limit": 100}, b"")),
+    ("GET", "/users/{user_id}"): (None, lambda ctx, s, i: (f"/users/{ctx['user_id']}", None, b"")),
+    ("POST", "/projects"): (None, lambda ctx, s, i: ("/projects", None, _json({"name": f"Bench {time.time_ns()}"}))),
+    ("GET", "/projects"): (None, lambda ctx, s, i: ("/projects", {"limit": 100}, b"")),
+    ("POST", "/test-cases"): (
+        None,
+        lambda ctx, s, i: ("/test-cases", None, _json({"project_id": ctx["project_id"], "title": f"Bench case {i}"})),
+    ),
+    ("GET", "/test-cases"): (None, lambda ctx, s, i: ("/test-cases", {"project_id": ctx["project_id"], "limit": 100}, b"")),
+    ("PUT", "/test-cases/{test_case_id}"): (
+        lambda ctx, n: {"case_ids": _scratch_cases(ctx, 1)},
+        lambda ctx, s, i: (f"/test-cases/{s['case_ids'][0]}", None, _json({"description": f"edit {i}"})),
+    ),
+    ("DELETE", "/test-cases/{test_case_id}"): (
+        lambda ctx, n: {"case_ids": _scratch_cases(ctx, n)},
+        lambda ctx, s, i: (f"/test-cases/{s['case_ids'][i]}", None, b""),
+    ),
+    ("POST", "/test-runs"): (
+        None,
+        lambda ctx, s, i: ("/test-runs", None, _json({"project_id": ctx["project_id"], "name": f"Bench run {i}"})),
+    ),
+    ("GET", "/test-runs"): (None, lambda ctx, s, i: ("/test-runs", {"project_id": ctx["project_id"], "limit": 100}, b"")),
+    ("GET", "/test-runs/{run_id}/summary"): (None, lambda ctx, s, i: (f"/test-runs/{ctx['run_id']}/summary", None, b"")),
+    ("POST", "/test-results"): (
+        lambda ctx, n: {"run_id": _scratch_run(ctx)},
+        lambda ctx, s, i: (
+            "/test-results",
+            None,
+            _json({"test_run_id": s["run_id"], "test_case_id": ctx["case_ids"][i % ctx["cases"]], "status": "pass"}),
+        ),
+    ),
+    ("POST", "/test-runs/{run_id}/results:batch"): (_batch_setup, _batch_request),
+    ("POST", "/test-runs/{run_id}/results:import"): (_import_setup, _import_request),
+    ("GET", "/test-results"): (None, lambda ctx, s, i: ("/test-results", {"run_id": ctx["run_id"], "limit": 1000}, b"")),
+    ("GET", "/test-results/export"): (None, lambda ctx, s, i: ("/test-results/export", {"run_id": ctx["run_id"]}, b"")),
+    ("GET", "/test-runs/{run_id}/report"): (None, lambda ctx, s, i: (f"/test-runs/{ctx['run_id']}/report", None, b"")),
+    ("GET", "/test-runs/{run_id}/coverage"): (None, lambda ctx, s, i: (f"/test-runs/{ctx['run_id']}/coverage", None, b"")),
+    ("GET", "/test-cases/{test_case_id}/history"): (
+        None,
+        lambda ctx, s, i: (f"/test-cases/{ctx['case_id']}/history", None, b""),
+    ),
+    ("GET", "/test-runs/{run_id}/diff/previous"): (
+        None,
+        lambda ctx, s, i: (f"/test-runs/{ctx['run_id']}/diff/previous", {"limit": 1000}, b""),
+    ),
+    ("GET", "/test-runs/{run_id}/diff/{base_run_id}"): (
+        None,
+        lambda ctx, s, i: (f"/test-runs/{ctx['run_id']}/diff/{ctx['base_run_id']}", {"limit": 1000}, b""),
+    ),
+    ("GET", "/projects/{project_id}/flakiness"): (
+        None,
+        lambda ctx, s, i: (f"/projects/{ctx['project_id']}/flakiness", {"window_runs": 20, "limit": 100}, b""),
+    ),
+    ("GET", "/projects/{project_id}/shards"): (
+        None,
+        lambda ctx, s, i: (f"/projects/{ctx['project_id']}/shards", {"shards": 16}, b""),
+    ),
+    ("GET", "/projects/{project_id}/test-order"): (
+        None,
+        lambda ctx, s, i: (f"/projects/{ctx['project_id']}/test-order", {"limit": 1000}, b""),
+    ),
+    ("GET", "/projects/{project_id}/health"): (
+        None,
+        lambda ctx, s, i: (f"/projects/{ctx['project_id']}/health", None, b""),
+    ),
+    ("GET", "/projects/{project_id}/status-matrix"): (
+        None,
+        lambda ctx, s, i: (f"/projects/{ctx['project_id']}/status-matrix", None, b""),
+    ),
+    ("POST", "/jobs"): (
+        None,
+        lambda ctx, s, i: ("/jobs", None, _json({"kind": "flakiness", "params": {"project_id": ctx["project_id"]}})),
+    ),
+    ("GET", "/jobs/{job_id}"): (
+        lambda ctx, n: {"job_ids": _scratch_jobs(ctx, 1, status="succeeded")},
+        lambda ctx, s, i: (f"/jobs/{s['job_ids'][0]}", None, b""),
+    ),
+    ("GET", "/jobs/{job_id}/artifact"): (_artifact_job_setup, lambda ctx, s, i: (f"/jobs/{s['job_id']}/artifact", None, b"")),
+    ("POST", "/jobs/{job_id}/cancel"): (
+        lambda ctx, n: {"job_ids": _scratch_jobs(ctx, n)},
+        lambda ctx, s, i: (f"/jobs/{s['job_ids'][i]}/cancel", None, b""),
+    ),
+}
+
+
+# ------------------ RUNNER ------------------
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def benchmark_route(method, path_template, factory, ctx, requests, concurrency, warmup) -> dict:
+    setup, make_request = factory
+    # Sequential latencies + a concurrent throughput pass, each with its own requests
+    total = warmup + requests * 2
+    state = setup(ctx, total) if setup else None
+    counter = iter(range(total))
+
+    async def one():
+        path, query, body = make_request(ctx, state, next(counter))
+        start = time.perf_counter()
+        status, size = await asgi_request(method, path, query, body)
+        return time.perf_counter() - start, status, size
+
+    for _ in range(warmup):
+        await one()
+
+    latencies, statuses, sizes = [], {}, []
+    query_counter["count"] = 0
+    for _ in range(requests):
+        elapsed, status, size = await one()
+        latencies.append(elapsed)
+        statuses[status] = statuses.get(status, 0) + 1
+        sizes.append(size)
+    queries_per_request = query_counter["count"] / max(requests, 1)
+
+    # Throughput: `concurrency` clients issuing requests back to back
+    remaining = requests
+
+    async def client():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await one()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    throughput = requests / (time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_rps": round(throughput, 1),
+        "queries_per_request": round(queries_per_request, 2),
+        "response_bytes": round(statistics.fmean(sizes)),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def run_benchmarks(args) -> dict:
+    ctx = discover_dataset(args.project_id)
+    routes = {}
+
+    async with app.router.lifespan_context(app):
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            for method in sorted(route.methods):
+                key = f"{method} {route.path}"
+                if args.only and not any(fragment in key for fragment in args.only):
+                    continue
+                factory = REQUEST_FACTORIES.get((method, route.path))
+                if factory is None:
+                    routes[key] = {"skipped": "no request factory in scripts/benchmark.py"}
+                    print(f"{key:55} skipped (no request factory)")
+                    continue
+
+                requests = min(args.requests, args.write_requests) if method != "GET" else args.requests
+                stats = await benchmark_route(method, route.path, factory, ctx, requests, args.concurrency, args.warmup)
+                routes[key] = stats
+                print(
+                    f"{key:55} p50 {stats['p50_ms']:9.2f}ms  p95 {stats['p95_ms']:9.2f}ms  "
+                    f"p99 {stats['p99_ms']:9.2f}ms  {stats['throughput_rps']:8.1f} rps  "
+                    f"{stats['queries_per_request']:6.2f} q/req"
+                )
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit or None,
+        "config": {
+            "requests": args.requests,
+            "write_requests": args.write_requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "cache": "--with-cache" in sys.argv,
+            "db_async": async_engine is not None,
+            "replicas": len(replica_engines),
+        },
+        "dataset": {key: value for key, value in ctx.items() if key != "case_ids"},
+        "routes": routes,
+    }
+
+
+def print_comparison(baseline: dict, current: dict) -> None:
+    print(f"\nComparison against {baseline.get('git_commit')} (p50 / p95, negative is faster):")
+    for key, stats in current["routes"].items():
+        before = baseline.get("routes", {}).get(key)
+        if not before or "skipped" in before or "skipped" in stats:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p95_ms"):
+            if before[metric]:
+                deltas.append(f"{(stats[metric] - before[metric]) / before[metric] * 100:+7.1f}%")
+        print(f"{key:55} {'  '.join(deltas)}  queries {before['queries_per_request']} -> {stats['queries_per_request']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="measured requests per read route")
+    parser.add_argument("--write-requests", type=int, default=50, help="measured requests per write route")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients for the throughput pass")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per route")
+    parser.add_argument("--project-id", type=int, help="project to aim at (default: the one with the most cases)")
+    parser.add_argument("--only", nargs="*", help="only routes whose 'METHOD /path' contains one of these")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON file from a previous run to compare against")
+    parser.add_argument("--with-cache", action="store_true", help="leave the response cache enabled")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmarks(args))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Compare JSON serialization paths for large responses, without a database.
+
+Builds synthetic coverage/report rows (shaped like the column-only query rows) and times:
+
+  response_model  Pydantic model per row, then FastAPI's validate + serialize + stdlib json.dumps
+                  (how list endpoints and response_model routes used to respond)
+  model_dump_json Pydantic model per row, serialized by pydantic-core (old cached endpoints)
+  rows_orjson     row tuples -> dicts -> orjson (what the endpoints do now)
+
+    python -m scripts.benchmark_serialization --rows 20000 --repeat 20
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from pydantic import TypeAdapter
+
+from app.schemas.coverage import CoverageLine, TestRunCoverageOut
+from app.schemas.report import TestResultLine, TestRunInfo, TestRunReportOut
+from app.serialization import dumps, row_dicts
+
+
+CoverageRow = namedtuple("CoverageRow", ["test_case_id", "title", "status", "notes"])
+ReportRow = namedtuple("ReportRow", ["id", "test_case_id", "test_case_title", "status", "notes", "created_at"])
+STATUSES = ["pass", "pass", "pass", "fail", "blocked", "skipped", "not_run"]
+
+
+def _coverage_payloads(count: int):
+    rows = [
+        CoverageRow(i, f"Bench case {i}", STATUSES[i % len(STATUSES)], "Generated failure" if i % 7 == 3 else None)
+        for i in range(1, count + 1)
+    ]
+    summary = {
+        "run_id": 1,
+        "project_id": 1,
+        "total_cases": count,
+        "executed_cases": count,
+        "not_run_cases": 0,
+        "pass_count": count,
+        "fail_count": 0,
+        "blocked_count": 0,
+        "skipped_count": 0,
+        "pass_rate": 1.0,
+    }
+
+    def as_model():
+        lines = [CoverageLine(test_case_id=r[0], title=r[1], status=r[2], notes=r[3]) for r in rows]
+        return TestRunCoverageOut(**summary, lines=lines)
+
+    def as_rows():
+        return {**summary, "lines": row_dicts(CoverageLine, rows)}
+
+    return TestRunCoverageOut, as_model, as_rows
+
+
+def _report_payloads(count: int):
+    started_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [
+        ReportRow(
+            i,
+            i,
+            f"Bench case {i}",
+            STATUSES[i % 4],
+            "Generated failure" if i % 4 == 1 else None,
+            started_at + timedelta(seconds=i),
+        )
+        for i in range(1, count + 1)
+    ]
+    run = {"id": 1, "project_id": 1, "name": "Bench run", "environment": "staging", "started_at": started_at, "completed_at": None}
+
+    def as_model():
+        lines = [
+            TestResultLine(id=r[0], test_case_id=r[1], test_case_title=r[2], status=r[3], notes=r[4], created_at=r[5])
+            for r in rows
+        ]
+        return TestRunReportOut(run=TestRunInfo(**run), results=lines)
+
+    def as_rows():
+        return {"run": run, "results": row_dicts(TestResultLine, rows)}
+
+    return TestRunReportOut, as_model, as_rows
+
+
+def _time(fn, repeat: int) -> tuple[float, int]:
+    size = len(fn())  # warm up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare JSON serialization paths for large responses.")
+    parser.add_argument("--rows", type=int, default=20000, help="lines per payload")
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions per variant (median reported)")
+    args = parser.parse_args()
+
+    for name, factory in (("coverage", _coverage_payloads), ("report", _report_payloads)):
+        model_cls, as_model, as_rows = factory(args.rows)
+        adapter = TypeAdapter(model_cls)
+
+        def response_model():
+            # FastAPI re-validates the returned model, dumps it to JSON-able Python, then JSONResponse encodes it
+            content = adapter.dump_python(adapter.validate_python(as_model()), mode="json")
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+        variants = {
+            "response_model": response_model,
+            "model_dump_json": lambda: as_model().model_dump_json().encode(),
+            "rows_orjson": lambda: dumps(as_rows()),
+        }
+
+        print(f"\n{name}: {args.rows} lines")
+        baseline = None
+        for variant, fn in variants.items():
+            ms, size = _time(fn, args.repeat)
+            baseline = baseline or ms
+            print(f"  {variant:16} {ms:9.2f} ms  {size / 1024:8.0f} KiB  {baseline / ms:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Fail when a foreign key or a known query pattern has no supporting index.
+
+Run with:
+    python -m scripts.check_indexes            # model metadata only
+    python -m scripts.check_indexes --live     # also compare against the database in DATABASE_URL
+
+When you add a query that filters or sorts on new columns, register it in QUERY_PATTERNS.
+tests/test_indexes.py runs this check, and also plans every statement the endpoints
+actually run, so a pattern missing from QUERY_PATTERNS is caught there.
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import UniqueConstraint, create_engine, inspect
+
+from app.db.base import Base
+import app.models  # ensures all models are registered on Base.metadata
+
+
+load_dotenv()
+
+
+# (table, columns the query filters on with equality, then the column it sorts/ranges on)
+QUERY_PATTERNS = [
+    # get_test_run_coverage: test cases for the run's project
+    ("test_cases", ("project_id",)),
+    # get_test_run_coverage / get_test_run_report: results for one run
+    ("test_results", ("test_run_id",)),
+    # get_test_case_history: results for one case, newest first
+    ("test_results", ("test_case_id", "created_at")),
+    # date-range reads over results
+    ("test_results", ("created_at",)),
+    # import_report: test cases of a project by title
+    ("test_cases", ("project_id", "title")),
+    # runs for a project
+    ("test_runs", ("project_id",)),
+    # project_flakiness: latest runs of a project
+    ("test_runs", ("project_id", "started_at")),
+    # diff_test_run_with_previous: latest earlier run in a project + environment
+    ("test_runs", ("project_id", "environment", "started_at")),
+    # project_health: latest result counts per environment and status, and the failing cases
+    ("test_case_latest_results", ("project_id", "status", "environment")),
+    # claim_next_job: oldest queued job, and running jobs with a stale heartbeat
+    ("jobs", ("status", "id")),
+]
+
+
+def _index_column_lists(table) -> list[tuple[str, ...]]:
+    """Leading-column lists of every index, unique constraint and primary key on a table."""
+    column_lists = [tuple(c.name for c in table.primary_key.columns)]
+
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            column_lists.append(tuple(c.name for c in constraint.columns))
+
+    for index in table.indexes:
+        names = []
+        for expr in index.expressions:
+            # DESC/ASC wrap the column; unwrap to its name
+            element = getattr(expr, "element", expr)
+            names.append(getattr(element, "name", str(element)))
+        column_lists.append(tuple(names))
+
+    return column_lists
+
+
+def _is_covered(columns: tuple[str, ...], column_lists: list[tuple[str, ...]]) -> bool:
+    # The filter/sort columns must be the leading columns of some index (equality columns in any order)
+    for existing in column_lists:
+        if len(existing) >= len(columns) and set(existing[: len(columns)]) == set(columns):
+            return True
+    return False
+
+
+def check_metadata() -> list[str]:
+    problems = []
+    tables = Base.metadata.tables
+
+    for table in tables.values():
+        column_lists = _index_column_lists(table)
+        for fk in table.foreign_keys:
+            if not _is_covered((fk.parent.name,), column_lists):
+                problems.append(f"{table.name}.{fk.parent.name}: foreign key has no index")
+
+    for table_name, columns in QUERY_PATTERNS:
+        table = tables.get(table_name)
+        if table is None:
+            problems.append(f"{table_name}: table in QUERY_PATTERNS does not exist")
+            continue
+        if not _is_covered(columns, _index_column_lists(table)):
+            problems.append(f"{table_name}({', '.join(columns)}): query pattern has no supporting index")
+
+    return problems
+
+
+def check_database(db_url: str) -> list[str]:
+    """Report model indexes that are missing from the live database (i.e. a migration is missing)."""
+    problems = []
+    inspector = inspect(create_engine(db_url))
+
+    for table in Base.metadata.tables.values():
+        if not inspector.has_table(table.name):
+            problems.append(f"{table.name}: table missing from database")
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                problems.append(f"{table.name}: index {index.name} missing from database")
+
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", action="store_true", help="also check the database in DATABASE_URL")
+    args = parser.parse_args()
+
+    problems = check_metadata()
+
+    if args.live:
+        db_url = os.getenv("DATABASE_URL")
+        if not db_url:
+            raise SystemExit("DATABASE_URL is not set. Check your .env and restart the terminal.")
+        problems += check_database(db_url)
+
+    if problems:
+        print("Index check failed:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+
+    print("Index check passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Maintain test_results partitions: create ahead, archive old ones, restore or query archives.
+
+Run with:
+    python -m scripts.manage_partitions list
+    python -m scripts.manage_partitions ensure                       # schedule this, e.g. daily
+    python -m scripts.manage_partitions archive --older-than-days 365 [--dry-run]
+    python -m scripts.manage_partitions restore test_results_r3000
+    python -m scripts.manage_partitions query --run-id 3120 [--test-case-id 7] [--format csv]
+"""
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.db.partitions import (
+    ARCHIVE_DIR,
+    archivable_partitions,
+    archive_detached,
+    detach_partition,
+    detached_partitions,
+    ensure_partitions,
+    iter_archived_rows,
+    list_partitions,
+    restore_archive,
+)
+from app.db.session import engine
+
+
+def cmd_list(args) -> None:
+    with engine.connect() as conn:
+        for partition in list_partitions(conn):
+            bounds = (
+                f"runs {partition['from_run_id']}-{partition['to_run_id'] - 1}"
+                if partition["from_run_id"] is not None
+                else "default"
+            )
+            print(f"{partition['name']:28} {bounds:20} ~{partition['estimated_rows']:>12,} rows {partition['bytes'] / 2**20:>10.1f} MiB")
+        for name in detached_partitions(conn):
+            print(f"{name:28} detached, not archived yet (re-run archive)")
+        for archive in conn.execute(
+            text("SELECT partition_name, from_run_id, to_run_id, row_count, path FROM test_results_archives ORDER BY from_run_id")
+        ):
+            print(
+                f"{archive.partition_name:28} runs {archive.from_run_id}-{archive.to_run_id - 1:<10} "
+                f"{archive.row_count:>13,} rows archived to {archive.path}"
+            )
+
+
+def cmd_ensure(args) -> None:
+    with engine.begin() as conn:
+        created = ensure_partitions(conn)
+    print(f"Created {len(created)} partition(s): {', '.join(created)}" if created else "Partitions are up to date.")
+
+
+def cmd_archive(args) -> None:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=args.older_than_days)
+
+    with engine.connect() as conn:
+        candidates = archivable_partitions(conn, cutoff)
+        leftovers = detached_partitions(conn)
+
+    if args.dry_run:
+        for partition in candidates:
+            print(f"Would archive {partition['name']} (runs {partition['from_run_id']}-{partition['to_run_id'] - 1})")
+        for name in leftovers:
+            print(f"Would archive detached {name}")
+        return
+
+    # Detaching is its own short transaction so writers aren't blocked while the file is written
+    for partition in candidates:
+        with engine.begin() as conn:
+            detach_partition(conn, partition)
+        leftovers.append(partition["name"])
+
+    for name in leftovers:
+        with engine.begin() as conn:
+            archive = archive_detached(conn, name, args.archive_dir)
+        print(f"Archived {archive['name']}: {archive['row_count']} rows -> {archive['path']}")
+
+    if not candidates and not leftovers:
+        print("Nothing to archive.")
+
+
+def cmd_restore(args) -> None:
+    with engine.begin() as conn:
+        rows = restore_archive(conn, args.name)
+    print(f"Restored {args.name}: {rows} rows re-attached.")
+
+
+def cmd_query(args) -> None:
+    with engine.connect() as conn:
+        archive = conn.execute(
+            text("SELECT path FROM test_results_archives WHERE from_run_id <= :run_id AND :run_id < to_run_id"),
+            {"run_id": args.run_id},
+        ).first()
+    if archive is None:
+        raise SystemExit(f"Run {args.run_id} is not in an archived partition.")
+
+    rows = iter_archived_rows(archive.path, run_id=args.run_id, test_case_id=args.test_case_id)
+    if args.format == "csv":
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(sys.stdout, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+    else:
+        for row in rows:
+            print(json.dumps(row))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="show partitions, detached tables and archives").set_defaults(func=cmd_list)
+    commands.add_parser("ensure", help="create partitions ahead of the newest run").set_defaults(func=cmd_ensure)
+
+    archive = commands.add_parser("archive", help="detach and archive partitions whose runs are all old")
+    archive.add_argument("--older-than-days", type=int, required=True)
+    archive.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    archive.add_argument("--dry-run", action="store_true")
+    archive.set_defaults(func=cmd_archive)
+
+    restore = commands.add_parser("restore", help="load an archived partition back into test_results")
+    restore.add_argument("name")
+    restore.set_defaults(func=cmd_restore)
+
+    query = commands.add_parser("query", help="read archived results of one run without restoring them")
+    query.add_argument("--run-id", type=int, required=True)
+    query.add_argument("--test-case-id", type=int, default=None)
+    query.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    query.set_defaults(func=cmd_query)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Recompute test_case_stats from test_results (backfill or repair after drift).
+
+Run with:
+    python -m scripts.rebuild_case_stats                 # every test case
+    python -m scripts.rebuild_case_stats --project-id 7  # one project's cases
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.case_stats import rebuild_case_stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--project-id", type=int, default=None, help="only rebuild this project's test cases")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuilt = rebuild_case_stats(db, project_id=args.project_id)
+
+    print(f"Rebuilt stats for {rebuilt} test case(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Recompute test_case_latest_results from test_results (backfill or repair after drift).
+
+Run with:
+    python -m scripts.rebuild_latest_results                 # every project
+    python -m scripts.rebuild_latest_results --project-id 7  # one project
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.latest import rebuild_latest_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--project-id", type=int, default=None, help="only rebuild this project")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuilt = rebuild_latest_results(db, project_id=args.project_id)
+
+    print(f"Rebuilt {rebuilt} latest result(s).")
+
+
+if __name__ == "__main__":
+    main()
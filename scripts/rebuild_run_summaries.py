@@ -0,0 +1,25 @@
+"""Recompute test_run_summaries from test_results (backfill or repair after drift).
+
+Run with:
+    python -m scripts.rebuild_run_summaries             # every run
+    python -m scripts.rebuild_run_summaries --run-id 42 # one run
+"""
+import argparse
+
+from app.db.session import SessionLocal
+from app.services.summaries import rebuild_summaries
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--run-id", type=int, default=None, help="only rebuild this run")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        rebuilt = rebuild_summaries(db, run_id=args.run_id)
+
+    print(f"Rebuilt summaries for {rebuilt} run(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Run background jobs outside the API processes (use with JOBS_BACKEND=none on the API).
+
+Run with:
+    python -m scripts.run_jobs                  # poll for queued jobs until interrupted
+    python -m scripts.run_jobs --once           # drain the queue, then exit
+Start several copies for more concurrency; they share the queue safely.
+"""
+import argparse
+import logging
+import time
+
+from app.services.jobs import run_next_job
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    parser.add_argument("--poll-seconds", type=float, default=2.0, help="wait between polls of an empty queue")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    while True:
+        job_id = run_next_job()
+        if job_id is not None:
+            logging.info("Finished job %s", job_id)
+            continue
+        if args.once:
+            break
+        time.sleep(args.poll_seconds)
+
+
+if __name__ == "__main__":
+    main()
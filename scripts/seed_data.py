@@ -1,8 +1,17 @@
+import argparse
 import os
-from sqlalchemy import create_engine
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, select
 from sqlalchemy.orm import sessionmaker
 
+from app.db.partitions import ensure_partitions
 from app.models import User, Project, TestCase, TestRun, TestResult
+from app.services.case_stats import rebuild_case_stats
+from app.services.latest import rebuild_latest_results
+from app.services.summaries import rebuild_summaries
 
 from dotenv import load_dotenv
 
@@ -10,12 +19,146 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+ENVIRONMENTS = ["staging", "qa", "prod"]
+PRIORITIES = ["low", "medium", "medium", "high"]
+# Roughly what a healthy regression suite looks like
+STATUS_WEIGHTS = {"pass": 85, "fail": 8, "blocked": 3, "skipped": 4}
+
+
+def _copy_rows(engine, table: str, columns: list[str], rows) -> int:
+    """Bulk load rows with Postgres COPY (much faster than INSERTs at this scale)."""
+    count = 0
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    count += 1
+        raw.commit()
+    finally:
+        raw.close()
+    return count
+
+
+def seed_large(engine, projects: int, cases: int, runs: int, results_per_run: int, seed: int) -> None:
+    """Generate a synthetic dataset for benchmarking: projects x cases, projects x runs x results.
+
+    Results are streamed into COPY, so memory stays flat even for tens of millions of rows.
+    """
+    rng = random.Random(seed)
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    results_per_run = min(results_per_run, cases)
+    # Unique suffix so repeated invocations don't collide on projects.name
+    tag = f"{int(time.time())}-{seed}"
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    total_results = 0
+
+    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+    for p in range(projects):
+        with SessionLocal() as db:
+            project = Project(name=f"Bench Project {p + 1} ({tag})", description="Synthetic benchmark data")
+            db.add(project)
+            db.commit()
+            project_id = project.id
+
+        _copy_rows(
+            engine,
+            "test_cases",
+            ["project_id", "title", "description", "priority", "is_active"],
+            (
+                (project_id, f"Bench case {p + 1}.{c + 1}", None, rng.choice(PRIORITIES), rng.random() > 0.02)
+                for c in range(cases)
+            ),
+        )
+
+        # Runs are spread one per hour going back in time, oldest first
+        _copy_rows(
+            engine,
+            "test_runs",
+            ["project_id", "name", "environment", "started_at", "completed_at"],
+            (
+                (
+                    project_id,
+                    f"Bench run {r + 1}",
+                    ENVIRONMENTS[r % len(ENVIRONMENTS)],
+                    now - timedelta(hours=runs - r),
+                    now - timedelta(hours=runs - r) + timedelta(minutes=30),
+                )
+                for r in range(runs)
+            ),
+        )
+
+        # Results of the new runs must land in their own partitions, not the default one
+        with engine.begin() as connection:
+            ensure_partitions(connection)
+
+        with SessionLocal() as db:
+            case_ids = list(db.scalars(select(TestCase.id).where(TestCase.project_id == project_id).order_by(TestCase.id)))
+            run_rows = db.execute(
+                select(TestRun.id, TestRun.started_at).where(TestRun.project_id == project_id).order_by(TestRun.id)
+            ).all()
+
+        # Long-tailed typical durations (most cases take a second or two, a few take minutes),
+        # with per-result jitter
+        typical_ms = {case_id: rng.lognormvariate(7, 1.2) for case_id in case_ids}
+
+        def result_rows():
+            for run_id, run_started_at in run_rows:
+                for case_id in rng.sample(case_ids, results_per_run):
+                    status = rng.choices(statuses, weights)[0]
+                    yield (
+                        run_id,
+                        case_id,
+                        status,
+                        "Generated failure" if status == "fail" else None,
+                        None if status == "skipped" else round(typical_ms[case_id] * rng.uniform(0.8, 1.3)),
+                        run_started_at + timedelta(seconds=rng.randint(0, 1800)),
+                    )
+
+        total_results += _copy_rows(
+            engine,
+            "test_results",
+            ["test_run_id", "test_case_id", "status", "notes", "duration_ms", "created_at"],
+            result_rows(),
+        )
+        print(f"Project {p + 1}/{projects}: id={project_id}, {cases} cases, {runs} runs, {runs * results_per_run} results")
+
+    # Derived tables are maintained on the API write path; COPY bypasses it, so rebuild them
+    with SessionLocal() as db:
+        rebuild_summaries(db)
+        rebuild_case_stats(db)
+        rebuild_latest_results(db)
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    elapsed = time.perf_counter() - started
+    print(f"Seed complete: {total_results} results in {elapsed:.1f}s ({total_results / max(elapsed, 1e-9):,.0f} rows/s).")
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Seed demo data, or a large synthetic dataset for benchmarks.")
+    parser.add_argument("--projects", type=int, help="number of synthetic projects (enables the large generator)")
+    parser.add_argument("--cases", type=int, default=1000, help="test cases per project")
+    parser.add_argument("--runs", type=int, default=50, help="test runs per project")
+    parser.add_argument("--results-per-run", type=int, default=1000, help="results per run (capped at --cases)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    args = parser.parse_args()
+
     db_url = os.getenv("DATABASE_URL")
     if not db_url:
         raise SystemExit("DATABASE_URL is not set. Check your .env and restart the terminal.")
 
     engine = create_engine(db_url)
+
+    if args.projects:
+        seed_large(engine, args.projects, args.cases, args.runs, args.results_per_run, args.seed)
+        return
+
     SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
     with SessionLocal() as db:
@@ -68,17 +211,20 @@ def main() -> None:
         # Results for first 4 cases (if available)
         seed_pairs = []
         if len(cases) >= 1:
-            seed_pairs.append((cases[0].id, "pass", "OK"))
+            seed_pairs.append((cases[0].id, "pass", "OK", 1200))
         if len(cases) >= 2:
-            seed_pairs.append((cases[1].id, "fail", "Bug: error message wrong"))
+            seed_pairs.append((cases[1].id, "fail", "Bug: error message wrong", 3400))
         if len(cases) >= 3:
-            seed_pairs.append((cases[2].id, "blocked", "Email service down"))
+            seed_pairs.append((cases[2].id, "blocked", "Email service down", None))
         if len(cases) >= 4:
-            seed_pairs.append((cases[3].id, "skipped", "Out of scope for smoke"))
+            seed_pairs.append((cases[3].id, "skipped", "Out of scope for smoke", None))
 
-        for tc_id, status, notes in seed_pairs:
-            db.add(TestResult(test_run_id=run.id, test_case_id=tc_id, status=status, notes=notes))
+        for tc_id, status, notes, duration_ms in seed_pairs:
+            db.add(TestResult(test_run_id=run.id, test_case_id=tc_id, status=status, notes=notes, duration_ms=duration_ms))
         db.commit()
+        rebuild_summaries(db, run_id=run.id)
+        rebuild_case_stats(db, project_id=project.id)
+        rebuild_latest_results(db, project_id=project.id)
 
         project_id = project.id
         user_id = user.id
@@ -0,0 +1,125 @@
+"""Shared fixtures: a migrated test database, a TestClient and row factories.
+
+The suite runs against the PostgreSQL database in TEST_DATABASE_URL (the schema relies on
+Postgres enums, partitions and ON CONFLICT). That database is wiped at the start of the
+session and every table is truncated after each test, so never point it at real data.
+App modules are imported inside the fixtures: they need DATABASE_URL at import time.
+"""
+import os
+import re
+
+import pytest
+
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.setdefault("JOBS_BACKEND", "none")
+    os.environ.setdefault("CACHE_BACKEND", "memory")
+    os.environ.pop("DATABASE_REPLICA_URLS", None)
+    os.environ.pop("METRICS_MULTIPROC_DIR", None)
+else:
+    # Test modules import the app, which can't start without a database: collect nothing
+    collect_ignore_glob = ["test_*.py"]
+
+    def pytest_report_header():
+        return "TEST_DATABASE_URL is not set: no tests collected (see tests/README.md)"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """Recreate the schema from the migrations, once per session."""
+    from alembic import command
+    from alembic.config import Config
+    from sqlalchemy import text
+
+    from app.db.session import engine
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    command.upgrade(Config(os.path.join(ROOT, "alembic.ini")), "head")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_database(migrated_database):
+    from sqlalchemy import text
+
+    from app.cache import _build_backend, response_cache
+    from app.db.base import Base
+
+    yield
+    tables = ", ".join(table.name for table in Base.metadata.sorted_tables)
+    with migrated_database.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+    # Ids restart with the tables, so cached bodies from earlier tests must not survive
+    response_cache.backend = _build_backend()
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    from app.db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def query_count():
+    """Statements a response's request ran, as counted by app.db.instrumentation (its Server-Timing header)."""
+
+    def count(response) -> int:
+        return int(_SERVER_TIMING_QUERIES.search(response.headers["server-timing"]).group(1))
+
+    return count
+
+
+@pytest.fixture
+def factory(db):
+    """Insert rows directly, committed, and return them."""
+    from app import models
+
+    class Factory:
+        def project(self, name="Project", **values):
+            return self._add(models.Project(name=name, **values))
+
+        def case(self, project, title=None, **values):
+            title = title or f"Case {db.query(models.TestCase).count() + 1}"
+            return self._add(models.TestCase(project_id=project.id, title=title, **values))
+
+        def run(self, project, name="Run", **values):
+            return self._add(models.TestRun(project_id=project.id, name=name, **values))
+
+        def user(self, project=None, email=None, **values):
+            email = email or f"user{db.query(models.User).count() + 1}@example.com"
+            values.setdefault("name", "Tester")
+            values.setdefault("role", "qa")
+            return self._add(models.User(project_id=project.id if project else None, email=email, **values))
+
+        def _add(self, row):
+            db.add(row)
+            db.commit()
+            db.refresh(row)
+            return row
+
+    return Factory()
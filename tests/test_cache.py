@@ -0,0 +1,58 @@
+"""Cached report responses: ETags only where every worker sees the invalidations."""
+import time
+
+from sqlalchemy import update
+
+from app.cache import LRUBackend, response_cache
+from app.models.test_result import TestResult
+
+
+class SharedBackend(LRUBackend):
+    """Stands in for Redis: the same store, declared shared across workers."""
+
+    shared = True
+
+
+def _report_url(client, factory) -> str:
+    project = factory.project()
+    run = factory.run(project)
+    case = factory.case(project)
+    client.post(f"/test-runs/{run.id}/results:batch", json=[{"test_case_id": case.id, "status": "pass"}])
+    return f"/test-runs/{run.id}/report"
+
+
+def test_per_process_cache_sends_no_etag(client, factory):
+    url = _report_url(client, factory)
+    client.get(url)
+
+    response = client.get(url, headers={"If-None-Match": "*"})
+
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+    assert response.json()["results"][0]["status"] == "pass"
+
+
+def test_per_process_entries_miss_after_their_ttl_or_an_invalidation(client, factory, db):
+    response_cache.backend = LRUBackend(max_entries=16, max_bytes=1 << 20, ttl_seconds=0.2)
+    url = _report_url(client, factory)
+    result = client.get(url).json()["results"][0]
+
+    # Another worker's write: it can't invalidate this worker's entry, which expires instead
+    db.execute(update(TestResult).values(status="fail"))
+    db.commit()
+    assert client.get(url).json()["results"][0]["status"] == "pass"
+    time.sleep(0.3)
+    assert client.get(url).json()["results"][0]["status"] == "fail"
+
+    # A write handled by this worker bumps the run's tag version: the next read misses
+    client.post(url.replace("/report", "/results:batch?mode=upsert"), json=[{"test_case_id": result["test_case_id"], "status": "pass"}])
+    assert client.get(url).json()["results"][0]["status"] == "pass"
+
+
+def test_shared_cache_answers_matching_etag_with_304(client, factory):
+    response_cache.backend = SharedBackend(max_entries=16, max_bytes=1 << 20, ttl_seconds=300)
+    url = _report_url(client, factory)
+    etag = client.get(url).headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
@@ -0,0 +1,54 @@
+"""Per-case statistics kept up to date by result writes must match a rebuild from test_results."""
+from app.models.test_case_stats import TestCaseStats
+from app.services.case_stats import rebuild_case_stats
+
+
+def _stats(db, case_id) -> dict:
+    db.expire_all()
+    stats = db.get(TestCaseStats, case_id)
+    return {
+        "recent_durations_ms": stats.recent_durations_ms,
+        "median_duration_ms": stats.median_duration_ms,
+        "failure_rate": round(stats.failure_rate, 9),
+        "pass_fail_count": stats.pass_fail_count,
+        "last_failure_at": stats.last_failure_at,
+    }
+
+
+def _write(client, run, case, status, duration_ms, mode="insert"):
+    response = client.post(
+        f"/test-runs/{run.id}/results:batch?mode={mode}",
+        json=[{"test_case_id": case.id, "status": status, "duration_ms": duration_ms}],
+    )
+    assert response.status_code == 200
+
+
+def test_upserted_duration_replaces_the_one_it_overwrote(client, db, factory):
+    project = factory.project()
+    case = factory.case(project)
+    runs = [factory.run(project, name=f"Run {index}") for index in range(3)]
+    for run, duration in zip(runs, [10, 20, 30]):
+        _write(client, run, case, "pass", duration)
+
+    _write(client, runs[1], case, "pass", 200, mode="upsert")
+
+    incremental = _stats(db, case.id)
+    assert (incremental["recent_durations_ms"], incremental["median_duration_ms"]) == ([10, 200, 30], 30)
+    rebuild_case_stats(db, project.id)
+    assert _stats(db, case.id) == incremental
+
+
+def test_upserted_status_corrects_the_failure_stats(client, db, factory):
+    project = factory.project()
+    case = factory.case(project)
+    runs = [factory.run(project, name=f"Run {index}") for index in range(3)]
+    for run, status in zip(runs, ["pass", "fail", "pass"]):
+        _write(client, run, case, status, None)
+
+    # The failure was a misreport: no failure is left, and the case still has three results
+    _write(client, runs[1], case, "pass", None, mode="upsert")
+
+    incremental = _stats(db, case.id)
+    assert (incremental["failure_rate"], incremental["pass_fail_count"], incremental["last_failure_at"]) == (0, 3, None)
+    rebuild_case_stats(db, project.id)
+    assert _stats(db, case.id) == incremental
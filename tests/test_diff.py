@@ -0,0 +1,12 @@
+"""Run diffs compare two runs of one project."""
+
+
+def test_diff_rejects_runs_from_different_projects(client, factory):
+    run = factory.run(factory.project("A"))
+    other = factory.run(factory.project("B"))
+    same_project = factory.run(run.project)
+
+    response = client.get(f"/test-runs/{run.id}/diff/{other.id}")
+
+    assert response.status_code == 422
+    assert client.get(f"/test-runs/{run.id}/diff/{same_project.id}").status_code == 200
@@ -0,0 +1,211 @@
+"""Every statement the endpoints run must be able to use an index on the large tables.
+
+The endpoints are called against seeded data while their statements are captured; each
+statement is then planned again with enable_seqscan off. The planner only falls back to
+a sequential scan then when no index can serve the query, or walks a whole index that
+doesn't match just to filter it; either in a plan means a query pattern landed without
+its index.
+"""
+import json
+import re
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+from app.db.session import async_engine, engine
+from app.main import app
+from app.services.jobs import claim_next_job
+from app.services.live import _initial_backlog
+from scripts.check_indexes import check_database, check_metadata
+
+
+# Seq scans of these (and of test_results' partitions) fail the check; the other tables stay small
+LARGE_TABLES = {"test_results", "test_cases", "test_runs", "test_case_latest_results", "test_case_stats", "jobs"}
+
+PLANNED_STATEMENTS = {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE"}
+
+# GET routes that run no query worth planning, or whose queries are exercised below without HTTP
+NOT_EXERCISED = {
+    "/",
+    "/health",
+    "/health/db",
+    "/health/db/pool",
+    "/metrics",
+    # Never-ending stream: its reads are exercised through _initial_backlog
+    "/test-runs/{run_id}/events",
+    # Serves a file; the lookup is the primary key of jobs
+    "/jobs/{job_id}/artifact",
+}
+
+
+def _requests(project_id: int, run_id: int, base_run_id: int, case_id: int, user_id: int, job_id: int) -> dict:
+    """route path -> requests that exercise it (every filter of the list endpoints, one at a time)."""
+    return {
+        "/users": ["/users", f"/users?project_id={project_id}", "/users?after_id=1"],
+        "/users/{user_id}": [f"/users/{user_id}"],
+        "/projects": ["/projects"],
+        "/test-cases": [
+            "/test-cases",
+            f"/test-cases?project_id={project_id}",
+            f"/test-cases?project_id={project_id}&is_active=true&priority=high",
+            "/test-cases?after_id=5",
+        ],
+        "/test-runs": [
+            "/test-runs",
+            f"/test-runs?project_id={project_id}&with_summary=true",
+            f"/test-runs?project_id={project_id}&environment=staging",
+            f"/test-runs?project_id={project_id}&started_after=2000-01-01T00:00:00Z",
+        ],
+        "/test-runs/{run_id}/summary": [f"/test-runs/{run_id}/summary"],
+        "/test-results": [
+            "/test-results",
+            f"/test-results?run_id={run_id}",
+            f"/test-results?test_case_id={case_id}",
+            f"/test-results?run_id={run_id}&status=fail",
+            f"/test-results?project_id={project_id}&environment=staging",
+            "/test-results?created_before=2000-01-01T00:00:00Z",
+        ],
+        "/test-results/export": [
+            f"/test-results/export?run_id={run_id}",
+            f"/test-results/export?project_id={project_id}&format=csv",
+        ],
+        "/test-runs/{run_id}/report": [f"/test-runs/{run_id}/report"],
+        "/test-runs/{run_id}/diff/previous": [f"/test-runs/{run_id}/diff/previous"],
+        "/test-runs/{run_id}/diff/{base_run_id}": [f"/test-runs/{run_id}/diff/{base_run_id}?change=regression"],
+        "/test-runs/{run_id}/coverage": [f"/test-runs/{run_id}/coverage", f"/test-runs/{run_id}/coverage?summary_only=true"],
+        "/test-cases/{test_case_id}/history": [f"/test-cases/{case_id}/history"],
+        "/projects/{project_id}/flakiness": [
+            f"/projects/{project_id}/flakiness",
+            f"/projects/{project_id}/flakiness?environment=staging&window_days=30",
+        ],
+        "/projects/{project_id}/shards": [f"/projects/{project_id}/shards?shards=3"],
+        "/projects/{project_id}/test-order": [f"/projects/{project_id}/test-order?by_duration=true"],
+        "/projects/{project_id}/health": [f"/projects/{project_id}/health", f"/projects/{project_id}/health?environment=staging"],
+        "/projects/{project_id}/status-matrix": [f"/projects/{project_id}/status-matrix?environment=staging"],
+        "/jobs/{job_id}": [f"/jobs/{job_id}"],
+    }
+
+
+def _seed(client, factory):
+    projects = [factory.project(name=f"Project {index}") for index in range(2)]
+    user = factory.user(projects[0])
+    for project in projects:
+        cases = [factory.case(project, priority="high" if index % 3 else "low") for index in range(30)]
+        runs = []
+        for index in range(6):
+            run = factory.run(project, name=f"Run {index}", environment="staging" if index % 2 else "prod")
+            statuses = ["pass", "fail", "blocked", "skipped"]
+            rows = [
+                {"test_case_id": case.id, "status": statuses[(case.id + index) % 4], "duration_ms": case.id * 10}
+                for case in cases
+            ]
+            assert client.post(f"/test-runs/{run.id}/results:batch", json=rows).status_code == 200
+            runs.append(run)
+    job = client.post("/jobs", json={"kind": "flakiness", "params": {"project_id": projects[0].id}}).json()
+    with engine.begin() as conn:
+        # A history of finished jobs, so the planner doesn't treat the table as tiny
+        conn.exec_driver_sql(
+            "INSERT INTO jobs (kind, params, status) SELECT 'export', '{}', 'succeeded' FROM generate_series(1, 500)"
+        )
+        conn.exec_driver_sql("ANALYZE")
+    return projects[0].id, runs[-1].id, runs[-3].id, cases[0].id, user.id, job["id"]
+
+
+def _is_large(relation: str) -> bool:
+    return relation in LARGE_TABLES or relation.startswith(("test_results_r", "test_results_default"))
+
+
+def _full_scans(plan: dict, empty: set[str], indexes: dict[str, tuple[str, str]]) -> list[str]:
+    """Large relations the plan reads in full.
+
+    That is a Seq Scan, or an index walked end to end: to filter it, or with a condition
+    that doesn't constrain the index's leading column. Empty relations (the partitions no
+    seeded run falls in) are skipped, since any plan is cheap there.
+    """
+    found = []
+    if plan["Node Type"] == "Seq Scan":
+        relation = plan["Relation Name"]
+        if relation not in empty and _is_large(relation):
+            found.append(f"Seq Scan on {relation}")
+    elif "Index Name" in plan:
+        relation, leading_column = indexes[plan["Index Name"]]
+        condition = plan.get("Index Cond", "")
+        if (
+            relation not in empty
+            and _is_large(relation)
+            and (condition or "Filter" in plan)
+            and not re.search(rf"\b{leading_column}\b", condition)
+        ):
+            found.append(f"{plan['Node Type']} using {plan['Index Name']} without a condition on its leading column")
+    for child in plan.get("Plans", ()):
+        found += _full_scans(child, empty, indexes)
+    return found
+
+
+def test_index_check_script_passes(migrated_database):
+    assert check_metadata() == []
+    assert check_database(migrated_database.url.render_as_string(hide_password=False)) == []
+
+
+def test_every_get_route_is_exercised():
+    exercised = _requests(0, 0, 0, 0, 0, 0).keys() | NOT_EXERCISED
+    get_routes = {route.path for route in app.routes if isinstance(route, APIRoute) and "GET" in route.methods}
+    assert get_routes - exercised == set(), "add the new route to tests/test_indexes.py"
+
+
+def test_endpoint_queries_use_indexes(client, factory):
+    ids = _seed(client, factory)
+    run_id, case_id = ids[1], ids[3]
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.split(None, 1)[0].upper() in PLANNED_STATEMENTS:
+            statements.append((statement, parameters))
+
+    # With DB_ASYNC the routes run on the async engine
+    engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+    for captured in engines:
+        event.listen(captured, "before_cursor_execute", capture)
+    try:
+        for urls in _requests(*ids).values():
+            for url in urls:
+                assert client.get(url).status_code == 200, url
+        # Writes read too: known cases, the rows an upsert overwrites, derived tables
+        client.post(f"/test-runs/{run_id}/results:batch?mode=upsert", json=[{"test_case_id": case_id, "status": "pass"}])
+        report = b'{"results": {"tests": [{"name": "Case 1", "status": "failed"}]}}'
+        client.post(f"/test-runs/{run_id}/results:import?format=ctrf&mode=upsert", content=report)
+        _initial_backlog(run_id, 0)
+        claim_next_job()
+    finally:
+        for captured in engines:
+            event.remove(captured, "before_cursor_execute", capture)
+
+    problems = []
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples = 0")
+        empty = {row[0] for row in cursor.fetchall()}
+        cursor.execute(
+            """
+            SELECT ic.relname, tc.relname, a.attname FROM pg_index i
+            JOIN pg_class ic ON ic.oid = i.indexrelid
+            JOIN pg_class tc ON tc.oid = i.indrelid
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+            """
+        )
+        indexes = {index: (table, column) for index, table, column in cursor.fetchall()}
+        cursor.execute("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = cursor.fetchone()[0]
+            plan = plan[0]["Plan"] if isinstance(plan, list) else json.loads(plan)[0]["Plan"]
+            for scan in _full_scans(plan, empty, indexes):
+                problems.append(f"{scan}: {' '.join(statement.split())[-300:]} {parameters}")
+    finally:
+        raw.rollback()
+        raw.close()
+
+    assert len(statements) > 50
+    assert problems == [], "\n".join(problems)
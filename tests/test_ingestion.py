@@ -0,0 +1,210 @@
+"""Result writes and the per-run summaries they keep up to date."""
+import threading
+
+from app.db.session import SessionLocal
+from app.models.test_result import TestResult
+from app.models.test_run_summary import TestRunSummary
+from app.services.results import WrittenResult, _after_results_written, _lock_run_results, ingest_results
+from app.services.summaries import COUNT_COLUMNS, rebuild_summaries
+
+
+def _summary(db, run_id) -> dict:
+    db.expire_all()
+    summary = db.get(TestRunSummary, run_id)
+    return {column: getattr(summary, column) for column in COUNT_COLUMNS}
+
+
+def test_batch_reports_an_outcome_per_row(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    first, second = factory.case(project), factory.case(project)
+
+    response = client.post(
+        f"/test-runs/{run.id}/results:batch",
+        json=[
+            {"test_case_id": first.id, "status": "pass"},
+            {"test_case_id": first.id, "status": "fail"},
+            {"test_case_id": second.id, "status": "exploded"},
+            {"test_case_id": 999, "status": "pass"},
+            {"status": "pass"},
+        ],
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [line["outcome"] for line in body["results"]] == ["created", "duplicate", "invalid", "invalid", "invalid"]
+    assert (body["created"], body["updated"], body["rejected"]) == (1, 0, 4)
+
+
+def test_batch_reports_malformed_ids_as_invalid(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    case = factory.case(project)
+
+    response = client.post(
+        f"/test-runs/{run.id}/results:batch",
+        json=[
+            {"test_case_id": "abc", "status": "pass"},
+            {"test_case_id": 3.5, "status": "pass"},
+            {"test_case_id": [case.id], "status": "pass"},
+            {"test_case_id": case.id, "status": "pass"},
+        ],
+    )
+
+    assert response.status_code == 200
+    lines = response.json()["results"]
+    assert [line["outcome"] for line in lines] == ["invalid", "invalid", "invalid", "created"]
+    assert [line["test_case_id"] for line in lines[:3]] == [None, None, None]
+
+
+def test_batch_accepts_ndjson(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    case = factory.case(project)
+
+    response = client.post(
+        f"/test-runs/{run.id}/results:batch",
+        content=f'{{"test_case_id": {case.id}, "status": "pass"}}\n\nnot json\n',
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+
+    assert [line["outcome"] for line in response.json()["results"]] == ["created", "invalid"]
+
+
+def test_insert_mode_keeps_existing_results(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    case = factory.case(project)
+    client.post(f"/test-runs/{run.id}/results:batch", json=[{"test_case_id": case.id, "status": "pass"}])
+
+    response = client.post(f"/test-runs/{run.id}/results:batch", json=[{"test_case_id": case.id, "status": "fail"}])
+
+    assert response.json()["results"][0]["outcome"] == "duplicate"
+    assert client.get(f"/test-runs/{run.id}/report").json()["results"][0]["status"] == "pass"
+
+
+def test_upsert_overwrites_and_adjusts_the_summary(client, db, factory):
+    project = factory.project()
+    run = factory.run(project)
+    cases = [factory.case(project) for _ in range(3)]
+    client.post(
+        f"/test-runs/{run.id}/results:batch",
+        json=[{"test_case_id": case.id, "status": "fail"} for case in cases[:2]],
+    )
+
+    response = client.post(
+        f"/test-runs/{run.id}/results:batch?mode=upsert",
+        json=[{"test_case_id": case.id, "status": "pass"} for case in cases],
+    )
+
+    assert [line["outcome"] for line in response.json()["results"]] == ["updated", "updated", "created"]
+    expected = {"executed_count": 3, "pass_count": 3, "fail_count": 0, "blocked_count": 0, "skipped_count": 0}
+    assert _summary(db, run.id) == expected
+
+    rebuild_summaries(db, run.id)
+    assert _summary(db, run.id) == expected
+
+
+def test_upsert_waits_for_a_concurrent_insert(db, factory):
+    project = factory.project()
+    run = factory.run(project)
+    case = factory.case(project)
+
+    # Another writer has inserted a result for the case but not committed yet
+    other = SessionLocal()
+    _lock_run_results(other, run.id, exclusive=False)
+    result = TestResult(test_run_id=run.id, test_case_id=case.id, status="fail")
+    other.add(result)
+    other.flush()
+    _after_results_written(other, run.id, [WrittenResult(result.id, case.id, "fail", None, True, None)])
+
+    def upsert():
+        with SessionLocal() as session:
+            ingest_results(session, run.id, [{"test_case_id": case.id, "status": "pass"}], upsert=True)
+
+    upserting = threading.Thread(target=upsert)
+    upserting.start()
+    upserting.join(timeout=0.5)
+    assert upserting.is_alive()
+    other.commit()
+    other.close()
+    upserting.join()
+
+    # The upsert saw the committed fail it overwrote, so the result is counted once
+    expected = {"executed_count": 1, "pass_count": 1, "fail_count": 0, "blocked_count": 0, "skipped_count": 0}
+    assert _summary(db, run.id) == expected
+
+
+def test_single_result_post_updates_the_summary(client, db, factory):
+    project = factory.project()
+    run = factory.run(project)
+    case = factory.case(project)
+
+    response = client.post("/test-results", json={"test_run_id": run.id, "test_case_id": case.id, "status": "blocked"})
+    assert response.status_code == 201
+
+    again = client.post("/test-results", json={"test_run_id": run.id, "test_case_id": case.id, "status": "pass"})
+    assert again.status_code == 409
+
+    summary = client.get(f"/test-runs/{run.id}/summary").json()
+    assert (summary["executed_count"], summary["blocked_count"]) == (1, 1)
+
+
+def test_result_write_invalidates_the_cached_report(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    first, second = factory.case(project), factory.case(project)
+    client.post(f"/test-runs/{run.id}/results:batch", json=[{"test_case_id": first.id, "status": "pass"}])
+    assert len(client.get(f"/test-runs/{run.id}/report").json()["results"]) == 1
+
+    client.post(f"/test-runs/{run.id}/results:batch", json=[{"test_case_id": second.id, "status": "fail"}])
+
+    assert len(client.get(f"/test-runs/{run.id}/report").json()["results"]) == 2
+
+
+def test_junit_import_matches_titles_and_creates_cases(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    factory.case(project, title="logs in")
+    report = b"""<?xml version="1.0"?>
+    <testsuites>
+      <testsuite name="auth">
+        <testcase name="logs in" time="1.5"/>
+        <testcase name="logs out" time="0.25"><failure message="boom">trace</failure></testcase>
+        <testcase name="resets password"><skipped/></testcase>
+      </testsuite>
+    </testsuites>"""
+
+    unmatched = client.post(f"/test-runs/{run.id}/results:import?format=junit", content=report).json()
+    assert (unmatched["created"], unmatched["unmatched"]) == (1, 2)
+
+    response = client.post(f"/test-runs/{run.id}/results:import?format=junit&auto_create=true&mode=upsert", content=report)
+
+    body = response.json()
+    assert (body["parsed"], body["created"], body["updated"], body["cases_created"]) == (3, 2, 1, 2)
+    lines = {line["test_case_title"]: line for line in client.get(f"/test-runs/{run.id}/report").json()["results"]}
+    assert lines["logs in"]["duration_ms"] == 1500
+    assert lines["logs out"]["status"] == "fail"
+    assert lines["resets password"]["status"] == "skipped"
+
+
+def test_ctrf_import(client, factory):
+    project = factory.project()
+    run = factory.run(project)
+    factory.case(project, title="a")
+    factory.case(project, title="b")
+    report = b'{"results": {"tool": {"name": "x"}, "tests": [{"name": "a", "status": "passed", "duration": 12}, {"name": "b", "status": "other"}]}}'
+
+    body = client.post(f"/test-runs/{run.id}/results:import?format=ctrf", content=report).json()
+
+    assert (body["parsed"], body["created"]) == (2, 2)
+    statuses = {line["test_case_title"]: line["status"] for line in client.get(f"/test-runs/{run.id}/report").json()["results"]}
+    assert statuses == {"a": "pass", "b": "blocked"}
+
+
+def test_malformed_report_is_rejected(client, factory):
+    run = factory.run(factory.project())
+
+    response = client.post(f"/test-runs/{run.id}/results:import?format=junit", content=b"<testsuite><testcase")
+
+    assert response.status_code == 400
@@ -0,0 +1,49 @@
+"""The in-process job runner keeps draining the queue when a worker crashes."""
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.services import jobs
+from app.services.jobs import JobRunner
+
+
+def test_crashed_worker_wakes_the_runner_again(monkeypatch):
+    calls = []
+    drained = threading.Event()
+
+    def run_next_job():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database went away")
+        drained.set()
+        return None
+
+    monkeypatch.setattr(jobs, "run_next_job", run_next_job)
+    runner = JobRunner("thread", max_workers=1, retry_seconds=0.05)
+    try:
+        runner.wake()
+        assert drained.wait(timeout=5)
+    finally:
+        runner.shutdown()
+    assert len(calls) == 2
+
+
+def test_broken_process_pool_is_shut_down(monkeypatch):
+    monkeypatch.setattr(jobs, "run_next_job", lambda: None)
+    runner = JobRunner("thread", max_workers=1, retry_seconds=60)
+    broken = ThreadPoolExecutor(1)
+    runner._executor = broken
+    runner._pending = 1
+    future = Future()
+    future.set_exception(BrokenProcessPool("a worker process died"))
+
+    try:
+        runner._done(broken, future)
+
+        assert runner._executor is None
+        with pytest.raises(RuntimeError):
+            broken.submit(print)
+    finally:
+        runner.shutdown()
@@ -0,0 +1,61 @@
+"""Live feed: the shared listener's context, replays of results committed out of id order, and their deduplication."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.db.instrumentation import RequestDbStats, _current_stats
+from app.db.session import SessionLocal
+from app.models.test_result import TestResult
+from app.services.live import REPLAY_OVERLAP_SECONDS, ResultBroker, _SentResults, fetch_results
+
+
+def test_listener_does_not_inherit_the_first_subscribers_context(monkeypatch):
+    seen = []
+
+    async def listen(self):
+        seen.append(_current_stats.get())
+        self._listening.set()
+
+    monkeypatch.setattr(ResultBroker, "_listen", listen)
+
+    async def subscribe():
+        _current_stats.set(RequestDbStats({"path": "/test-runs/1/events"}))
+        broker = ResultBroker()
+        await broker.subscribe(1)
+        await asyncio.sleep(0)
+        await broker.close()
+
+    asyncio.run(subscribe())
+    assert seen == [None]
+
+
+def test_replay_includes_a_lower_id_committed_after_the_cursor(factory):
+    project = factory.project()
+    run = factory.run(project)
+    first, second = factory.case(project), factory.case(project)
+
+    with SessionLocal() as slow, SessionLocal() as fast:
+        # The slow write draws the lower id but commits after the fast one was streamed
+        slow.add(TestResult(test_run_id=run.id, test_case_id=first.id, status="fail"))
+        slow.flush()
+        fast.add(TestResult(test_run_id=run.id, test_case_id=second.id, status="pass"))
+        fast.commit()
+        cursor = max(row["id"] for row in fetch_results(run.id))
+        slow.commit()
+
+    replayed = fetch_results(run.id, after_id=cursor)
+
+    assert [row["test_case_id"] for row in replayed] == [first.id, second.id]
+
+
+def test_sent_ids_are_kept_only_for_the_replay_window():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    sent = _SentResults()
+    for result_id in range(5000):
+        created_at = start + timedelta(seconds=result_id)
+        sent.add({"id": result_id, "created_at": created_at}, created_at)
+
+    kept = [result_id for result_id in range(5000) if result_id in sent]
+    # Everything a replay from the last cursor can re-read is still deduplicated
+    assert set(range(4999 - int(REPLAY_OVERLAP_SECONDS), 5000)) <= set(kept)
+    assert 0 not in sent
+    assert len(kept) < 2048
@@ -0,0 +1,18 @@
+"""Status matrix: 3-bit cell packing."""
+import random
+
+from app.services.matrix import pack_cells
+
+
+def _pack_per_cell(grid: bytes) -> bytes:
+    value = 0
+    for k, code in enumerate(grid):
+        value |= code << (3 * k)
+    return value.to_bytes((len(grid) * 3 + 7) // 8, "little")
+
+
+def test_pack_cells_matches_per_cell_packing():
+    rng = random.Random(25)
+    for size in (0, 1, 7, 8, 9, 23, 24, 1001):
+        grid = bytes(rng.randrange(8) for _ in range(size))
+        assert pack_cells(grid) == _pack_per_cell(grid)
@@ -0,0 +1,34 @@
+"""Multiprocess metrics: snapshots of exited workers whose pid was reused."""
+import json
+import os
+
+from app import metrics
+
+
+def _worker_snapshot(pid: int, started: int, requests: int, in_flight: int) -> dict:
+    latency = [requests] + [0] * len(metrics.LATENCY_BUCKETS)
+    size = [requests] + [0] * len(metrics.SIZE_BUCKETS)
+    return {
+        "pid": pid,
+        "started": started,
+        "requests": [[["GET", "/projects", "200"], latency, 0.0, size, 0]],
+        "in_flight": in_flight,
+        "pools": {},
+        "cache": {"hits": 0, "misses": 0},
+    }
+
+
+def test_reused_pid_keeps_the_exited_workers_counters(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "MULTIPROC_DIR", str(tmp_path))
+    # The parent process is alive: its pid stands in for one an exited worker's successor reused
+    pid = os.getppid()
+    for snapshot in (_worker_snapshot(pid, 1, requests=5, in_flight=3), _worker_snapshot(pid, 2, requests=2, in_flight=1)):
+        metrics._write_snapshot(snapshot)
+
+    body = metrics.render_metrics(_worker_snapshot(os.getpid(), 3, requests=0, in_flight=0))
+
+    assert len(os.listdir(tmp_path)) == 3
+    assert 'http_request_duration_seconds_count{method="GET",route="/projects",status="200"} 7' in body
+    # Only the newest snapshot for the pid belongs to a live process
+    assert "http_requests_in_flight 1\n" in body
+    assert json.loads((tmp_path / f"worker-{pid}-1.json").read_text())["in_flight"] == 3
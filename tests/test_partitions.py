@@ -0,0 +1,49 @@
+"""test_results partitions: frozen migrations, and new runs never filling the default partition."""
+import os
+import re
+
+from sqlalchemy import text
+
+from app.db import partitions
+from app.db.session import engine
+
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic", "versions")
+
+
+def test_migrations_do_not_import_app_code():
+    # A migration must keep doing what it did when it was written, whatever app/ becomes
+    importing = []
+    for name in sorted(os.listdir(VERSIONS_DIR)):
+        if name.endswith(".py"):
+            with open(os.path.join(VERSIONS_DIR, name)) as f:
+                if re.search(r"^\s*(from|import) app\b", f.read(), re.M):
+                    importing.append(name)
+    assert importing == []
+
+
+def test_partitions_are_kept_ahead_outside_requests(client, factory, monkeypatch):
+    project = factory.project()
+    with engine.begin() as conn:
+        conn.execute(text("SELECT setval('test_runs_id_seq', 2500)"))
+
+    created_in_request = []
+    monkeypatch.setattr(partitions, "ensure_partitions", lambda conn, *args: created_in_request.append(1))
+    run = client.post("/test-runs", json={"project_id": project.id, "name": "Nightly"}).json()
+    monkeypatch.undo()
+    assert run["id"] == 2501 and created_in_request == []
+
+    # What maintain_partitions does at its next check
+    with engine.connect() as conn:
+        assert partitions.partitions_needed(conn)
+    created = partitions.keep_partitions_ahead(engine)
+    assert partitions.keep_partitions_ahead(engine) == []
+
+    case = factory.case(project)
+    client.post(f"/test-runs/{run['id']}/results:batch", json=[{"test_case_id": case.id, "status": "pass"}])
+    with engine.connect() as conn:
+        names = {partition["name"] for partition in partitions.list_partitions(conn)}
+        in_default = conn.scalar(text(f"SELECT count(*) FROM {partitions.DEFAULT_PARTITION}"))
+    assert {"test_results_r3000", "test_results_r4000"} <= names
+    assert set(created) <= names
+    assert in_default == 0
@@ -0,0 +1,38 @@
+"""Route plans: one body, run on a sync Session or, with DB_ASYNC, an AsyncSession."""
+import asyncio
+import threading
+
+from sqlalchemy import literal, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.deps import run_plan, run_plan_async
+from app.db.session import DATABASE_URL
+
+
+def _plan(threads: list):
+    threads.append(threading.get_ident())
+    first = (yield select(literal(1))).scalar_one()
+    threads.append(threading.get_ident())
+    second = (yield select(literal(first + 1))).scalar_one()
+    return [first, second]
+
+
+def test_sync_plan(db):
+    assert run_plan(db, _plan([])) == [1, 2]
+
+
+def test_async_plan_runs_its_code_off_the_event_loop():
+    threads = []
+
+    async def run():
+        engine = create_async_engine(DATABASE_URL)
+        try:
+            async with AsyncSession(engine) as db:
+                return threading.get_ident(), await run_plan_async(db, _plan(threads))
+        finally:
+            await engine.dispose()
+
+    loop_thread, value = asyncio.run(run())
+
+    assert value == [1, 2]
+    assert len(threads) == 2 and loop_thread not in threads
@@ -0,0 +1,81 @@
+"""Fixed statement counts per endpoint, so an N+1 lazy load can't creep back in.
+
+Each endpoint is measured with one row and with many: the count must not change.
+"""
+import pytest
+
+
+def _write_results(client, run, cases, status="pass"):
+    response = client.post(
+        f"/test-runs/{run.id}/results:batch",
+        json=[{"test_case_id": case.id, "status": status, "duration_ms": 10} for case in cases],
+    )
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("result_count", [1, 25])
+def test_run_report_query_count(client, factory, query_count, result_count):
+    project = factory.project()
+    run = factory.run(project)
+    cases = [factory.case(project) for _ in range(result_count)]
+    _write_results(client, run, cases)
+
+    response = client.get(f"/test-runs/{run.id}/report")
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == result_count
+    # The run, then every result line with its case title in one join
+    assert query_count(response) == 2
+
+
+@pytest.mark.parametrize("run_count", [1, 25])
+def test_test_case_history_query_count(client, factory, query_count, run_count):
+    project = factory.project()
+    case = factory.case(project)
+    for index in range(run_count):
+        _write_results(client, factory.run(project, name=f"Run {index}"), [case])
+
+    response = client.get(f"/test-cases/{case.id}/history")
+
+    assert response.status_code == 200
+    assert len(response.json()["history"]) == run_count
+    # The case, then every result with its run's details in one join
+    assert query_count(response) == 2
+
+
+@pytest.mark.parametrize("user_count", [1, 25])
+def test_list_users_query_count(client, factory, query_count, user_count):
+    projects = [factory.project(name=f"Project {index}") for index in range(3)]
+    for index in range(user_count):
+        factory.user(projects[index % len(projects)])
+
+    response = client.get("/users")
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert len(items) == user_count
+    assert all(item["project"] is not None for item in items)
+    # Users and their projects in one joined query
+    assert query_count(response) == 1
+
+
+def test_get_user_query_count(client, factory, query_count):
+    user = factory.user(factory.project())
+
+    response = client.get(f"/users/{user.id}")
+
+    assert response.status_code == 200
+    assert response.json()["project"]["name"] == "Project"
+    assert query_count(response) == 1
+
+
+def test_cached_report_runs_no_queries(client, factory, query_count):
+    project = factory.project()
+    run = factory.run(project)
+    _write_results(client, run, [factory.case(project)])
+    client.get(f"/test-runs/{run.id}/report")
+
+    response = client.get(f"/test-runs/{run.id}/report")
+
+    assert response.status_code == 200
+    assert query_count(response) == 0